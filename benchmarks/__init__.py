@@ -0,0 +1 @@
+"""Замеры производительности бота на локальных заглушках API."""
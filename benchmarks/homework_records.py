@@ -0,0 +1,57 @@
+"""Замер памяти на одну домашнюю работу: словарь API и запись Homework.
+
+Словари строятся разбором JSON, как при получении ответа API, а
+записи - из этих словарей. Память считается через tracemalloc; для
+записей учитываются только объекты, созданные сверх словаря (строки
+значений общие и остаются в памяти вместе с записью).
+
+Запуск из корня репозитория:
+    python -m benchmarks.homework_records [количество_работ]
+"""
+import json
+import sys
+import tracemalloc
+
+import homework
+
+COUNT = 100000
+HOMEWORK = {
+    'id': 0,
+    'homework_name': 'student__hw_python_oop.zip',
+    'status': 'reviewing',
+    'date_updated': '2026-01-01T00:00:00Z',
+    'reviewer_comment': 'Принято на проверку',
+    'lesson_name': 'Итоговый проект'
+}
+
+
+def measure(build):
+    """Функция замера памяти, занятой результатом build()."""
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    result = build()
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(
+        stat.size_diff for stat in end.compare_to(start, 'filename')
+    )
+    return result, size
+
+
+def run(count=COUNT):
+    """Функция сравнения памяти словарей и записей Homework."""
+    payload = json.dumps({
+        'homeworks': [dict(HOMEWORK, id=index) for index in range(count)],
+        'current_date': 0
+    })
+    dicts, dict_size = measure(lambda: json.loads(payload)['homeworks'])
+    records, record_size = measure(
+        lambda: [homework.Homework.from_dict(item) for item in dicts]
+    )
+    print(f'словарь API: {dict_size / count:.0f} байт на работу')
+    print(f'Homework: {record_size / count:.0f} байт на работу')
+    print(f'экономия: {1 - record_size / dict_size:.0%}')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else COUNT)
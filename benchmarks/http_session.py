@@ -0,0 +1,51 @@
+"""Замер задержки опроса API с общей сессией HTTP и без нее.
+
+Запуск из корня репозитория:
+    python -m benchmarks.http_session [количество_опросов]
+"""
+import statistics
+import sys
+import time
+
+import homework
+from benchmarks.stand_ins import (
+    HOMEWORKS_PATH, PracticumHandler, StandInServer
+)
+
+POLLS = 500
+
+
+def measure(polls):
+    """Функция замера задержки каждого вызова get_api_answer."""
+    latencies = []
+    for _ in range(polls):
+        start = time.perf_counter()
+        homework.get_api_answer(0)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(title, latencies):
+    """Функция вывода статистики задержек в миллисекундах."""
+    latencies = sorted(latencies)
+    print(
+        f'{title}: среднее {statistics.mean(latencies) * 1000:.3f} мс, '
+        f'p50 {latencies[len(latencies) // 2] * 1000:.3f} мс, '
+        f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} мс'
+    )
+
+
+def run(polls=POLLS):
+    """Функция сравнения requests.get и общей сессии HTTP."""
+    with StandInServer(PracticumHandler) as server:
+        homework.ENDPOINT = server.url + HOMEWORKS_PATH
+        homework.http_session = None
+        report('requests.get', measure(polls))
+        homework.setup_http_session()
+        report('requests.Session', measure(polls))
+        homework.http_session.close()
+        homework.http_session = None
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else POLLS)
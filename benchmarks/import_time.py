@@ -0,0 +1,58 @@
+"""Замер времени импорта бота по данным python -X importtime.
+
+Импорт homework выполняется в отдельных процессах. Выводится медиана
+общего времени импорта и самые медленные модули. Код возврата 1
+означает, что медиана превысила бюджет или при импорте загрузились
+модули, импорт которых должен быть отложен.
+
+Запуск из корня репозитория:
+    python -m benchmarks.import_time [количество_запусков]
+"""
+import statistics
+import subprocess
+import sys
+
+BUDGET_MS = 100
+DEFERRED = ('telegram', 'requests', 'dotenv', 'asyncio', 'http.server',
+            'cProfile', 'pstats', 'tracemalloc', 'engine.sharding',
+            'engine.lease')
+MODULE = 'homework'
+RUNS = 5
+SLOWEST = 10
+
+
+def measure():
+    """Функция одного замера: {модуль: (собственное, общее время в мкс)}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {MODULE}'],
+        capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(own), int(cumulative))
+    return timings
+
+
+def run(runs=RUNS):
+    """Функция замера и проверки бюджета времени импорта."""
+    samples = [measure() for _ in range(runs)]
+    total = statistics.median(
+        timings[MODULE][1] for timings in samples
+    ) / 1000
+    print(f'import {MODULE}: медиана {total:.1f} мс (бюджет {BUDGET_MS} мс)')
+    slowest = sorted(
+        samples[-1].items(), key=lambda item: item[1][0], reverse=True
+    )[:SLOWEST]
+    for name, (own, cumulative) in slowest:
+        print(f'  {name}: {own / 1000:.1f} мс ({cumulative / 1000:.1f} мс)')
+    loaded = [name for name in DEFERRED if name in samples[-1]]
+    if loaded:
+        print('Загружены при импорте: ' + ', '.join(loaded))
+    return total <= BUDGET_MS and not loaded
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS) else 1)
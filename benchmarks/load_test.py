@@ -0,0 +1,163 @@
+"""Нагрузочный прогон бота на локальных заглушках Практикума и Telegram.
+
+Заглушки работают в отдельном процессе, чтобы их потоки не делили
+GIL и память с ботом. Для каждого числа учетных записей выполняется
+несколько кругов опроса: на каждом круге каждая учетная запись
+опрашивается один раз и получает новые статусы работ. Результаты
+записываются в JSON.
+
+Запуск из корня репозитория:
+    python -m benchmarks.load_test --accounts 1 100 10000
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from urllib.request import urlopen
+
+import telegram
+from telegram.utils.request import Request
+
+import homework
+from benchmarks.stand_ins import (
+    HOMEWORKS_PATH, STATS_PATH, PracticumHandler, StandInServer,
+    TelegramHandler
+)
+from engine.tracing import percentile
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ACCOUNTS = (1, 100, 10000)
+BOT_TOKEN = '123456:stand-in'
+ROUNDS = 3
+WORKERS = 32
+
+
+def serve_stand_ins(connection, options):
+    """Функция работы заглушек в дочернем процессе до команды остановки."""
+    practicum = StandInServer(
+        PracticumHandler,
+        latency=options['api_latency'],
+        error_rate=options['api_error_rate'],
+        payload=options['payload']
+    )
+    bot_api = StandInServer(
+        TelegramHandler,
+        latency=options['telegram_latency'],
+        error_rate=options['telegram_error_rate']
+    )
+    with practicum, bot_api:
+        connection.send((practicum.url, bot_api.url))
+        connection.recv()
+
+
+def peak_rss_kb():
+    """Функция получения пикового размера памяти процесса в КБ."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_scale(count, rounds, workers, telegram_url):
+    """Функция прогона count учетных записей и сбора показателей."""
+    bot = telegram.Bot(
+        token=BOT_TOKEN,
+        base_url=telegram_url + '/bot',
+        request=Request(con_pool_size=workers)
+    )
+    accounts = [
+        homework.Account(f'token-{index}', index) for index in range(count)
+    ]
+    check = partial(homework.check_account, bot)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(rounds):
+            list(executor.map(check, accounts))
+    elapsed = time.perf_counter() - start
+    with urlopen(telegram_url + STATS_PATH) as response:
+        stats = json.load(response)
+    latencies = sorted(stats['latencies'])
+    polls = count * rounds
+    return {
+        'accounts': count,
+        'rounds': rounds,
+        'polls': polls,
+        'messages': stats['messages'],
+        'notifications': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'polls_per_s': round(polls / elapsed, 1),
+        'notifications_per_s': round(len(latencies) / elapsed, 1),
+        'latency_p50_ms': to_ms(percentile(latencies, 0.5)),
+        'latency_p99_ms': to_ms(percentile(latencies, 0.99)),
+        'latency_mean_ms': to_ms(
+            statistics.mean(latencies) if latencies else None
+        ),
+        'rss_peak_kb': peak_rss_kb()
+    }
+
+
+def to_ms(seconds):
+    """Функция перевода секунд в миллисекунды с округлением."""
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def parse_args(argv):
+    """Функция разбора параметров прогона."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, nargs='+', default=ACCOUNTS)
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--payload', type=int, default=1)
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    parser.add_argument('--output', default='load_test.json')
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
+    """Функция нагрузочного прогона с записью результатов в JSON."""
+    args = parse_args(argv)
+    options = vars(args)
+    logging.basicConfig(level=logging.CRITICAL)
+    parent, child = multiprocessing.Pipe()
+    stand_ins = multiprocessing.Process(
+        target=serve_stand_ins, args=(child, options), daemon=True
+    )
+    stand_ins.start()
+    practicum_url, telegram_url = parent.recv()
+    homework.ENDPOINT = practicum_url + HOMEWORKS_PATH
+    homework.setup_http_session(max(homework.POOL_MAXSIZE, args.workers))
+    results = []
+    try:
+        for count in sorted(args.accounts):
+            result = run_scale(count, args.rounds, args.workers, telegram_url)
+            print(json.dumps(result, ensure_ascii=False))
+            results.append(result)
+    finally:
+        parent.send('stop')
+        stand_ins.join()
+        homework.http_session.close()
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump({
+            'started': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'options': options,
+            'results': results
+        }, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,95 @@
+"""Замер затрат журналирования на один цикл опроса.
+
+Цикл check_account выполняется без сети и Telegram: ответ API
+подставляется готовым, поэтому время цикла - это в основном время
+журналирования. Сравниваются уровни DEBUG и INFO, запись в файл из
+потока опроса и через очередь с фоновым потоком.
+
+Запуск из корня репозитория:
+    python -m benchmarks.logging_overhead [количество_циклов]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import homework
+from engine.logs import start_queue_logging, stop_queue_logging
+
+CYCLES = 20000
+FORMAT = (
+    '%(asctime)s [%(levelname)s]\n'
+    '\tSource: file "%(pathname)s", line %(lineno)d, in %(funcName)s\n'
+    '\t%(message)s'
+)
+RESPONSE = {
+    'current_date': 0,
+    'homeworks': [
+        {'id': index, 'homework_name': f'hw{index}.zip',
+         'status': 'reviewing', 'date_updated': '2026-01-01T00:00:00Z'}
+        for index in range(5)
+    ]
+}
+
+
+class CannedAccount(homework.Account):
+    """Класс учетной записи с готовым ответом API."""
+
+    def get_answer(self, timestamp):
+        """Метод получения готового ответа API."""
+        return RESPONSE
+
+
+class SilentBot:
+    """Класс бота, который ничего не отправляет."""
+
+    def send_message(self, chat_id, text):
+        """Метод отправки сообщения без обращения к Telegram."""
+
+
+def configure(path, level, queued):
+    """Функция настройки корневого журнала под один замер."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(path, mode='w')
+    handler.setFormatter(logging.Formatter(FORMAT))
+    root.addHandler(handler)
+    root.setLevel(level)
+    return start_queue_logging(root) if queued else None
+
+
+def measure(cycles):
+    """Функция замера среднего времени цикла опроса в микросекундах."""
+    bot = SilentBot()
+    account = CannedAccount('token', 'chat')
+    homework.check_account(bot, account)
+    start = time.perf_counter()
+    for _ in range(cycles):
+        homework.check_account(bot, account)
+        account.plan_next()
+    return (time.perf_counter() - start) / cycles * 1e6
+
+
+def run(cycles=CYCLES):
+    """Функция сравнения режимов журналирования."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.log')
+        for level in (logging.DEBUG, logging.INFO):
+            for queued in (False, True):
+                listener = configure(path, level, queued)
+                elapsed = measure(cycles)
+                if listener is not None:
+                    stop_queue_logging(listener)
+                print(
+                    f'{logging.getLevelName(level)}, '
+                    f'{"очередь" if queued else "в потоке опроса"}: '
+                    f'{elapsed:.2f} мкс на цикл'
+                )
+        configure(path, logging.WARNING, False)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else CYCLES)
@@ -0,0 +1,101 @@
+"""Замер очереди опросов PollQueue на большом числе учетных записей.
+
+Сравнивает выбор учетных записей к опросу и расчет момента
+пробуждения через PollQueue с прежним просмотром всех учетных
+записей на каждом шаге, а также время перепланирования одной
+учетной записи. Время модельное: шаг цикла опроса переходит сразу к
+моменту ближайшего опроса, сами опросы не выполняются.
+
+Запуск из корня репозитория:
+    python -m benchmarks.poll_queue [количество_учетных_записей]
+"""
+import random
+import sys
+import time
+
+from engine.scheduler import PollQueue
+
+ACCOUNTS = 100_000
+STEPS = 200
+BATCH = 256
+INTERVALS = (300, 600, 1800)
+
+
+class Polled:
+    """Класс учетной записи с одним временем следующего опроса."""
+
+    __slots__ = ('next_poll',)
+
+    def __init__(self, next_poll):
+        """Метод создания учетной записи с временем опроса next_poll."""
+        self.next_poll = next_poll
+
+
+def create(count, seed=1):
+    """Функция создания учетных записей с разбросом времени опроса."""
+    generator = random.Random(seed)
+    return [
+        Polled(generator.uniform(0, max(INTERVALS))) for _ in range(count)
+    ]
+
+
+def scan_steps(accounts, steps):
+    """Функция шагов с просмотром всех учетных записей: мкс на шаг."""
+    generator = random.Random(2)
+    start = time.perf_counter()
+    now = min(account.next_poll for account in accounts)
+    for _ in range(steps):
+        due = [account for account in accounts if account.next_poll <= now]
+        for account in due[:BATCH]:
+            account.next_poll = now + generator.choice(INTERVALS)
+        now = min(account.next_poll for account in accounts)
+    return (time.perf_counter() - start) / steps * 1e6
+
+
+def queue_steps(accounts, steps):
+    """Функция шагов с очередью PollQueue: (мкс на шаг, мкс на запись)."""
+    generator = random.Random(2)
+    start = time.perf_counter()
+    polls = PollQueue()
+    for account in accounts:
+        polls.schedule(account, account.next_poll)
+    filled = time.perf_counter() - start
+    start = time.perf_counter()
+    now = polls.next_due()
+    for _ in range(steps):
+        for account in polls.pop_due(now, BATCH):
+            account.next_poll = now + generator.choice(INTERVALS)
+            polls.schedule(account, account.next_poll)
+        now = polls.next_due()
+    return (time.perf_counter() - start) / steps * 1e6, (
+        filled / len(accounts) * 1e6
+    )
+
+
+def reschedule_cost(accounts, times=100_000):
+    """Функция замера перепланирования случайной записи: мкс на вызов."""
+    generator = random.Random(3)
+    polls = PollQueue()
+    for account in accounts:
+        polls.schedule(account, account.next_poll)
+    chosen = [generator.choice(accounts) for _ in range(times)]
+    start = time.perf_counter()
+    for account in chosen:
+        polls.schedule(account, account.next_poll + 60)
+    return (time.perf_counter() - start) / times * 1e6
+
+
+def run(count=ACCOUNTS):
+    """Функция сравнения выбора учетных записей к опросу."""
+    scan = scan_steps(create(count), STEPS)
+    step, fill = queue_steps(create(count), STEPS)
+    reschedule = reschedule_cost(create(count))
+    print(f'Учетных записей: {count}, пакет: до {BATCH}')
+    print(f'Просмотр всех учетных записей: {scan:.0f} мкс на шаг')
+    print(f'PollQueue: {step:.0f} мкс на шаг')
+    print(f'PollQueue, заполнение: {fill:.2f} мкс на учетную запись')
+    print(f'PollQueue, перепланирование: {reschedule:.2f} мкс')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else ACCOUNTS)
@@ -0,0 +1,163 @@
+"""Локальные HTTP-заглушки внешних сервисов для замеров."""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOMEWORKS_PATH = '/api/user_api/homework_statuses/'
+STATS_PATH = '/stats'
+STATUS_CYCLE = ('reviewing', 'rejected', 'approved')
+STAMP = re.compile(r'@(\d+\.\d+)')
+
+
+class PracticumHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов заглушки API Практикум.Домашка."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        """Метод ответа на запрос статусов домашних работ."""
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_json({'code': 'stand_in_error'}, status=500)
+            return
+        self.send_json({
+            'homeworks': self.homeworks(),
+            'current_date': int(time.time())
+        })
+
+    def homeworks(self):
+        """Метод получения работ с новыми статусами для этого токена.
+
+        В каждом ответе все server.payload работ токена меняют статус.
+        В название работы добавляется метка времени ответа, по которой
+        заглушка Telegram считает задержку уведомления.
+        """
+        if not self.server.payload:
+            return []
+        token = self.headers.get('Authorization', '')
+        with self.server.lock:
+            step = self.server.steps[token]
+            self.server.steps[token] += 1
+        now = time.time()
+        status = STATUS_CYCLE[step % len(STATUS_CYCLE)]
+        return [
+            {
+                'id': index,
+                'homework_name': f'hw{index}@{now:.6f}',
+                'status': status,
+                'date_updated': f'{step}-{now:.6f}'
+            }
+            for index in range(self.server.payload)
+        ]
+
+    def send_json(self, data, status=200):
+        """Метод отправки ответа в формате JSON."""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Метод отключения журнала запросов заглушки."""
+
+
+class TelegramHandler(PracticumHandler):
+    """Обработчик запросов заглушки Telegram Bot API.
+
+    Принимает sendMessage и запоминает задержку каждой метки времени
+    из текста сообщения. GET /stats возвращает и сбрасывает
+    накопленные задержки.
+    """
+
+    def do_GET(self):
+        """Метод выдачи накопленной статистики доставки."""
+        if self.path != STATS_PATH:
+            self.send_json({'ok': False}, status=404)
+            return
+        with self.server.lock:
+            stats = {
+                'messages': self.server.messages,
+                'latencies': self.server.latencies
+            }
+            self.server.messages = 0
+            self.server.latencies = []
+        self.send_json(stats)
+
+    def do_POST(self):
+        """Метод ответа на запрос метода Bot API."""
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_json(
+                {'ok': False, 'error_code': 500, 'description': 'stand-in'},
+                status=500
+            )
+            return
+        text = data.get('text', '')
+        now = time.time()
+        with server.lock:
+            server.messages += 1
+            server.latencies.extend(
+                now - float(stamp) for stamp in STAMP.findall(text)
+            )
+        self.send_json({'ok': True, 'result': {
+            'message_id': next(server.counter),
+            'date': int(now),
+            'chat': {'id': data.get('chat_id'), 'type': 'private'},
+            'text': text
+        }})
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Класс локального HTTP-сервера заглушки в отдельном потоке."""
+
+    daemon_threads = True
+
+    def __init__(self, handler_class, latency=0.0, error_rate=0.0,
+                 payload=0):
+        """Метод создания сервера на свободном локальном порту.
+
+        latency - задержка ответа в секундах, error_rate - доля ответов
+        с кодом 500, payload - число работ в ответе API.
+        """
+        super().__init__(('127.0.0.1', 0), handler_class)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.payload = payload
+        self.lock = threading.Lock()
+        self.steps = defaultdict(int)
+        self.counter = itertools.count(1)
+        self.messages = 0
+        self.latencies = []
+        self.thread = threading.Thread(
+            target=self.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        """Метод получения базового адреса сервера."""
+        host, port = self.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        """Метод запуска сервера."""
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Метод остановки сервера."""
+        self.shutdown()
+        self.server_close()
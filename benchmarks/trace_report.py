@@ -0,0 +1,53 @@
+"""Процентили длительности циклов опроса по журналам записей о циклах.
+
+Читает файлы журнала записей о циклах (homework.py.trace.log, его
+сжатые части и журналы обработчиков режима processes) и выводит
+число замеров, 50-й, 90-й и 99-й процентили и максимум длительности
+всего цикла и каждого этапа, а также число циклов по итогам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.trace_report [файлы журнала]
+"""
+import glob
+import sys
+
+from engine.tracing import TOTAL, read_traces, summarize
+
+PATTERN = 'homework.py*.trace.log*'
+SHARES = (0.5, 0.9, 0.99)
+NO_RECORDS = 'Записей о циклах опроса не найдено.'
+
+
+def milliseconds(seconds):
+    """Функция форматирования длительности в миллисекундах."""
+    return '-' if seconds is None else f'{seconds * 1000:.1f}'
+
+
+def run(paths):
+    """Функция вывода сводки: ложь, если записей не найдено."""
+    summary, outcomes = summarize(read_traces(paths), SHARES)
+    count = summary[TOTAL][0]
+    if not count:
+        print(NO_RECORDS)
+        return False
+    header = ['этап', 'замеров'] + [
+        f'p{share * 100:g}, мс' for share in SHARES
+    ] + ['макс., мс']
+    print('\t'.join(header))
+    for name in [TOTAL] + sorted(set(summary) - {TOTAL}):
+        measured, values, largest = summary[name]
+        print('\t'.join(
+            [name, str(measured)]
+            + [milliseconds(value) for value in values]
+            + [milliseconds(largest)]
+        ))
+    print('Итоги циклов: ' + ', '.join(
+        f'{outcome} - {number}' for outcome, number in sorted(
+            outcomes.items(), key=lambda item: -item[1]
+        )
+    ))
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run(sys.argv[1:] or sorted(glob.glob(PATTERN))) else 1)
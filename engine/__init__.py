@@ -0,0 +1 @@
+"""Инфраструктура опроса: планирование, состояние, доставка, наблюдение."""
@@ -0,0 +1,98 @@
+"""Отпечатки ошибок и сводка их повторов."""
+import hashlib
+import re
+import threading
+
+VARIABLE_PARTS = (
+    (re.compile(r'https?://\S+'), '<url>'),
+    (re.compile(r'0x[0-9a-fA-F]+'), '<addr>'),
+    (re.compile(r'\b[0-9a-fA-F-]{16,}\b'), '<hex>'),
+    (re.compile(r'\d+(?:\.\d+)?'), '<n>'),
+)
+DIGEST_LINE = '{label} x{count}'
+
+
+def stable_text(text):
+    """Функция замены изменчивых частей текста ошибки на метки.
+
+    Адреса, числа (время, параметры запроса, порты), адреса объектов
+    в repr и длинные шестнадцатеричные строки не влияют на отпечаток.
+    """
+    for pattern, label in VARIABLE_PARTS:
+        text = pattern.sub(label, text)
+    return text
+
+
+def error_label(error):
+    """Функция получения краткого имени ошибки для сводки."""
+    if not isinstance(error, BaseException):
+        return stable_text(str(error))
+    status_code = getattr(error, 'status_code', None)
+    name = type(error).__name__
+    return name if status_code is None else f'{name} {status_code}'
+
+
+def error_fingerprint(error):
+    """Функция получения отпечатка ошибки по ее типу и устойчивым полям.
+
+    Для исключения учитываются тип, код ответа (если есть) и текст без
+    изменчивых частей, для строки - только текст без них.
+    """
+    kind = type(error).__qualname__ if isinstance(
+        error, BaseException
+    ) else ''
+    stable = (kind, getattr(error, 'status_code', None), stable_text(
+        str(error)
+    ))
+    return hashlib.sha1(repr(stable).encode()).hexdigest()
+
+
+class ErrorDigest:
+    """Класс подсчета повторов ошибок по отпечаткам за окно period.
+
+    Окно начинается с первой ошибки. Первая ошибка каждого отпечатка
+    в окне отмечается как новая, повторы только считаются. По
+    истечении окна flush возвращает строки сводки повторов и начинает
+    новое окно со следующей ошибки.
+    """
+
+    def __init__(self, period):
+        """Метод создания пустой сводки."""
+        self.period = period
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.window_end = None
+
+    def record(self, fingerprint, label, now):
+        """Метод учета ошибки: истина, если отпечаток в окне новый."""
+        with self.lock:
+            if self.window_end is None:
+                self.window_end = now + self.period
+            entry = self.counts.get(fingerprint)
+            if entry is None:
+                self.counts[fingerprint] = [label, 0]
+                return True
+            entry[1] += 1
+            return False
+
+    def repeats(self, fingerprint):
+        """Метод получения числа повторов отпечатка в текущем окне."""
+        with self.lock:
+            return self.counts.get(fingerprint, (None, 0))[1]
+
+    def flush(self, now):
+        """Метод завершения истекшего окна: строки сводки повторов.
+
+        В строке - число ошибок отпечатка за окно, включая первую.
+        Пока окно не истекло, возвращает пустой список.
+        """
+        with self.lock:
+            if self.window_end is None or now < self.window_end:
+                return []
+            lines = [
+                DIGEST_LINE.format(label=label, count=repeats + 1)
+                for label, repeats in self.counts.values() if repeats
+            ]
+            self.counts = {}
+            self.window_end = None
+        return lines
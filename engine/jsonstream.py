@@ -0,0 +1,146 @@
+"""Потоковый разбор JSON-объекта без загрузки ответа целиком."""
+import codecs
+import json
+
+ARRAY_EXPECTED = (
+    'Значение ключа "{key}" должно быть списком, получен {kind}.'
+)
+BROKEN_JSON = 'Некорректный или неполный JSON: {error}'
+OBJECT_EXPECTED = 'Ожидается JSON-объект, получено начало: {start!r}.'
+UNEXPECTED = 'Ожидался символ {expected!r}, получен {actual!r}.'
+
+NUMBER_TAIL = frozenset('0123456789.eE+-')
+WHITESPACE = ' \t\n\r'
+decoder = json.JSONDecoder()
+
+
+class ObjectStream:
+    """Класс потокового разбора JSON-объекта верхнего уровня.
+
+    Перебор выдает по одному элементы массива из ключа array_key.
+    Остальные ключи разбираются целиком, передаются в on_value(ключ,
+    значение) сразу после разбора и сохраняются в values. В памяти
+    одновременно находятся только текущий элемент и необработанный
+    остаток прочитанных данных.
+    """
+
+    def __init__(self, chunks, array_key, on_value=None):
+        """Метод создания разбора по итератору chunks с байтами ответа."""
+        self.chunks = iter(chunks)
+        self.array_key = array_key
+        self.on_value = on_value
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.position = 0
+        self.exhausted = False
+        self.array_found = False
+        self.values = {}
+
+    def fill(self):
+        """Метод чтения следующей порции данных: ложь, если их нет."""
+        if self.exhausted:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            text = self.decoder.decode(b'', final=True)
+        else:
+            text = self.decoder.decode(chunk)
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+        return True
+
+    def peek(self):
+        """Метод получения следующего значимого символа или None."""
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return None
+
+    def expect(self, expected):
+        """Метод пропуска обязательного символа."""
+        actual = self.peek()
+        if actual != expected:
+            raise ValueError(
+                UNEXPECTED.format(expected=expected, actual=actual)
+            )
+        self.position += 1
+
+    def decode(self):
+        """Метод разбора очередного значения целиком.
+
+        Если значение не поместилось в прочитанные данные, доходит до их
+        конца или за числом до конца данных идут только символы, которыми
+        число может продолжаться ('1.' или '2e' на границе порций),
+        читается следующая порция и разбор повторяется.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                if not self.fill():
+                    raise ValueError(BROKEN_JSON.format(error=error))
+                continue
+            if not self.may_continue(value, end) or not self.fill():
+                self.position = end
+                return value
+
+    def may_continue(self, value, end):
+        """Метод проверки, что значение может продолжиться в новой порции."""
+        if end == len(self.buffer):
+            return True
+        return (
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            and NUMBER_TAIL.issuperset(self.buffer[end:])
+        )
+
+    def iter_array(self):
+        """Метод перебора элементов массива из ключа array_key."""
+        start = self.peek()
+        if start != '[':
+            raise TypeError(ARRAY_EXPECTED.format(
+                key=self.array_key, kind=type(self.decode()).__name__
+            ))
+        self.position += 1
+        if self.peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.decode()
+            if self.peek() == ']':
+                self.position += 1
+                return
+            self.expect(',')
+
+    def __iter__(self):
+        """Метод перебора элементов массива с разбором остальных ключей."""
+        start = self.peek()
+        if start != '{':
+            raise TypeError(OBJECT_EXPECTED.format(
+                start=self.buffer[self.position:self.position + 20]
+            ))
+        self.position += 1
+        if self.peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            if key == self.array_key:
+                self.array_found = True
+                yield from self.iter_array()
+            else:
+                self.values[key] = self.decode()
+                if self.on_value is not None:
+                    self.on_value(key, self.values[key])
+            if self.peek() == '}':
+                self.position += 1
+                return
+            self.expect(',')
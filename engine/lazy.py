@@ -0,0 +1,28 @@
+"""Отложенный импорт тяжелых модулей."""
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Класс модуля, который импортируется при первом обращении.
+
+    Чтение и запись атрибутов передаются настоящему модулю из
+    sys.modules, поэтому подмена его атрибутов (например, в тестах)
+    видна и через этот объект.
+    """
+
+    def __init__(self, name):
+        """Метод создания заместителя модуля name без его импорта."""
+        super().__init__(name)
+
+    def __getattr__(self, attribute):
+        """Метод чтения атрибута настоящего модуля."""
+        return getattr(importlib.import_module(self.__name__), attribute)
+
+    def __setattr__(self, attribute, value):
+        """Метод записи атрибута настоящего модуля."""
+        setattr(importlib.import_module(self.__name__), attribute, value)
+
+    def __delattr__(self, attribute):
+        """Метод удаления атрибута настоящего модуля."""
+        delattr(importlib.import_module(self.__name__), attribute)
@@ -0,0 +1,254 @@
+"""Аренда учетных записей: опрашивать их может только один экземпляр."""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import quote
+
+from engine.logs import LazyMessage
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FILE_LOCKS_UNAVAILABLE = (
+    'Аренда через файлы требует fcntl.flock, недоступного на этой '
+    'платформе. Используйте LEASE_BACKEND=sqlite.'
+)
+LEASES_ACQUIRED = 'Экземпляр {holder} получил аренду: {names}.'
+LEASES_LOST = 'Экземпляр {holder} потерял аренду: {names}.'
+LEASES_REFRESH_ERROR = 'Не удалось продлить аренду: {error}'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS leases ('
+    ' name TEXT PRIMARY KEY,'
+    ' holder TEXT NOT NULL,'
+    ' expires REAL NOT NULL)'
+)
+UPSERT_LEASE = (
+    'INSERT INTO leases (name, holder, expires) VALUES (?, ?, ?) '
+    'ON CONFLICT (name) DO UPDATE SET '
+    'holder = excluded.holder, expires = excluded.expires '
+    'WHERE leases.holder = excluded.holder OR leases.expires <= ?'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder():
+    """Функция получения имени экземпляра: узел, процесс и случайная часть."""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+class SqliteLeaseBackend:
+    """Класс хранения аренды в таблице SQLite.
+
+    Захват и продление всех имен выполняются одной транзакцией
+    BEGIN IMMEDIATE, поэтому два экземпляра не получат одно имя.
+    """
+
+    def __init__(self, path):
+        """Метод открытия (создания) базы аренды."""
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(SCHEMA)
+
+    def acquire(self, names, holder, ttl, now):
+        """Метод захвата или продления аренды: множество полученных имен.
+
+        Имя достается holder, если оно свободно, просрочено или уже
+        принадлежит ему.
+        """
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                self.connection.executemany(UPSERT_LEASE, [
+                    (name, holder, now + ttl, now) for name in names
+                ])
+                held = {
+                    name for name, in self.connection.execute(
+                        'SELECT name FROM leases WHERE holder = ?', (holder,)
+                    )
+                }
+            except sqlite3.Error:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+        return held.intersection(names)
+
+    def release(self, names, holder):
+        """Метод освобождения аренды имен, принадлежащих holder."""
+        with self.lock:
+            self.connection.executemany(
+                'DELETE FROM leases WHERE name = ? AND holder = ?',
+                [(name, holder) for name in names]
+            )
+
+    def close(self):
+        """Метод закрытия базы."""
+        with self.lock:
+            self.connection.close()
+
+
+class FileLeaseBackend:
+    """Класс хранения аренды в файлах каталога, по файлу на имя.
+
+    Файл содержит JSON {"holder": ..., "expires": ...} и читается и
+    переписывается под блокировкой fcntl.flock.
+    """
+
+    def __init__(self, directory):
+        """Метод подготовки каталога аренды."""
+        if fcntl is None:
+            raise OSError(FILE_LOCKS_UNAVAILABLE)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        """Метод получения пути к файлу аренды имени."""
+        return os.path.join(self.directory, quote(name, safe='') + '.lease')
+
+    def update(self, name, change):
+        """Метод изменения записи аренды под блокировкой файла.
+
+        change(запись или None) возвращает новую запись, None для
+        удаления или запись без изменений.
+        """
+        with open(self.path(name), 'a+', encoding='utf-8') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                text = file.read()
+                try:
+                    record = json.loads(text) if text else None
+                except ValueError:
+                    record = None
+                updated = change(record)
+                if updated != record:
+                    file.seek(0)
+                    file.truncate()
+                    if updated is not None:
+                        file.write(json.dumps(updated))
+                    file.flush()
+                    os.fsync(file.fileno())
+                return updated
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def acquire(self, names, holder, ttl, now):
+        """Метод захвата или продления аренды: множество полученных имен."""
+        def take(record):
+            """Функция захвата свободной или своей записи."""
+            if (
+                record is None or record.get('holder') == holder
+                or record.get('expires', 0) <= now
+            ):
+                return {'holder': holder, 'expires': now + ttl}
+            return record
+
+        return {
+            name for name in names
+            if self.update(name, take).get('holder') == holder
+        }
+
+    def release(self, names, holder):
+        """Метод освобождения аренды имен, принадлежащих holder."""
+        for name in names:
+            self.update(name, lambda record: (
+                None if record and record.get('holder') == holder
+                else record
+            ))
+
+    def close(self):
+        """Метод закрытия: файлы держатся открытыми только при записи."""
+
+
+class LeaseKeeper:
+    """Класс поддержания аренды набора имен в фоновом потоке.
+
+    Каждые period секунд аренда захватывается или продлевается на ttl
+    секунд. Своей аренда считается до момента продления плюс
+    ttl - period, то есть раньше, чем другой экземпляр сможет ее
+    перехватить: при зависании этого процесса резервный получает
+    аренду не позже чем через ttl + period секунд. Для новых
+    полученных имен перед их выдачей вызывается on_acquire(имена).
+    """
+
+    def __init__(self, backend, names, holder=None, ttl=60, period=None,
+                 on_acquire=None):
+        """Метод создания хранителя аренды."""
+        self.backend = backend
+        self.names = list(names)
+        self.holder = holder or default_holder()
+        self.ttl = ttl
+        self.period = period or ttl / 3
+        self.on_acquire = on_acquire
+        self.held = frozenset()
+        self.valid_until = 0.0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def holds(self, name):
+        """Метод проверки, что аренда имени принадлежит экземпляру."""
+        return name in self.held and time.monotonic() < self.valid_until
+
+    def refresh(self):
+        """Метод одного захвата или продления аренды."""
+        started = time.monotonic()
+        try:
+            held = self.backend.acquire(
+                self.names, self.holder, self.ttl, time.time()
+            )
+        except (OSError, sqlite3.Error) as error:
+            logger.error(LazyMessage(LEASES_REFRESH_ERROR, error=error))
+            return
+        previous = self.held if self.holds_any() else frozenset()
+        lost = previous - held
+        acquired = held - previous
+        if lost:
+            logger.warning(LazyMessage(
+                LEASES_LOST, holder=self.holder, names=sorted(lost)
+            ))
+        if acquired:
+            if self.on_acquire is not None:
+                self.on_acquire(acquired)
+            logger.info(LazyMessage(
+                LEASES_ACQUIRED, holder=self.holder, names=sorted(acquired)
+            ))
+        self.held = frozenset(held)
+        self.valid_until = started + self.ttl - self.period
+
+    def holds_any(self):
+        """Метод проверки, что полученная ранее аренда еще действует."""
+        return time.monotonic() < self.valid_until
+
+    def run(self):
+        """Метод работы фонового потока до вызова stop."""
+        while not self.stopped.wait(self.period):
+            self.refresh()
+
+    def start(self):
+        """Метод первого захвата аренды и запуска фонового потока."""
+        self.refresh()
+        self.thread = threading.Thread(
+            target=self.run, name='leases', daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Метод остановки потока и освобождения аренды для резерва."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.held = frozenset()
+        self.backend.release(self.names, self.holder)
+        self.backend.close()
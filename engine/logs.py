@@ -0,0 +1,143 @@
+"""Журналирование без задержек в цикле опроса."""
+import atexit
+import gzip
+import logging
+import os
+import queue
+import shutil
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+UNKNOWN_LEVEL = 'Неизвестный уровень журнала: {level}.'
+
+
+class LazyMessage:
+    """Класс сообщения журнала, форматируемого только при выводе.
+
+    Шаблон в стиле str.format подставляется при первом обращении
+    к тексту записи, то есть уже в обработчике, а если уровень записи
+    отключен - не подставляется вовсе.
+    """
+
+    __slots__ = ('template', 'kwargs')
+
+    def __init__(self, template, **kwargs):
+        """Метод сохранения шаблона и значений без форматирования."""
+        self.template = template
+        self.kwargs = kwargs
+
+    def __str__(self):
+        """Метод получения текста сообщения."""
+        return self.template.format(**self.kwargs)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Класс обработчика, передающего записи в очередь как есть.
+
+    Стандартный QueueHandler форматирует запись в вызывающем потоке;
+    здесь форматирование и вывод выполняет поток QueueListener.
+    """
+
+    def prepare(self, record):
+        """Метод подготовки записи: без форматирования."""
+        return record
+
+
+def start_queue_logging(logger=None):
+    """Функция переноса обработчиков журнала в фоновый поток.
+
+    Обработчики logger (по умолчанию корневого) переходят к
+    QueueListener, а logger пишет только в очередь. Возвращает
+    запущенный QueueListener, который останавливается при выходе.
+    """
+    logger = logger or logging.getLogger()
+    handlers = list(logger.handlers)
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(DeferredQueueHandler(records))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def stop_queue_logging(listener):
+    """Функция остановки фонового потока с выводом оставшихся записей."""
+    atexit.unregister(listener.stop)
+    listener.stop()
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Класс журнала с ротацией по размеру и сжатием старых частей.
+
+    Ротированная часть переименовывается сразу, а сжимается в gzip
+    в фоновом потоке. Следующая ротация дожидается окончания
+    предыдущего сжатия, поэтому части не перезаписывают друг друга.
+    """
+
+    def __init__(self, filename, max_bytes, backup_count, **kwargs):
+        """Метод создания журнала с ротацией по max_bytes байт."""
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            **kwargs
+        )
+        self.compressing = None
+
+    def rotation_filename(self, default_name):
+        """Метод получения имени ротированной части."""
+        return default_name + '.gz'
+
+    def doRollover(self):
+        """Метод ротации после окончания сжатия предыдущей части.
+
+        Ждать нужно до сдвига номеров частей: иначе часть .1.gz, сжатие
+        которой еще идет, появится уже после сдвига и будет перезаписана.
+        """
+        self.wait_compression()
+        super().doRollover()
+
+    def rotate(self, source, dest):
+        """Метод переименования текущей части и запуска ее сжатия."""
+        self.wait_compression()
+        if not os.path.exists(source):
+            return
+        plain = dest[:-len('.gz')]
+        os.replace(source, plain)
+        self.compressing = threading.Thread(
+            target=compress_file,
+            args=(plain, dest),
+            name='log-compress',
+            daemon=True
+        )
+        self.compressing.start()
+
+    def wait_compression(self):
+        """Метод ожидания окончания сжатия предыдущей части."""
+        if self.compressing is not None:
+            self.compressing.join()
+            self.compressing = None
+
+    def close(self):
+        """Метод закрытия журнала после окончания сжатия."""
+        self.wait_compression()
+        super().close()
+
+
+def compress_file(source, dest):
+    """Функция сжатия файла в gzip с удалением исходного файла."""
+    part = dest + '.part'
+    with open(source, 'rb') as plain, gzip.open(part, 'wb') as packed:
+        shutil.copyfileobj(plain, packed)
+    os.replace(part, dest)
+    os.remove(source)
+
+
+def parse_level(name):
+    """Функция получения числового уровня журнала по его имени."""
+    level = logging.getLevelName(str(name).upper())
+    if not isinstance(level, int):
+        raise ValueError(UNKNOWN_LEVEL.format(level=name))
+    return level
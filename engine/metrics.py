@@ -0,0 +1,341 @@
+"""Показатели работы бота в текстовом формате Prometheus."""
+import bisect
+import threading
+import time
+from http import HTTPStatus
+
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRICS_PATH = '/metrics'
+
+
+class Counter:
+    """Класс счетчика, который только растет."""
+
+    def __init__(self):
+        """Метод создания нулевого счетчика."""
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Метод увеличения счетчика."""
+        with self.lock:
+            self.value += amount
+
+    def state(self):
+        """Метод получения значения для снимка показателей."""
+        return self.value
+
+    def merge(self, state):
+        """Метод добавления значения из снимка показателей."""
+        self.inc(state)
+
+    def samples(self, name, labels):
+        """Метод получения строк показателя для вывода."""
+        yield f'{name}{format_labels(labels)} {self.value}'
+
+
+class Histogram:
+    """Класс гистограммы длительностей с фиксированными границами."""
+
+    def __init__(self, buckets=BUCKETS):
+        """Метод создания пустой гистограммы."""
+        self.lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Метод учета одного значения."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def state(self):
+        """Метод получения состояния для снимка показателей."""
+        with self.lock:
+            return self.buckets, list(self.counts), self.sum, self.count
+
+    def merge(self, state):
+        """Метод добавления состояния гистограммы с теми же границами."""
+        _, counts, total, count = state
+        with self.lock:
+            for index, bucket_count in enumerate(counts):
+                self.counts[index] += bucket_count
+            self.sum += total
+            self.count += count
+
+    def samples(self, name, labels):
+        """Метод получения строк гистограммы для вывода."""
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            bucket = format_labels(labels + (('le', repr(bound)),))
+            yield f'{name}_bucket{bucket} {cumulative}'
+        infinity = format_labels(labels + (('le', '+Inf'),))
+        yield f'{name}_bucket{infinity} {count}'
+        yield f'{name}_sum{format_labels(labels)} {total}'
+        yield f'{name}_count{format_labels(labels)} {count}'
+
+
+class Gauge:
+    """Класс показателя, значение которого вычисляется при выводе."""
+
+    def __init__(self, read):
+        """Метод создания показателя с функцией чтения значения."""
+        self.read = read
+
+    def state(self):
+        """Метод получения значения для снимка показателей."""
+        return self.read()
+
+    def samples(self, name, labels):
+        """Метод получения строки показателя для вывода."""
+        yield f'{name}{format_labels(labels)} {self.read()}'
+
+
+class Family:
+    """Класс семейства показателей одного имени с меткой label."""
+
+    def __init__(self, name, help_text, kind, factory, label=None):
+        """Метод создания семейства показателей."""
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.factory = factory
+        self.label = label
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, value=None):
+        """Метод получения показателя для значения метки."""
+        child = self.children.get(value)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(value, self.factory())
+        return child
+
+    def snapshot(self):
+        """Метод получения снимка семейства для передачи между процессами.
+
+        Снимок - кортеж (имя, описание, тип, метка, [(значение метки,
+        состояние показателя)]) из простых объектов.
+        """
+        return (
+            self.name,
+            self.help_text,
+            self.kind,
+            self.label,
+            [(value, child.state()) for value, child in list(
+                self.children.items()
+            )]
+        )
+
+    def render(self):
+        """Метод получения строк семейства в формате Prometheus."""
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for value, child in sorted(self.children.items(), key=str):
+            labels = () if value is None else ((self.label, value),)
+            yield from child.samples(self.name, labels)
+
+
+class Registry:
+    """Класс набора показателей, выводимых вместе.
+
+    К собственным показателям при выводе добавляются снимки других
+    процессов, переданные в absorb: счетчики и гистограммы
+    суммируются, показатели gauge - тоже.
+    """
+
+    def __init__(self):
+        """Метод создания пустого набора."""
+        self.families = []
+        self.lock = threading.Lock()
+        self.sources = {}
+        self.retired = []
+
+    def add(self, family):
+        """Метод добавления семейства показателей."""
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help_text, label=None):
+        """Метод создания семейства счетчиков."""
+        return self.add(Family(name, help_text, 'counter', Counter, label))
+
+    def histogram(self, name, help_text, label=None, buckets=BUCKETS):
+        """Метод создания семейства гистограмм."""
+        return self.add(Family(
+            name, help_text, 'histogram', lambda: Histogram(buckets), label
+        ))
+
+    def gauge(self, name, help_text, read):
+        """Метод создания показателя, читаемого функцией read."""
+        family = self.add(Family(name, help_text, 'gauge', None))
+        family.children[None] = Gauge(read)
+        return family
+
+    def snapshot(self):
+        """Метод получения снимка всех показателей набора."""
+        return [family.snapshot() for family in self.families]
+
+    def absorb(self, source, snapshot):
+        """Метод сохранения последнего снимка показателей источника."""
+        with self.lock:
+            self.sources[source] = snapshot
+
+    def retire(self, source):
+        """Метод учета завершившегося источника.
+
+        Его счетчики и гистограммы остаются в выводе, а показатели
+        gauge, которые описывают только живой процесс, отбрасываются.
+        """
+        with self.lock:
+            snapshot = self.sources.pop(source, [])
+            self.retired = merge_snapshots([self.retired, [
+                family for family in snapshot if family[2] != 'gauge'
+            ]]).snapshot()
+
+    def render(self):
+        """Метод получения всех показателей в формате Prometheus."""
+        with self.lock:
+            others = [self.retired, *self.sources.values()]
+        if any(others):
+            return merge_snapshots([self.snapshot(), *others]).render()
+        return '\n'.join(
+            line for family in self.families for line in family.render()
+        ) + '\n'
+
+
+class Timer:
+    """Класс замера длительности блока with с учетом ошибок.
+
+    Длительность попадает в histogram и, если задан on_done, передается
+    в on_done(секунды), а исключение внутри блока увеличивает errors и
+    передается дальше.
+    """
+
+    __slots__ = ('histogram', 'errors', 'on_done', 'start')
+
+    def __init__(self, histogram, errors, on_done=None):
+        """Метод создания замера."""
+        self.histogram = histogram
+        self.errors = errors
+        self.on_done = on_done
+
+    def __enter__(self):
+        """Метод начала замера."""
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        """Метод окончания замера."""
+        elapsed = time.perf_counter() - self.start
+        self.histogram.observe(elapsed)
+        if self.on_done is not None:
+            self.on_done(elapsed)
+        if error_type is not None:
+            self.errors.inc()
+        return False
+
+
+def merge_snapshots(snapshots):
+    """Функция сложения снимков показателей в новый набор Registry."""
+    registry = Registry()
+    families = {}
+    for snapshot in snapshots:
+        for name, help_text, kind, label, children in snapshot:
+            family = families.get(name)
+            if family is None:
+                family = families[name] = registry.add(
+                    Family(name, help_text, kind, None, label)
+                )
+            for value, state in children:
+                child = family.children.get(value)
+                if child is None:
+                    child = family.children[value] = (
+                        Histogram(state[0]) if kind == 'histogram'
+                        else Counter()
+                    )
+                child.merge(state)
+    return registry
+
+
+def format_labels(labels):
+    """Функция вывода меток показателя."""
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in labels
+    ) + '}'
+
+
+def start_metrics_server(registry, host, port, actions=None):
+    """Функция запуска сервера показателей в фоновом потоке.
+
+    actions - словарь {путь: функция(параметры запроса)} для запросов
+    POST; текст, возвращенный функцией, отправляется в ответ. Модуль
+    http.server импортируется здесь, чтобы не замедлять импорт бота,
+    когда сервер показателей не нужен.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qsl, urlsplit
+
+    actions = actions or {}
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Класс обработчика запросов показателей."""
+
+        def do_GET(self):
+            """Метод ответа на запрос показателей."""
+            if self.path.split('?')[0] != METRICS_PATH:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            self.reply(registry.render())
+
+        def do_POST(self):
+            """Метод выполнения действия по его пути."""
+            url = urlsplit(self.path)
+            action = actions.get(url.path)
+            if action is None:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            try:
+                text = str(action(dict(parse_qsl(url.query))))
+            except ValueError as error:
+                self.send_error(HTTPStatus.BAD_REQUEST, str(error))
+                return
+            self.reply(text + '\n')
+
+        def reply(self, text):
+            """Метод отправки текстового ответа."""
+            body = text.encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Метод отключения записи запросов в stderr."""
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    return server
@@ -0,0 +1,336 @@
+"""Очередь исходящих сообщений Telegram с ограничением частоты."""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from engine.logs import LazyMessage
+
+OUTBOX_STATE = (
+    'Очередь отправки: ожидает {depth}, отправляется {sending}, '
+    'отправлено {sent}, не доставлено {failed}, повторов {retried}.'
+)
+RETRY_AFTER = 'Telegram ограничил отправку: пауза {seconds} с.'
+SEND_FAILED = 'Сбой отправки сообщения из очереди в чат {chat_id}.'
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Класс ведра токенов: rate токенов в секунду, не более capacity."""
+
+    def __init__(self, rate, capacity=1):
+        """Метод создания полного ведра."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = None
+
+    def refill(self, now):
+        """Метод пополнения ведра к моменту now."""
+        if self.updated is not None:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate
+            )
+        self.updated = now
+
+    def wait_time(self, now):
+        """Метод расчета ожидания до появления токена."""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        """Метод расходования одного токена."""
+        self.refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now):
+        """Метод проверки, что ведро полностью восстановилось."""
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+
+class Outbox:
+    """Класс очереди исходящих сообщений с пулом потоков отправки.
+
+    Общее ведро ограничивает частоту отправки всем чатам, ведро
+    каждого чата - частоту отправки в этот чат. Сообщение чата, который
+    исчерпал свой лимит, не задерживает сообщения других чатов.
+    Ошибка с атрибутом retry_after (telegram.error.RetryAfter)
+    приостанавливает всю отправку и возвращает сообщение в начало
+    очереди его чата.
+
+    Сообщения отправляют workers потоков, поэтому медленный ответ
+    Telegram не задерживает отправку в другие чаты; в один чат
+    одновременно отправляется не больше одного сообщения, и порядок
+    сообщений чата сохраняется. Если задан max_in_flight, put ждет,
+    пока принятых и еще не доставленных сообщений меньше max_in_flight.
+    """
+
+    def __init__(self, send, rate=30, chat_rate=1, burst=None,
+                 clock=time.monotonic, workers=1, max_in_flight=None):
+        """Метод создания очереди с функцией отправки send(chat_id, text)."""
+        self.send = send
+        self.chat_rate = chat_rate
+        self.clock = clock
+        self.bucket = TokenBucket(rate, burst or rate)
+        self.chat_buckets = {}
+        self.chats = {}
+        self.busy = set()
+        self.ready = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.paused_until = 0.0
+        self.closed = False
+        self.max_in_flight = max_in_flight
+        self.depth = 0
+        self.sending = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.threads = [
+            threading.Thread(
+                target=self.run, name=f'outbox-{index}', daemon=True
+            )
+            for index in range(max(1, workers))
+        ]
+
+    def start(self):
+        """Метод запуска потоков отправки."""
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    @property
+    def in_flight(self):
+        """Число принятых и еще не доставленных сообщений."""
+        return self.depth + self.sending
+
+    def put(self, chat_id, text):
+        """Метод постановки сообщения в очередь.
+
+        Возвращает Future, результат которого - истина при доставке.
+        При заполненной очереди (max_in_flight) ждет места в ней.
+        """
+        future = Future()
+        with self.condition:
+            while (
+                self.max_in_flight
+                and self.in_flight >= self.max_in_flight
+                and not self.closed
+            ):
+                self.condition.wait()
+            self.enqueue((chat_id, text, future))
+            self.condition.notify_all()
+        return future
+
+    def enqueue(self, item, first=False):
+        """Метод добавления сообщения в очередь его чата.
+
+        Чат, сообщение которого сейчас отправляется, планируется только
+        после окончания этой отправки.
+        """
+        chat_id = item[0]
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = deque()
+            if chat_id not in self.busy:
+                self.schedule_chat(chat_id, self.clock())
+        if first:
+            chat.appendleft(item)
+        else:
+            chat.append(item)
+        self.depth += 1
+
+    def schedule_chat(self, chat_id, now):
+        """Метод планирования чата к моменту, когда ему разрешена отправка."""
+        bucket = self.chat_buckets.get(chat_id)
+        ready_at = now + bucket.wait_time(now) if bucket else now
+        heapq.heappush(self.ready, (ready_at, next(self.counter), chat_id))
+
+    def take(self):
+        """Метод ожидания сообщения, разрешенного всеми лимитами."""
+        with self.condition:
+            while True:
+                if not self.ready:
+                    if self.closed:
+                        return None
+                    self.condition.wait()
+                    continue
+                now = self.clock()
+                ready_at, _, chat_id = self.ready[0]
+                wait = max(
+                    ready_at - now,
+                    self.paused_until - now,
+                    self.bucket.wait_time(now)
+                )
+                if wait > 0:
+                    self.condition.wait(wait)
+                    continue
+                heapq.heappop(self.ready)
+                return self.pop_chat(chat_id, now)
+
+    def pop_chat(self, chat_id, now):
+        """Метод извлечения первого сообщения чата с расходом токенов."""
+        chat = self.chats[chat_id]
+        item = chat.popleft()
+        self.depth -= 1
+        self.sending += 1
+        self.busy.add(chat_id)
+        self.bucket.take(now)
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        bucket.take(now)
+        if not chat:
+            del self.chats[chat_id]
+        self.prune(now)
+        return item
+
+    def finish(self, chat_id):
+        """Метод окончания отправки в чат: чат снова можно планировать."""
+        self.sending -= 1
+        self.busy.discard(chat_id)
+        if chat_id in self.chats:
+            self.schedule_chat(chat_id, self.clock())
+        self.condition.notify_all()
+
+    def prune(self, now):
+        """Метод удаления восстановившихся ведер чатов без сообщений."""
+        if len(self.chat_buckets) <= 2 * len(self.chats) + 64:
+            return
+        for chat_id in list(self.chat_buckets):
+            if (
+                chat_id not in self.chats
+                and chat_id not in self.busy
+                and self.chat_buckets[chat_id].is_full(now)
+            ):
+                del self.chat_buckets[chat_id]
+
+    def deliver(self, item):
+        """Метод отправки одного сообщения и фиксации результата."""
+        chat_id, text, future = item
+        try:
+            delivered = bool(self.send(chat_id, text))
+        except Exception as error:
+            retry_after = getattr(error, 'retry_after', None)
+            if retry_after is None:
+                logger.exception(LazyMessage(SEND_FAILED, chat_id=chat_id))
+                delivered = False
+            else:
+                logger.warning(LazyMessage(RETRY_AFTER, seconds=retry_after))
+                with self.condition:
+                    self.paused_until = self.clock() + retry_after
+                    self.retried += 1
+                    self.enqueue(item, first=True)
+                    self.finish(chat_id)
+                return
+        with self.condition:
+            if delivered:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self.finish(chat_id)
+        future.set_result(delivered)
+        logger.debug(LazyMessage(
+            OUTBOX_STATE, sending=self.sending, **self.stats()
+        ))
+
+    def run(self):
+        """Метод цикла потока отправки из пула."""
+        while True:
+            item = self.take()
+            if item is None:
+                return
+            self.deliver(item)
+
+    def stats(self):
+        """Метод получения показателей очереди."""
+        return {
+            'depth': self.depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried
+        }
+
+    def close(self, timeout=None):
+        """Метод остановки потоков после отправки очереди."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(
+                None if deadline is None
+                else max(0, deadline - time.monotonic())
+            )
+
+
+def when_all(futures, callback):
+    """Функция вызова callback(истина, если доставлены все) по готовности.
+
+    Вызов происходит в потоке, завершившем последний из futures.
+    """
+    futures = list(futures)
+    if not futures:
+        callback(True)
+        return
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        callback(all(future.result() for future in futures))
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+class CursorLedger:
+    """Класс фиксации курсора опроса по порядку отправленных пакетов.
+
+    Курсор пакета фиксируется, только когда доставлены все пакеты,
+    открытые до него. После недоставленного пакета курсоры пакетов,
+    открытых раньше его завершения, не фиксируются: их работы будут
+    получены повторно со старого курсора. Пакет с курсором None
+    курсор не сдвигает.
+    """
+
+    def __init__(self):
+        """Метод создания пустого журнала."""
+        self.lock = threading.Lock()
+        self.pending = deque()
+
+    def __len__(self):
+        """Метод получения числа пакетов в доставке."""
+        return len(self.pending)
+
+    def open(self, cursor):
+        """Метод регистрации пакета с курсором после его доставки."""
+        entry = [cursor, None, False]
+        with self.lock:
+            self.pending.append(entry)
+        return entry
+
+    def close(self, entry, delivered):
+        """Метод завершения пакета: курсор для фиксации или None."""
+        commit = None
+        with self.lock:
+            entry[1] = delivered
+            while self.pending and self.pending[0][1] is not None:
+                cursor, delivered, blocked = self.pending.popleft()
+                if not delivered:
+                    for later in self.pending:
+                        later[2] = True
+                elif not blocked and cursor is not None:
+                    commit = cursor
+        return commit
@@ -0,0 +1,167 @@
+"""Профилирование циклов опроса по запросу без перезапуска."""
+import io
+import logging
+import os
+import threading
+import time
+
+from engine.logs import LazyMessage
+
+CYCLES = 5
+TOP = 15
+
+CYCLES_NOT_POSITIVE = (
+    'Число циклов профилирования должно быть не меньше 1, получено {cycles}.'
+)
+MEMORY_DIFF = 'Рост памяти за цикл {cycle} профилирования:\n{lines}'
+PROFILE_STARTED = 'Начато профилирование {cycles} циклов опроса.'
+PROFILE_SAVED = (
+    'Профиль {cycles} циклов опроса сохранен в {path}.\n{top}'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cycles(cycles, default=CYCLES):
+    """Функция проверки числа циклов профилирования.
+
+    None заменяется на default; число меньше 1 - ValueError.
+    """
+    cycles = default if cycles is None else int(cycles)
+    if cycles < 1:
+        raise ValueError(CYCLES_NOT_POSITIVE.format(cycles=cycles))
+    return cycles
+
+
+class CycleProfiler:
+    """Класс профилирования следующих циклов опроса по запросу.
+
+    request (из обработчика сигнала, другого потока или HTTP-запроса)
+    включает cProfile на заданное число циклов. Каждый вызов run
+    профилируется отдельно в своем потоке, а профили складываются.
+    После последнего цикла профиль сохраняется в файл .pstats. Если
+    включен memory, после каждого цикла снимок tracemalloc сравнивается
+    с предыдущим и в журнал пишутся строки с наибольшим ростом памяти.
+
+    Пока профилирование не запрошено, run только проверяет флаг armed
+    и вызывает функцию, а cProfile, pstats и tracemalloc даже не
+    импортируются.
+    """
+
+    def __init__(self, directory='.', cycles=CYCLES, memory=True, top=TOP):
+        """Метод создания выключенного профилировщика."""
+        self.directory = directory
+        self.cycles = cycles
+        self.memory = memory
+        self.top = top
+        self.lock = threading.Lock()
+        self.armed = False
+        self.requested = 0
+        self.remaining = 0
+        self.total = 0
+        self.profiles = []
+        self.snapshot = None
+        self.started_tracing = False
+
+    def request(self, cycles=None):
+        """Метод запроса профилирования следующих cycles циклов.
+
+        Только запоминает запрос (без блокировок и журнала), поэтому
+        годится для обработчика сигнала; профилирование начинается со
+        следующего цикла. Число циклов меньше 1 - ValueError.
+        """
+        self.requested = parse_cycles(cycles, self.cycles)
+        self.armed = True
+        return self.requested
+
+    def run(self, function, *args):
+        """Метод вызова функции цикла, под профилировщиком по запросу."""
+        if not self.armed:
+            return function(*args)
+        import cProfile
+        self.begin()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            profile.disable()
+            with self.lock:
+                self.profiles.append(profile)
+
+    def begin(self):
+        """Метод начала профилирования по запросу, если оно не начато."""
+        with self.lock:
+            if not self.requested:
+                return
+            self.total = self.remaining = self.requested
+            self.requested = 0
+            self.profiles = []
+        logger.info(LazyMessage(PROFILE_STARTED, cycles=self.total))
+        if self.memory:
+            import tracemalloc
+            self.started_tracing = not tracemalloc.is_tracing()
+            if self.started_tracing:
+                tracemalloc.start()
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def cycle_done(self):
+        """Метод учета завершения цикла опроса.
+
+        Возвращает путь к файлу профиля, если профилирование закончено.
+        """
+        if not self.armed or not self.remaining:
+            return None
+        self.remaining -= 1
+        if self.memory:
+            self.log_memory(self.total - self.remaining)
+        if self.remaining:
+            return None
+        return self.finish()
+
+    def log_memory(self, cycle):
+        """Метод записи в журнал роста памяти с прошлого снимка."""
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        lines = [
+            str(stat) for stat in snapshot.compare_to(
+                self.snapshot, 'lineno'
+            )[:self.top] if stat.size_diff > 0
+        ]
+        self.snapshot = snapshot
+        if lines:
+            logger.info(LazyMessage(
+                MEMORY_DIFF, cycle=cycle, lines='\n'.join(lines)
+            ))
+
+    def finish(self):
+        """Метод сохранения сложенного профиля и выключения."""
+        with self.lock:
+            profiles, self.profiles = self.profiles, []
+            self.armed = bool(self.requested)
+        if self.memory:
+            import tracemalloc
+            self.snapshot = None
+            if self.started_tracing:
+                tracemalloc.stop()
+        if not profiles:
+            return None
+        import pstats
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, 'profile-{}-{}.pstats'.format(
+            time.strftime('%Y%m%d-%H%M%S'), os.getpid()
+        ))
+        stats.dump_stats(path)
+        top = io.StringIO()
+        stats.stream = top
+        stats.sort_stats('cumulative').print_stats(self.top)
+        logger.info(LazyMessage(
+            PROFILE_SAVED, cycles=self.total, path=path, top=top.getvalue()
+        ))
+        return path
@@ -0,0 +1,162 @@
+"""Повторы запросов и автоматический выключатель для внешнего API."""
+import logging
+import random
+import threading
+import time
+
+from engine.logs import LazyMessage
+
+BREAKER_CLOSED = 'closed'
+BREAKER_HALF_OPEN = 'half-open'
+BREAKER_OPEN = 'open'
+
+BREAKER_STATE = (
+    'Выключатель {name}: {old} -> {new} (ошибок подряд: {failures}).'
+)
+CIRCUIT_OPEN = (
+    'Выключатель {name} разомкнут: запросы временно не выполняются.'
+)
+RETRY = (
+    'Попытка {attempt} из {attempts} не удалась: {error}. '
+    'Повтор через {delay:.2f} с.'
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(ConnectionError):
+    """Исключение: выключатель разомкнут, запрос не выполнялся."""
+
+
+class RetryPolicy:
+    """Класс политики быстрых повторов при временных ошибках.
+
+    Задержка перед повтором n выбирается случайно из
+    [0, min(max_delay, base_delay * 2 ** n)].
+    """
+
+    def __init__(self, attempts=3, base_delay=0.5, max_delay=5.0,
+                 retry_on=(ConnectionError,), sleep=time.sleep):
+        """Метод создания политики повторов."""
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.sleep = sleep
+        self.retries = 0
+
+    def delay(self, attempt):
+        """Метод расчета задержки перед повтором с разбросом."""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt)
+        )
+
+    def call(self, func, *args):
+        """Метод вызова функции с повторами."""
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return func(*args)
+            except self.retry_on as error:
+                if attempt == self.attempts:
+                    raise
+                delay = self.delay(attempt - 1)
+                logger.warning(LazyMessage(
+                    RETRY,
+                    attempt=attempt,
+                    attempts=self.attempts,
+                    error=type(error).__name__,
+                    delay=delay
+                ))
+                self.retries += 1
+                self.sleep(delay)
+
+
+class CircuitBreaker:
+    """Класс автоматического выключателя.
+
+    После threshold ошибок подряд, для которых is_failure истинна,
+    выключатель размыкается на reset_timeout секунд. Затем пропускается
+    один пробный вызов: его успех замыкает выключатель, ошибка снова
+    размыкает.
+    """
+
+    def __init__(self, name, threshold=5, reset_timeout=300.0,
+                 is_failure=lambda error: True, clock=time.monotonic):
+        """Метод создания замкнутого выключателя."""
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    def switch(self, state):
+        """Метод смены состояния с записью в журнал."""
+        if state == self.state:
+            return
+        logger.warning(LazyMessage(
+            BREAKER_STATE,
+            name=self.name,
+            old=self.state,
+            new=state,
+            failures=self.failures
+        ))
+        self.state = state
+        if state == BREAKER_OPEN:
+            self.opened_at = self.clock()
+            self.opened += 1
+
+    def before_call(self):
+        """Метод проверки, можно ли выполнить вызов."""
+        with self.lock:
+            if self.state == BREAKER_CLOSED:
+                return
+            expires = self.opened_at + self.reset_timeout
+            if self.state == BREAKER_OPEN and expires <= self.clock():
+                self.switch(BREAKER_HALF_OPEN)
+            if self.state == BREAKER_HALF_OPEN and not self.probing:
+                self.probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(CIRCUIT_OPEN.format(name=self.name))
+
+    def record(self, error=None):
+        """Метод учета результата вызова."""
+        with self.lock:
+            self.probing = False
+            if error is None:
+                self.failures = 0
+                self.switch(BREAKER_CLOSED)
+            elif self.is_failure(error):
+                self.failures += 1
+                if (
+                    self.state == BREAKER_HALF_OPEN
+                    or self.failures >= self.threshold
+                ):
+                    self.switch(BREAKER_OPEN)
+
+    def call(self, func, *args):
+        """Метод вызова функции через выключатель."""
+        self.before_call()
+        try:
+            result = func(*args)
+        except Exception as error:
+            self.record(error)
+            raise
+        self.record()
+        return result
+
+    def stats(self):
+        """Метод получения показателей выключателя."""
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opened': self.opened,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,141 @@
+"""Планирование следующего опроса API по истории ответов."""
+import heapq
+import itertools
+import random
+
+REASON_BASE = 'base'
+REASON_ERROR = 'error'
+REASON_IDLE = 'idle'
+REASON_REVIEWING = 'reviewing'
+MAX_DOUBLINGS = 32
+COMPACT_MIN = 1024
+
+
+def backoff(start, limit, steps):
+    """Функция удвоения интервала steps раз с ограничением сверху."""
+    return min(limit, start * 2 ** min(steps, MAX_DOUBLINGS))
+
+
+class AdaptiveInterval:
+    """Класс выбора интервала до следующего опроса учетной записи.
+
+    Интервал короче, пока хотя бы одна работа в активном статусе,
+    растет вдвое при долгом отсутствии изменений и отступает
+    экспоненциально со случайным разбросом после ошибок.
+    """
+
+    def __init__(self, base, active=None, idle=None, idle_after=6,
+                 error=None, error_max=None, active_statuses=('reviewing',)):
+        """Метод создания планировщика с интервалами в секундах."""
+        self.base = base
+        self.active = active or base
+        self.idle = idle or base
+        self.idle_after = idle_after
+        self.error = error or base
+        self.error_max = error_max or base
+        self.active_statuses = frozenset(active_statuses)
+        self.active_works = set()
+        self.errors = 0
+        self.empty = 0
+
+    def observe(self, statuses):
+        """Метод учета успешного ответа: словаря работа -> статус."""
+        self.errors = 0
+        if not statuses:
+            self.empty += 1
+            return
+        self.empty = 0
+        for work, status in statuses.items():
+            if status in self.active_statuses:
+                self.active_works.add(work)
+            else:
+                self.active_works.discard(work)
+
+    def record_error(self):
+        """Метод учета неудачного опроса."""
+        self.errors += 1
+
+    def next_interval(self):
+        """Метод расчета интервала и причины его выбора."""
+        if self.errors:
+            interval = backoff(self.error, self.error_max, self.errors - 1)
+            return random.uniform(interval / 2, interval), REASON_ERROR
+        if self.active_works:
+            return self.active, REASON_REVIEWING
+        if self.empty > self.idle_after:
+            steps = self.empty - self.idle_after
+            return backoff(self.base, self.idle, steps), REASON_IDLE
+        return self.base, REASON_BASE
+
+
+class PollQueue:
+    """Класс очереди опросов, упорядоченной по времени следующего опроса.
+
+    Ключи (учетные записи) хранятся в двоичной куче по времени опроса.
+    Перепланирование и удаление ключа - O(log n): прежняя запись кучи
+    только помечается устаревшей и выбрасывается, когда доходит до
+    вершины. Если устаревших записей становится больше, чем
+    действующих, куча перестраивается за O(n).
+    """
+
+    def __init__(self):
+        """Метод создания пустой очереди."""
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        """Метод получения числа запланированных ключей."""
+        return len(self.entries)
+
+    def __contains__(self, key):
+        """Метод проверки, что ключ запланирован."""
+        return key in self.entries
+
+    def schedule(self, key, due):
+        """Метод планирования (перепланирования) опроса key на момент due."""
+        previous = self.entries.get(key)
+        if previous is not None:
+            previous[-1] = False
+        entry = [due, next(self.counter), key, True]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        self.compact()
+
+    def remove(self, key):
+        """Метод снятия ключа с очереди; отсутствующий ключ не ошибка."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[-1] = False
+            self.compact()
+
+    def compact(self):
+        """Метод перестройки кучи, если в ней много устаревших записей."""
+        if len(self.heap) > max(COMPACT_MIN, 2 * len(self.entries)):
+            self.heap = [entry for entry in self.heap if entry[-1]]
+            heapq.heapify(self.heap)
+
+    def next_due(self):
+        """Метод получения ближайшего момента опроса или None."""
+        heap = self.heap
+        while heap and not heap[0][-1]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now, limit=None):
+        """Метод извлечения ключей со сроком опроса не позже now.
+
+        Ключи возвращаются по порядку сроков, не больше limit за раз;
+        извлеченные ключи снимаются с очереди до перепланирования.
+        """
+        heap = self.heap
+        due = []
+        while heap and (limit is None or len(due) < limit):
+            entry = heap[0]
+            if entry[-1]:
+                if entry[0] > now:
+                    break
+                del self.entries[entry[2]]
+                due.append(entry[2])
+            heapq.heappop(heap)
+        return due
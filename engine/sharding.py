@@ -0,0 +1,299 @@
+"""Распределение учетных записей между процессами-обработчиками."""
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import wait
+
+from engine.logs import LazyMessage
+
+ASSIGN = 'assign'
+RELEASE = 'release'
+RELEASED = 'released'
+METRICS = 'metrics'
+PROFILE = 'profile'
+STOP = 'stop'
+
+REPLICAS = 64
+RESPAWN_DELAY = 5.0
+POLL_TIMEOUT = 1.0
+STOP_TIMEOUT = 30.0
+
+SHARD_ASSIGNED = 'Обработчику {node} выдано учетных записей: {count}.'
+SHARD_DIED = (
+    'Обработчик {node} (pid {pid}) завершился с кодом {code}; '
+    'его учетных записей: {count}, перезапуск через {delay} с.'
+)
+SHARD_RELEASING = (
+    'Обработчик {node} передает учетных записей: {count}.'
+)
+SHARD_STARTED = 'Запущен обработчик {node} (pid {pid}).'
+
+logger = logging.getLogger(__name__)
+
+
+def ring_hash(key):
+    """Функция получения точки на кольце для строки key."""
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class HashRing:
+    """Класс кольца согласованного хеширования.
+
+    Каждый узел занимает replicas точек кольца, а ключ принадлежит
+    узлу первой точки по часовой стрелке от хеша ключа. При удалении
+    узла переезжают только его ключи, при добавлении - только ключи,
+    которые достаются новому узлу.
+    """
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        """Метод создания кольца с узлами nodes."""
+        self.replicas = replicas
+        self.points = []
+        self.owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def __contains__(self, node):
+        """Метод проверки, что узел есть на кольце."""
+        return node in self.owners.values()
+
+    def add(self, node):
+        """Метод добавления узла на кольцо."""
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            if point not in self.owners:
+                bisect.insort(self.points, point)
+            self.owners[point] = node
+
+    def remove(self, node):
+        """Метод удаления узла с кольца."""
+        self.points = [
+            point for point in self.points if self.owners[point] != node
+        ]
+        self.owners = {point: self.owners[point] for point in self.points}
+
+    def node_for(self, key):
+        """Метод получения узла для ключа или None для пустого кольца."""
+        if not self.points:
+            return None
+        index = bisect.bisect(self.points, ring_hash(key))
+        return self.owners[self.points[index % len(self.points)]]
+
+
+class Shard:
+    """Класс процесса-обработчика и выданных ему ключей."""
+
+    def __init__(self, process, connection):
+        """Метод создания описания запущенного обработчика."""
+        self.process = process
+        self.connection = connection
+        self.keys = set()
+
+
+class Supervisor:
+    """Класс супервизора процессов-обработчиков.
+
+    Ключи (имена учетных записей) распределяются по обработчикам через
+    HashRing. Обработчик target(node, connection) получает по каналу
+    команды (ASSIGN, ключи), (RELEASE, ключи), (PROFILE, число циклов)
+    и (STOP, ()), отвечает на RELEASE сообщением (RELEASED, ключи) и
+    присылает показатели сообщением (METRICS, снимок).
+
+    Ключ в каждый момент выдан не более чем одному живому обработчику:
+    ключи умершего обработчика сразу переходят к соседям по кольцу, а
+    при возвращении обработчика на кольцо ключи выдаются ему только
+    после того, как прежний владелец подтвердит их освобождение.
+    """
+
+    def __init__(self, target, nodes, keys, on_metrics=None, on_exit=None,
+                 respawn_delay=RESPAWN_DELAY, context='spawn'):
+        """Метод создания супервизора для узлов nodes и ключей keys."""
+        self.target = target
+        self.nodes = list(nodes)
+        self.keys = list(keys)
+        self.on_metrics = on_metrics
+        self.on_exit = on_exit
+        self.respawn_delay = respawn_delay
+        self.context = multiprocessing.get_context(context)
+        self.ring = HashRing()
+        self.shards = {}
+        self.owners = {}
+        self.releasing = set()
+        self.respawns = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Метод запуска всех обработчиков и раздачи ключей."""
+        for node in self.nodes:
+            self.spawn(node)
+        self.assign(self.keys)
+        return self
+
+    def spawn(self, node):
+        """Метод запуска обработчика узла node и добавления его на кольцо."""
+        parent, child = self.context.Pipe()
+        process = self.context.Process(
+            target=self.target, args=(node, child), name=f'shard-{node}'
+        )
+        process.start()
+        child.close()
+        self.shards[node] = Shard(process, parent)
+        self.ring.add(node)
+        logger.info(LazyMessage(SHARD_STARTED, node=node, pid=process.pid))
+
+    def send(self, node, message):
+        """Метод отправки команды обработчику; сбой канала не страшен.
+
+        Умерший обработчик будет обнаружен по завершению его процесса.
+        Отправлять можно из любого потока.
+        """
+        shard = self.shards.get(node)
+        if shard is None:
+            return
+        try:
+            with self.lock:
+                shard.connection.send(message)
+        except (OSError, ValueError):
+            pass
+
+    def broadcast(self, message):
+        """Метод отправки сообщения всем живым обработчикам."""
+        for node in list(self.shards):
+            self.send(node, message)
+
+    def signal(self, signum):
+        """Метод отправки сигнала всем живым обработчикам."""
+        for shard in list(self.shards.values()):
+            try:
+                os.kill(shard.process.pid, signum)
+            except OSError:
+                pass
+
+    def assign(self, keys):
+        """Метод выдачи свободных ключей узлам по кольцу."""
+        groups = {}
+        for key in keys:
+            node = self.ring.node_for(key)
+            if node is not None and key not in self.owners:
+                groups.setdefault(node, []).append(key)
+        for node, group in groups.items():
+            self.owners.update(dict.fromkeys(group, node))
+            self.shards[node].keys.update(group)
+            self.send(node, (ASSIGN, group))
+            logger.info(
+                LazyMessage(SHARD_ASSIGNED, node=node, count=len(group))
+            )
+
+    def rebalance(self):
+        """Метод запроса освобождения ключей, сменивших узел на кольце."""
+        groups = {}
+        for key, owner in self.owners.items():
+            if key not in self.releasing and self.ring.node_for(key) != owner:
+                groups.setdefault(owner, []).append(key)
+        for node, group in groups.items():
+            self.releasing.update(group)
+            self.send(node, (RELEASE, group))
+            logger.info(
+                LazyMessage(SHARD_RELEASING, node=node, count=len(group))
+            )
+        self.assign(key for key in self.keys if key not in self.owners)
+
+    def released(self, node, keys):
+        """Метод учета ключей, освобожденных узлом node, и их выдачи."""
+        freed = [key for key in keys if self.owners.get(key) == node]
+        for key in freed:
+            del self.owners[key]
+            self.releasing.discard(key)
+        self.shards[node].keys.difference_update(freed)
+        self.assign(freed)
+
+    def died(self, node):
+        """Метод передачи ключей умершего узла соседям по кольцу."""
+        shard = self.shards.pop(node)
+        shard.process.join()
+        shard.connection.close()
+        self.ring.remove(node)
+        for key in shard.keys:
+            del self.owners[key]
+            self.releasing.discard(key)
+        self.respawns[node] = time.monotonic() + self.respawn_delay
+        logger.warning(LazyMessage(
+            SHARD_DIED,
+            node=node,
+            pid=shard.process.pid,
+            code=shard.process.exitcode,
+            count=len(shard.keys),
+            delay=self.respawn_delay
+        ))
+        if self.on_exit is not None:
+            self.on_exit(node)
+        self.assign(shard.keys)
+
+    def receive(self, node):
+        """Метод обработки сообщений узла: ложь, если канал закрыт."""
+        connection = self.shards[node].connection
+        try:
+            while connection.poll():
+                kind, payload = connection.recv()
+                if kind == RELEASED:
+                    self.released(node, payload)
+                elif kind == METRICS and self.on_metrics is not None:
+                    self.on_metrics(node, payload)
+        except (EOFError, OSError):
+            return False
+        return True
+
+    def poll(self, timeout=POLL_TIMEOUT):
+        """Метод одного шага: сообщения, смерти и перезапуски узлов."""
+        now = time.monotonic()
+        for node, due in list(self.respawns.items()):
+            if due <= now:
+                del self.respawns[node]
+                self.spawn(node)
+                self.rebalance()
+        if self.respawns:
+            timeout = min(
+                timeout, max(0, min(self.respawns.values()) - now)
+            )
+        waiting = {}
+        for node, shard in self.shards.items():
+            waiting[shard.connection] = node
+            waiting[shard.process.sentinel] = node
+        dead = set()
+        for ready in wait(list(waiting), timeout):
+            node = waiting[ready]
+            if node in dead:
+                continue
+            if ready is self.shards[node].connection:
+                if not self.receive(node):
+                    dead.add(node)
+            else:
+                self.receive(node)
+                dead.add(node)
+        for node in dead:
+            self.died(node)
+
+    def run(self):
+        """Метод работы супервизора до прерывания."""
+        self.start()
+        while True:
+            self.poll()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Метод остановки обработчиков с ожиданием их завершения."""
+        for node in self.shards:
+            self.send(node, (STOP, ()))
+        deadline = time.monotonic() + timeout
+        for node, shard in list(self.shards.items()):
+            shard.process.join(max(0, deadline - time.monotonic()))
+            if shard.process.is_alive():
+                shard.process.terminate()
+                shard.process.join()
+            self.receive(node)
+            shard.connection.close()
+        self.shards.clear()
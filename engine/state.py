@@ -0,0 +1,206 @@
+"""Хранилище состояния опроса на диске (SQLite в режиме WAL)."""
+import sqlite3
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+AccountState = namedtuple(
+    'AccountState',
+    ('from_date', 'error_fingerprint', 'statuses', 'delivered')
+)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS accounts ('
+    ' account TEXT PRIMARY KEY,'
+    ' from_date INTEGER NOT NULL,'
+    ' error_fingerprint TEXT NOT NULL DEFAULT \'\')',
+    'CREATE TABLE IF NOT EXISTS statuses ('
+    ' account TEXT NOT NULL,'
+    ' homework TEXT NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' date_updated TEXT,'
+    ' PRIMARY KEY (account, homework))',
+)
+UPSERT_CURSOR = (
+    'INSERT INTO accounts (account, from_date) VALUES (?, ?) '
+    'ON CONFLICT (account) DO UPDATE SET from_date = excluded.from_date'
+)
+UPSERT_ERROR = (
+    'INSERT INTO accounts (account, from_date, error_fingerprint) '
+    'VALUES (?, ?, ?) ON CONFLICT (account) '
+    'DO UPDATE SET error_fingerprint = excluded.error_fingerprint'
+)
+UPSERT_STATUS = (
+    'INSERT OR REPLACE INTO statuses '
+    '(account, homework, status, date_updated) VALUES (?, ?, ?, ?)'
+)
+
+
+class StateStore:
+    """Класс хранилища курсоров, статусов работ и отпечатков ошибок.
+
+    Каждая запись выполняется одной транзакцией, поэтому после сбоя
+    процесса на диске остается либо старое, либо новое состояние.
+    """
+
+    def __init__(self, path):
+        """Метод открытия (создания) базы состояния."""
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.lock, self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+    def load(self, account):
+        """Метод чтения состояния учетной записи или None."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT from_date, error_fingerprint FROM accounts '
+                'WHERE account = ?',
+                (account,)
+            ).fetchone()
+            if row is None:
+                return None
+            delivered = {
+                homework: (status, date_updated)
+                for homework, status, date_updated in
+                self.connection.execute(
+                    'SELECT homework, status, date_updated FROM statuses '
+                    'WHERE account = ? ORDER BY rowid',
+                    (account,)
+                )
+            }
+        statuses = {
+            homework: status for homework, (status, _) in delivered.items()
+        }
+        return AccountState(row[0], row[1], statuses, delivered)
+
+    def checkpoint(self, account, from_date, statuses=None):
+        """Метод сохранения курсора и статусов одной транзакцией.
+
+        statuses - словарь работа -> (статус, дата обновления).
+        """
+        with self.lock, self.connection:
+            self.connection.execute(UPSERT_CURSOR, (account, from_date))
+            self.connection.executemany(UPSERT_STATUS, [
+                (account, homework, status, date_updated)
+                for homework, (status, date_updated)
+                in (statuses or {}).items()
+            ])
+
+    def save_statuses(self, account, statuses):
+        """Метод сохранения доставленных статусов без сдвига курсора."""
+        with self.lock, self.connection:
+            self.connection.executemany(UPSERT_STATUS, [
+                (account, homework, status, date_updated)
+                for homework, (status, date_updated) in statuses.items()
+            ])
+
+    def save_error(self, account, from_date, fingerprint):
+        """Метод сохранения отпечатка последней отправленной ошибки."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                UPSERT_ERROR, (account, from_date, fingerprint)
+            )
+
+    def close(self):
+        """Метод закрытия базы."""
+        with self.lock:
+            self.connection.close()
+
+
+class DeliveryIndex:
+    """Класс индекса доставленных переходов статусов домашних работ.
+
+    Для каждой работы хранится последняя доставленная пара
+    (статус, дата обновления). Объем ограничен limit записями: первыми
+    вытесняются давно завершенные работы, затем давно не менявшиеся.
+    """
+
+    def __init__(self, limit, final_statuses=('approved',)):
+        """Метод создания пустого индекса."""
+        self.limit = limit
+        self.final_statuses = frozenset(final_statuses)
+        self.active = OrderedDict()
+        self.finished = OrderedDict()
+
+    def __len__(self):
+        """Метод получения числа работ в индексе."""
+        return len(self.active) + len(self.finished)
+
+    def is_new(self, work, status, date_updated):
+        """Метод проверки, что переход статуса работы еще не доставлен."""
+        entry = self.active.get(work) or self.finished.get(work)
+        return entry != (status, date_updated)
+
+    def mark(self, work, status, date_updated):
+        """Метод учета доставленного перехода статуса работы."""
+        self.active.pop(work, None)
+        self.finished.pop(work, None)
+        if status in self.final_statuses:
+            self.finished[work] = (status, date_updated)
+        else:
+            self.active[work] = (status, date_updated)
+        while len(self) > self.limit:
+            (self.finished or self.active).popitem(last=False)
+
+
+class StatusView:
+    """Класс последних полученных статусов работ и истории их смены.
+
+    Для не более чем limit последних обновленных работ хранится
+    (название, статус, дата обновления), а также время получения этих
+    данных и не более history_limit последних переходов статусов.
+    Данные читаются из других потоков.
+    """
+
+    def __init__(self, history_limit=10, limit=50):
+        """Метод создания пустого представления."""
+        self.lock = threading.Lock()
+        self.limit = limit
+        self.latest = OrderedDict()
+        self.history = deque(maxlen=history_limit)
+        self.checked_at = None
+
+    def update(self, items, checked_at):
+        """Метод учета статусов из ответа API, полученного в checked_at.
+
+        items - кортежи (работа, название, статус, дата обновления).
+        """
+        with self.lock:
+            for work, title, status, date_updated in items:
+                known = self.latest.get(work)
+                if known is None or known[1:] != (status, date_updated):
+                    self.history.append((title, status, date_updated))
+                self.latest.pop(work, None)
+                self.latest[work] = (title, status, date_updated)
+                if len(self.latest) > self.limit:
+                    self.latest.popitem(last=False)
+            self.checked_at = checked_at
+
+    def restore(self, delivered, checked_at):
+        """Метод заполнения представления из сохраненного состояния.
+
+        delivered - словарь работа -> (статус, дата обновления); названия
+        работ не сохраняются, поэтому вместо них выводится работа.
+        """
+        self.update(
+            (
+                (work, work, status, date_updated)
+                for work, (status, date_updated) in delivered.items()
+            ),
+            checked_at
+        )
+
+    def snapshot(self):
+        """Метод получения копии: (статусы, история, время получения)."""
+        with self.lock:
+            return (
+                list(self.latest.values()),
+                list(self.history),
+                self.checked_at
+            )
@@ -0,0 +1,166 @@
+"""Структурированные записи о циклах опроса и их разбор."""
+import contextvars
+import gzip
+import json
+import logging
+import math
+import time
+from contextlib import contextmanager
+
+CHANGED = 'changed'
+EMPTY = 'empty'
+ERROR = 'error'
+UNCHANGED = 'unchanged'
+TOTAL = 'total'
+
+logger = logging.getLogger(__name__)
+current = contextvars.ContextVar('cycle_trace', default=None)
+
+
+class CycleTrace:
+    """Класс записи об одном цикле опроса учетной записи.
+
+    Этапы цикла добавляют свою длительность через add_stage, а после
+    цикла запись выводится в журнал одной строкой JSON: учетная
+    запись, длительности этапов, размер ответа API, число работ,
+    смены статусов и итог (CHANGED, UNCHANGED, EMPTY или ERROR).
+    Строка JSON собирается только при выводе записи.
+    """
+
+    __slots__ = (
+        'account', 'started', 'start', 'duration', 'stages',
+        'payload_bytes', 'homeworks', 'transitions', 'error'
+    )
+
+    def __init__(self, account):
+        """Метод начала записи о цикле учетной записи account."""
+        self.account = account
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.stages = {}
+        self.payload_bytes = 0
+        self.homeworks = 0
+        self.transitions = []
+        self.error = None
+
+    def add_stage(self, name, seconds):
+        """Метод учета длительности этапа; повторы этапа складываются."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_transition(self, work, previous, status):
+        """Метод учета смены статуса работы work."""
+        self.transitions.append(
+            {'work': work, 'from': previous, 'to': status}
+        )
+
+    def finish(self):
+        """Метод окончания записи о цикле."""
+        self.duration = time.perf_counter() - self.start
+
+    @property
+    def outcome(self):
+        """Итог цикла по собранным данным."""
+        if self.error is not None:
+            return ERROR
+        if self.transitions:
+            return CHANGED
+        return UNCHANGED if self.homeworks else EMPTY
+
+    def record(self):
+        """Метод получения записи о цикле в виде словаря."""
+        return {
+            'time': round(self.started, 3),
+            'account': self.account,
+            'duration': round(self.duration, 6),
+            'stages': {
+                name: round(seconds, 6)
+                for name, seconds in self.stages.items()
+            },
+            'bytes': self.payload_bytes,
+            'homeworks': self.homeworks,
+            'transitions': self.transitions,
+            'outcome': self.outcome,
+            'error': self.error,
+        }
+
+    def __str__(self):
+        """Метод получения записи о цикле строкой JSON."""
+        return json.dumps(self.record(), ensure_ascii=False)
+
+
+def current_trace():
+    """Функция получения записи о текущем цикле или None."""
+    return current.get()
+
+
+@contextmanager
+def trace_cycle(account):
+    """Функция-контекст записи о цикле опроса учетной записи account.
+
+    Запись доступна через current_trace в потоке цикла, в его задаче
+    asyncio и в вызовах asyncio.to_thread из нее. По выходе из блока
+    запись выводится в журнал engine.tracing на уровне INFO.
+    """
+    trace = CycleTrace(account)
+    token = current.set(trace)
+    try:
+        yield trace
+    finally:
+        current.reset(token)
+        trace.finish()
+        logger.info(trace)
+
+
+def read_traces(paths):
+    """Функция чтения записей о циклах из файлов журнала.
+
+    Сжатые части журнала (.gz) читаются как есть, строки не в формате
+    JSON пропускаются.
+    """
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and 'stages' in record:
+                    yield record
+
+
+def percentile(values, share):
+    """Функция получения процентиля share (0..1) методом ближайшего ранга.
+
+    values должны быть отсортированы по возрастанию.
+    """
+    if not values:
+        return None
+    rank = max(1, math.ceil(share * len(values)))
+    return values[rank - 1]
+
+
+def summarize(records, shares=(0.5, 0.9, 0.99)):
+    """Функция сводки длительностей циклов и этапов по процентилям.
+
+    Возвращает ({этап: (число замеров, [процентили], максимум)},
+    {итог: число циклов}); длительность всего цикла - этап TOTAL.
+    """
+    samples = {TOTAL: []}
+    outcomes = {}
+    for record in records:
+        samples[TOTAL].append(record['duration'])
+        for name, seconds in record['stages'].items():
+            samples.setdefault(name, []).append(seconds)
+        outcome = record.get('outcome')
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    summary = {}
+    for name, values in samples.items():
+        values.sort()
+        summary[name] = (
+            len(values),
+            [percentile(values, share) for share in shares],
+            values[-1] if values else None
+        )
+    return summary, outcomes
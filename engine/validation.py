@@ -0,0 +1,128 @@
+"""Проверка структуры данных по декларативной схеме."""
+
+KEY_MISSING = 'В объекте {path} отсутствует ключ "{key}".'
+TYPE_MISMATCH = (
+    'Значение {path} должно иметь тип {kind}, получен {type_data}.'
+)
+VALUE_UNKNOWN = 'Недопустимое значение {path}: {value!r}.'
+ROOT = 'данные'
+
+
+class Schema:
+    """Класс декларативной схемы значения.
+
+    kind - ожидаемый тип; keys - обязательные ключи словаря в виде
+    {ключ: схема значения или None}; items - схема элементов списка;
+    choices - допустимые значения. Шаблоны сообщений об ошибках можно
+    заменить: в них подставляются path, key, kind, type_data и value.
+    """
+
+    def __init__(self, kind=None, keys=None, items=None, choices=None,
+                 type_message=TYPE_MISMATCH, key_message=KEY_MISSING,
+                 value_message=VALUE_UNKNOWN):
+        """Метод создания схемы."""
+        self.kind = kind
+        self.keys = keys or {}
+        self.items = items
+        self.choices = choices
+        self.type_message = type_message
+        self.key_message = key_message
+        self.value_message = value_message
+
+    def expression(self, name, namespace):
+        """Метод получения выражения Python, истинного для верных данных.
+
+        Константы схемы (типы, наборы ключей и значений) попадают в
+        namespace под сгенерированными именами.
+        """
+        parts = []
+        if self.kind is not None:
+            parts.append(f'isinstance({name}, {bind(namespace, self.kind)})')
+        if self.keys:
+            required = bind(namespace, frozenset(self.keys))
+            parts.append(f'{required} <= {name}.keys()')
+            for key, schema in self.keys.items():
+                if schema is not None:
+                    parts.append(
+                        schema.expression(f'{name}[{key!r}]', namespace)
+                    )
+        if self.items is not None:
+            item = bind(namespace, None)
+            parts.append('all({} for {} in {})'.format(
+                self.items.expression(item, namespace), item, name
+            ))
+        if self.choices is not None:
+            parts.append(f'{name} in {bind(namespace, self.choices)}')
+        return '(' + (' and '.join(parts) or 'True') + ')'
+
+    def explain(self, value, path):
+        """Метод поиска первой ошибки в данных с подробным сообщением.
+
+        Несоответствие типа - TypeError, отсутствие ключа - KeyError,
+        недопустимое значение - ValueError.
+        """
+        if self.kind is not None and not isinstance(value, self.kind):
+            raise TypeError(self.type_message.format(
+                path=path, kind=self.kind.__name__, type_data=type(value)
+            ))
+        for key, schema in self.keys.items():
+            if key not in value:
+                raise KeyError(self.key_message.format(path=path, key=key))
+            if schema is not None:
+                schema.explain(value[key], key if path == ROOT else (
+                    f'{path}.{key}'
+                ))
+        if self.items is not None:
+            for index, item in enumerate(value):
+                self.items.explain(item, f'{path}[{index}]')
+        if self.choices is not None and not is_choice(value, self.choices):
+            raise ValueError(
+                self.value_message.format(path=path, value=value)
+            )
+
+
+class Validator:
+    """Класс проверки данных по схеме, собранной в одну функцию.
+
+    Верные данные проверяются одним выражением без сообщений и
+    журналирования. Только если оно ложно, схема обходится повторно
+    для поиска ошибки и подробного сообщения.
+    """
+
+    def __init__(self, schema, path=ROOT):
+        """Метод сборки проверки по схеме schema с шаблоном пути path."""
+        self.schema = schema
+        self.path = path
+        namespace = {}
+        self.source = 'lambda value: ' + schema.expression('value', namespace)
+        self.check = eval(self.source, namespace)
+
+    def __call__(self, value, *where):
+        """Метод проверки данных: возвращает их или вызывает исключение.
+
+        Аргументы where подставляются в шаблон пути path только при
+        ошибке, например номер элемента в 'homeworks[{}]'.
+        """
+        try:
+            if self.check(value):
+                return value
+        except (AttributeError, TypeError):
+            pass
+        path = self.path.format(*where)
+        self.schema.explain(value, path)
+        raise ValueError(VALUE_UNKNOWN.format(path=path, value=value))
+
+
+def bind(namespace, value):
+    """Функция добавления константы в namespace под новым именем."""
+    name = f'_{len(namespace)}'
+    namespace[name] = value
+    return name
+
+
+def is_choice(value, choices):
+    """Функция проверки допустимости значения, включая нехешируемые."""
+    try:
+        return value in choices
+    except TypeError:
+        return False
@@ -1,24 +1,134 @@
-from dotenv import load_dotenv
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from functools import partial
+import itertools
 from http import HTTPStatus
+import json
 import logging
 import os
-import requests
+import signal
 import sys
 import time
 
-import telegram
+from engine.errors import ErrorDigest, error_fingerprint, error_label
+from engine.jsonstream import ObjectStream
+from engine.lazy import LazyModule
+from engine.logs import (
+    CompressingRotatingFileHandler, LazyMessage, parse_level,
+    start_queue_logging
+)
+from engine.metrics import (
+    METRICS_PATH, Registry, Timer, start_metrics_server
+)
+from engine.outbox import CursorLedger, Outbox, when_all
+from engine.profiling import CycleProfiler, parse_cycles
+from engine.resilience import BREAKER_CLOSED, CircuitBreaker, RetryPolicy
+from engine.scheduler import AdaptiveInterval, PollQueue
+from engine.state import DeliveryIndex, StateStore, StatusView
+from engine.tracing import current_trace, trace_cycle
+from engine.validation import Schema, Validator
+
+asyncio = LazyModule('asyncio')
+requests = LazyModule('requests')
+telegram = LazyModule('telegram')
+
+
+def load_settings():
+    """Функция чтения настроек бота из переменных окружения."""
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, HEADERS
+    global ACCOUNTS_FILE, ACCOUNT_WORKERS, WORKER_MODE, STATE_FILE
+    global LOG_QUEUE, LOG_FILE_LEVEL, LOG_STREAM_LEVEL, LOG_MAX_BYTES
+    global LOG_BACKUP_COUNT, METRICS_HOST, METRICS_PORT, BOT_COMMANDS
+    global STREAM_JSON, PROCESS_WORKERS, LEASE_BACKEND, LEASE_PATH, LEASE_TTL
+    global PROFILE_DIR, TRACE_CYCLES, SEND_WORKERS, SEND_MAX_IN_FLIGHT
+    PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
+    TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+    TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+    ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE')
+    ACCOUNT_WORKERS = int(os.getenv('ACCOUNT_WORKERS', 8))
+    WORKER_MODE = os.getenv('WORKER_MODE', 'threads')
+    STATE_FILE = os.getenv('STATE_FILE')
+    LOG_QUEUE = os.getenv('LOG_QUEUE', '1') != '0'
+    LOG_FILE_LEVEL = os.getenv('LOG_FILE_LEVEL', 'INFO')
+    LOG_STREAM_LEVEL = os.getenv('LOG_STREAM_LEVEL', 'DEBUG')
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = os.getenv('METRICS_PORT')
+    BOT_COMMANDS = os.getenv('BOT_COMMANDS', '0') == '1'
+    STREAM_JSON = os.getenv('STREAM_JSON', '0') == '1'
+    PROCESS_WORKERS = int(os.getenv('PROCESS_WORKERS', os.cpu_count() or 1))
+    LEASE_BACKEND = os.getenv('LEASE_BACKEND')
+    LEASE_PATH = os.getenv('LEASE_PATH')
+    LEASE_TTL = float(os.getenv('LEASE_TTL', 60))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    TRACE_CYCLES = os.getenv('TRACE_CYCLES', '1') != '0'
+    SEND_WORKERS = int(os.getenv('SEND_WORKERS', 0))
+    SEND_MAX_IN_FLIGHT = int(os.getenv('SEND_MAX_IN_FLIGHT', 0))
+
 
+def init(env_file=None):
+    """Функция подготовки к запуску: чтение файла .env и настроек.
 
-load_dotenv()
-PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
-TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    Импорт модуля файл .env не читает: настройки при импорте берутся
+    только из окружения процесса.
+    """
+    from dotenv import load_dotenv
+    load_dotenv(env_file)
+    load_settings()
+
+
+load_settings()
+WORKER_MODES = ('threads', 'asyncio', 'processes')
+LEASE_BACKENDS = {
+    'sqlite': ('SqliteLeaseBackend', 'leases.sqlite3'),
+    'file': ('FileLeaseBackend', 'leases')
+}
 
 TOKENS = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
+ACCOUNTS_TOKENS = ('TELEGRAM_TOKEN', 'ACCOUNTS_FILE')
+PROCESSES_TOKENS = ('TELEGRAM_TOKEN', 'ACCOUNTS_FILE', 'STATE_FILE')
+LEASE_TOKENS = ('STATE_FILE',)
+KEYS_IN_ACCOUNT = ('practicum_token', 'chat_id')
 
 RETRY_PERIOD = 600
+REVIEWING_PERIOD = 300
+IDLE_PERIOD = 3 * RETRY_PERIOD
+IDLE_AFTER = 6
+ERROR_PERIOD = 60
+ERROR_PERIOD_MAX = 6 * RETRY_PERIOD
+ERROR_DIGEST_PERIOD = 3600
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+API_RETRIES = 3
+API_RETRY_DELAY = 0.5
+API_RETRY_DELAY_MAX = 5.0
+BREAKER_THRESHOLD = 5
+BREAKER_TIMEOUT = 300
+POOL_CONNECTIONS = 1
+POOL_MAXSIZE = 10
+TELEGRAM_RATE = 30
+CHAT_RATE = 1
+MESSAGE_LIMIT = 4096
+DELIVERED_LIMIT = 64
+HISTORY_LIMIT = 10
+VIEW_LIMIT = 50
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_BATCH = 50
+POLL_BATCH = 256
+COMMAND_WORKERS = 1
+SHARD_REPORT_PERIOD = 15
+PROFILE_CYCLES = 5
+PROFILE_PATH = '/profile'
+PROFILE_SIGNAL = getattr(signal, 'SIGUSR1', None)
+TRACE_LOGGER = 'engine.tracing'
+SHARD_RELEASE_TIMEOUT = 30
+BATCH_SEPARATOR = '\n\n'
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -26,9 +136,22 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
-KEYS_IN_HOMEWORK = ('homework_name', 'status')
 KEYS_IN_RESPONSE_WITH_CODE_NOT_OK = ('error', 'code')
 
+ACCOUNT_CHECK = 'Проверка учетной записи "{name}".'
+ACCOUNTS_FILE_ERROR = (
+    'Ошибка в файле учетных записей {path}!\n{error}'
+)
+ACCOUNTS_LOADED = 'Загружено учетных записей: {count} (потоков: {workers}).'
+ACCOUNTS_NOT_LIST = 'Ожидается список учетных записей, получен {type_data}.'
+ACCOUNT_NOT_DICT = (
+    'Учетная запись №{index} должна быть объектом, получен {type_data}.'
+)
+ACCOUNT_NAMES_NOT_UNIQUE = (
+    'Имена учетных записей повторяются: {names}! Имя учетной записи - '
+    'ключ ее состояния в STATE_FILE и ее аренды, укажите разные "name".'
+)
+BATCH_READY = 'Новых статусов: {count}, сообщений Telegram: {parts}.'
 CODE_NOT_OK = (
     '\tСбой в работе программы: код ответа API {status_code}!\n'
     '\tДанные отправленного запроса:\n'
@@ -38,6 +161,11 @@ CODE_NOT_OK = (
     '\t- параметры: {params}\n'
 )
 CODE_OK = 'Получен ответ "OK" от API (код 200).'
+COMMANDS_STARTED = 'Бот отвечает на команды: {commands}.'
+COMMANDS_UNAVAILABLE = (
+    'Команды бота недоступны в режиме processes: статусы учетных '
+    'записей хранятся в процессах-обработчиках.'
+)
 ERROR_IN_MAIN = (
     'Сбой в работе программы!\n{error}'
 )
@@ -52,7 +180,13 @@ ERROR_IN_RESPONSE = (
     '\t- ключ: {key};\n'
     '\t- данные по ключу: {data_by_key};\n'
 )
-ERROR_REPEAT = 'При новом запросе обнаружилась та же ошибка.'
+ERROR_DIGEST = 'Повторы ошибок за последние {minutes} мин:\n{lines}'
+ERROR_REPEAT = (
+    'При новом запросе обнаружилась та же ошибка {label} '
+    '(повторов с начала окна сводки: {count}).'
+)
+HISTORY_EMPTY = 'Смен статусов работ пока не было.'
+HISTORY_LINE = '{date}: "{homework}" - {status}'
 FIELDS_IS_OK = (
     'Основные поля в ответе API соответствуют документации.'
 )
@@ -60,17 +194,20 @@ HOMEWORKS_IS_NOT_LIST = (
     '\tОжидаемый тип данных набора домашних работ - список!\n'
     '\tПолученный тип данных набора домашних работ: {type_data}!'
 )
-HOMEWORKS_IS_LIST = 'Набор домашних работ поступил в виде списка.'
-KEY_IN_DICT = (
-    'В словаре данных из ответа API присутствует ключ "homeworks".'
+HOMEWORK_IS_NOT_DICT = (
+    '\tОжидаемый тип данных домашней работы - словарь!\n'
+    '\tПолученный тип данных домашней работы: {type_data}!'
 )
 KEY_NOT_IN_DICT = (
     '\tВ словаре данных из ответа API отсутвует ключ "homeworks"!'
 )
-ALL_KEYS_IN_HOMEWORK = 'Все ключи присутствуют в homework.'
+KEY_NOT_IN_ACCOUNT = (
+    'В учетной записи №{index} отсутствует ключ "{key}".'
+)
 KEY_NOT_IN_HOMEWORK = (
-    '\tОшибка данных: в объекте "homework" отсутствует ключ "{key}"!'
+    '\tОшибка данных: в объекте "{path}" отсутствует ключ "{key}"!'
 )
+METRICS_STARTED = 'Показатели доступны по адресу http://{host}:{port}{path}'
 MESSAGE_SEND = 'Бот отправил следующее сообщение:\n\t{message}'
 MESSAGE_SEND_ERROR = (
     '\tОшибка при отправке ботом сообщения!\n'
@@ -79,17 +216,26 @@ MESSAGE_SEND_ERROR = (
 NEW_STATUS = (
     'Изменился статус проверки работы "{homework}". {status}'
 )
+NEXT_POLL = (
+    'Следующий опрос учетной записи "{name}" через {interval:.0f} с '
+    '(режим: {reason}).'
+)
 NOT_NEW_STATUSES = 'Новые статусы домашних работ отсутсвуют.'
+OUTBOX_STARTED = (
+    'Запущена очередь отправки: до {rate} сообщений в секунду всего, '
+    'до {chat_rate} - в один чат, потоков отправки {workers}, '
+    'не больше {in_flight} сообщений в очереди.'
+)
 NOT_TOKEN = (
     'Отсутствует(ют) обязательная(ые) переменная(ые) окружения: {tokens}!\n'
     'Программа принудительно остановлена.'
 )
-RESPONSE_IS_DICT = 'Данные в ответе API поступили в виде словаря.'
 RESPONSE_IS_NOT_DICT = (
     '\tОжидаемый тип данных в ответе API - словарь!\n'
     '\tПолученный тип данных в ответе API: {type_data}!'
 )
 RESPONSE_GET = 'Ответ от API успешно получен.'
+ROUND_ASYNC = 'Асинхронный обход учетных записей: {count}.'
 REQUEST_EXCEPTION = (
     '\tСбой в работе программы: ошибка при работе с запросом!\n'
     '\tДанные отправленного запроса:\n'
@@ -100,49 +246,406 @@ REQUEST_EXCEPTION = (
     '\tОшибка:\n\t{error}'
 )
 REQUEST_SEND = 'Запрос отправлен.'
-STATUS_IS_KNOWN = 'Получен учтенный статус homework.'
+STREAM_INTERRUPTED = 'Чтение ответа API прервано: {error}'
+STANDBY = (
+    'Учетную запись "{name}" опрашивает другой экземпляр бота, '
+    'проверка аренды через {interval:.0f} с.'
+)
+PROFILE_REQUESTED = 'Запрошено профилирование: {target}.'
+PROFILE_TARGET_SHARDS = 'процессы-обработчики, {cycles} циклов'
+PROFILE_TARGET_SELF = '{cycles} циклов опроса'
+PROFILE_UNSUPPORTED = 'Профилирование не поддерживается в режиме {mode}.'
+SHARD_ACCOUNTS = (
+    'Обработчик {node}: получено учетных записей {assigned}, '
+    'передано {released}, всего {count}.'
+)
+SHARD_RELEASE_TIMEOUT_EXPIRED = (
+    'Учетная запись "{name}" передана до завершения отправки: '
+    'неотправленные статусы будут получены повторно.'
+)
+SHARD_UNKNOWN_ACCOUNT = (
+    'Учетной записи "{name}" нет в файле учетных записей.'
+)
+SESSION_CREATED = (
+    'Создана сессия HTTP: пулов соединений - {connections}, '
+    'соединений в пуле - {maxsize}, таймауты (подключение, чтение) - '
+    '{timeout}.'
+)
+STATE_OPENED = 'Состояние опроса хранится в файле {path}.'
+STATE_RESTORED = (
+    'Состояние учетной записи "{name}" восстановлено: курсор {from_date}, '
+    'известных статусов - {count}.'
+)
+STATUS_EMPTY = 'Работ с известным статусом нет.'
+STATUS_FRESHNESS = (
+    'Данные на {checked_at:%d.%m.%Y %H:%M} '
+    '(получены {minutes} мин назад).'
+)
+STATUS_LINE = '"{homework}": {status}'
+STATUS_NOT_CHECKED = 'Статусы работ для этого чата еще не получены.'
 TOKENS_IS_OK = 'Токены проверены. Успех!'
+TRANSITIONS_SKIPPED = 'Пропущено уже доставленных статусов: {count}.'
+UNKNOWN_CHAT = 'Этот чат не подключен к боту.'
 UNKNOWN_STATUS = (
-    'Неучтенный статус домашней работы: {status}!'
+    'Неучтенный статус домашней работы {path}: {value}!'
+)
+UNKNOWN_LEASE_BACKEND = (
+    'Неизвестный способ аренды LEASE_BACKEND: {backend}! '
+    'Допустимые значения: {backends}.'
 )
+UNKNOWN_WORKER_MODE = (
+    'Неизвестный режим работы WORKER_MODE: {mode}! '
+    'Допустимые значения: {modes}.'
+)
+
+HOMEWORK_SCHEMA = Schema(
+    dict,
+    keys={
+        'homework_name': None,
+        'status': Schema(
+            choices=HOMEWORK_VERDICTS, value_message=UNKNOWN_STATUS
+        )
+    },
+    type_message=HOMEWORK_IS_NOT_DICT,
+    key_message=KEY_NOT_IN_HOMEWORK
+)
+RESPONSE_SCHEMA = Schema(
+    dict,
+    keys={
+        'homeworks': Schema(
+            list, items=HOMEWORK_SCHEMA, type_message=HOMEWORKS_IS_NOT_LIST
+        )
+    },
+    type_message=RESPONSE_IS_NOT_DICT,
+    key_message=KEY_NOT_IN_DICT
+)
+validate_response = Validator(RESPONSE_SCHEMA)
+validate_homework = Validator(HOMEWORK_SCHEMA, 'homework')
+validate_stream_homework = Validator(HOMEWORK_SCHEMA, 'homeworks[{}]')
+
+
+class ResponseStatusError(ValueError):
+    """Исключение: API вернул код ответа, отличный от 200."""
+
+    def __init__(self, message, status_code):
+        """Метод создания исключения с кодом ответа."""
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_server_error(error):
+    """Функция проверки, что ошибка - ответ API с кодом 5xx."""
+    return getattr(error, 'status_code', 0) >= HTTPStatus.INTERNAL_SERVER_ERROR
 
 
 logger = logging.getLogger(__name__)
+api_retry = RetryPolicy(
+    attempts=API_RETRIES,
+    base_delay=API_RETRY_DELAY,
+    max_delay=API_RETRY_DELAY_MAX
+)
+api_breaker = CircuitBreaker(
+    'API Практикум.Домашка',
+    threshold=BREAKER_THRESHOLD,
+    reset_timeout=BREAKER_TIMEOUT,
+    is_failure=is_server_error
+)
+http_session = None
+state_store = None
+outbox = None
+updater = None
+lease_keeper = None
+supervisor = None
+profiler = CycleProfiler(cycles=PROFILE_CYCLES)
 
+metrics = Registry()
+stage_seconds = metrics.histogram(
+    'homework_bot_stage_seconds',
+    'Длительность этапа цикла опроса, с.',
+    label='stage'
+)
+stage_errors = metrics.counter(
+    'homework_bot_stage_errors_total',
+    'Число ошибок этапа цикла опроса.',
+    label='stage'
+)
+api_responses = metrics.counter(
+    'homework_bot_api_responses_total',
+    'Число ответов API Практикум.Домашка по кодам.',
+    label='code'
+)
+metrics.gauge(
+    'homework_bot_api_breaker_open',
+    'Разомкнут ли выключатель API Практикум.Домашка.',
+    lambda: int(api_breaker.state != BREAKER_CLOSED)
+)
+metrics.gauge(
+    'homework_bot_outbox_depth',
+    'Число сообщений в очереди отправки.',
+    lambda: 0 if outbox is None else outbox.depth
+)
+metrics.gauge(
+    'homework_bot_outbox_sending',
+    'Число сообщений, которые сейчас отправляются.',
+    lambda: 0 if outbox is None else outbox.sending
+)
 
-def check_tokens():
-    """Функция проверки наличия необходимых токенов."""
-    tokens = [token for token in TOKENS if not globals()[token]]
+
+def stage(name):
+    """Функция замера длительности и ошибок этапа цикла опроса.
+
+    Длительность этапа попадает и в запись о текущем цикле, если она
+    ведется.
+    """
+    trace = current_trace()
+    return Timer(
+        stage_seconds.labels(name),
+        stage_errors.labels(name),
+        None if trace is None else partial(trace.add_stage, name)
+    )
+
+
+def cycle_trace(account):
+    """Функция-контекст записи о цикле опроса учетной записи.
+
+    Если TRACE_CYCLES выключен, запись не ведется.
+    """
+    return trace_cycle(account.name) if TRACE_CYCLES else nullcontext()
+
+
+def count_payload(size):
+    """Функция учета байтов ответа API в записи о текущем цикле."""
+    trace = current_trace()
+    if trace is not None:
+        trace.payload_bytes += size
+
+
+def check_variables(names):
+    """Функция проверки наличия переменных окружения из набора."""
+    tokens = [token for token in names if not globals()[token]]
     if tokens:
         message = NOT_TOKEN.format(tokens=tokens)
         logger.critical(message)
         raise ValueError(message)
 
 
+def check_tokens():
+    """Функция проверки наличия необходимых токенов."""
+    check_variables(TOKENS)
+
+
 def send_message(bot, message):
     """Функция отправки сообщения в чат Telegram."""
+    return send_message_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_message_to_chat(bot, chat_id, message, passthrough=()):
+    """Функция отправки сообщения в указанный чат Telegram.
+
+    Исключения из passthrough не перехватываются, а передаются выше.
+    """
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logger.debug(MESSAGE_SEND.format(message=message))
+        with stage('send'):
+            bot.send_message(chat_id, message)
+        logger.debug(LazyMessage(MESSAGE_SEND, message=message))
         return True
+    except passthrough:
+        raise
     except Exception as error:
         logger.exception(
-            MESSAGE_SEND_ERROR.format(
+            LazyMessage(
+                MESSAGE_SEND_ERROR,
                 message=message,
                 error=error
             )
         )
 
 
+def create_session(pool_maxsize=POOL_MAXSIZE):
+    """Функция создания сессии HTTP с пулом постоянных соединений."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    logger.debug(
+        LazyMessage(
+            SESSION_CREATED,
+            connections=POOL_CONNECTIONS,
+            maxsize=pool_maxsize,
+            timeout=REQUEST_TIMEOUT
+        )
+    )
+    return session
+
+
+def setup_http_session(pool_maxsize=POOL_MAXSIZE):
+    """Функция подключения общей сессии HTTP для запросов к API."""
+    global http_session
+    http_session = create_session(pool_maxsize)
+    return http_session
+
+
+def setup_state_store(path):
+    """Функция подключения хранилища состояния опроса."""
+    global state_store
+    state_store = StateStore(path)
+    logger.info(LazyMessage(STATE_OPENED, path=path))
+    return state_store
+
+
+def setup_metrics_server(host, port):
+    """Функция запуска сервера показателей в фоновом потоке."""
+    server = start_metrics_server(
+        metrics, host, port, actions={PROFILE_PATH: request_profile}
+    )
+    logger.info(LazyMessage(
+        METRICS_STARTED, host=host, port=port, path=METRICS_PATH
+    ))
+    return server
+
+
+def setup_profiling():
+    """Функция включения профилирования по сигналу PROFILE_SIGNAL.
+
+    Сигнал (SIGUSR1, где он есть) или запрос POST /profile?cycles=N к
+    серверу показателей включают cProfile и tracemalloc на следующие
+    циклы опроса; профиль сохраняется в каталог PROFILE_DIR. В режиме
+    asyncio профилирование не поддерживается, и сигнал не назначается.
+    """
+    profiler.directory = PROFILE_DIR
+    if PROFILE_SIGNAL is not None and WORKER_MODE != 'asyncio':
+        signal.signal(PROFILE_SIGNAL, handle_profile_signal)
+
+
+def handle_profile_signal(signum, frame):
+    """Функция обработки сигнала профилирования.
+
+    Супервизор передает сигнал процессам-обработчикам.
+    """
+    if supervisor is not None:
+        supervisor.signal(signum)
+    else:
+        profiler.request()
+
+
+def request_profile(params):
+    """Функция запроса профилирования от сервера показателей.
+
+    Число циклов меньше 1 и запрос в режиме asyncio - ValueError
+    (ответ 400).
+    """
+    if WORKER_MODE == 'asyncio':
+        raise ValueError(PROFILE_UNSUPPORTED.format(mode=WORKER_MODE))
+    cycles = parse_cycles(params.get('cycles'), PROFILE_CYCLES)
+    if supervisor is not None:
+        from engine.sharding import PROFILE
+        supervisor.broadcast((PROFILE, cycles))
+        target = PROFILE_TARGET_SHARDS.format(cycles=cycles)
+    else:
+        target = PROFILE_TARGET_SELF.format(cycles=profiler.request(cycles))
+    message = PROFILE_REQUESTED.format(target=target)
+    logger.info(message)
+    return message
+
+
+def setup_leases(accounts):
+    """Функция захвата аренды учетных записей, если она включена.
+
+    Опрашивает учетную запись только экземпляр, владеющий ее арендой;
+    остальные ждут в резерве. При получении аренды состояние учетной
+    записи перечитывается из хранилища, чтобы продолжить опрос с
+    курсора прежнего владельца, поэтому без общего STATE_FILE аренда
+    не включается.
+    """
+    global lease_keeper
+    if not LEASE_BACKEND:
+        return None
+    check_variables(LEASE_TOKENS)
+    if LEASE_BACKEND not in LEASE_BACKENDS:
+        raise ValueError(UNKNOWN_LEASE_BACKEND.format(
+            backend=LEASE_BACKEND, backends=tuple(LEASE_BACKENDS)
+        ))
+    from engine import lease
+    backend_name, default_path = LEASE_BACKENDS[LEASE_BACKEND]
+    by_name = {account.name: account for account in accounts}
+
+    def restore(names):
+        """Функция восстановления учетных записей с новой арендой."""
+        for name in names:
+            restore_account(by_name[name])
+
+    lease_keeper = lease.LeaseKeeper(
+        getattr(lease, backend_name)(LEASE_PATH or default_path),
+        by_name,
+        ttl=LEASE_TTL,
+        on_acquire=restore
+    ).start()
+    return lease_keeper
+
+
+def is_active(account):
+    """Функция проверки, что этот экземпляр опрашивает учетную запись."""
+    return lease_keeper is None or lease_keeper.holds(account.name)
+
+
+def wait_standby(account):
+    """Функция планирования проверки аренды для учетной записи в резерве."""
+    interval = lease_keeper.period
+    account.next_poll = time.monotonic() + interval
+    logger.debug(LazyMessage(STANDBY, name=account.name, interval=interval))
+    return interval
+
+
+def setup_outbox(bot, rate=None):
+    """Функция запуска очереди отправки сообщений в Telegram.
+
+    rate - общий лимит сообщений в секунду этой очереди (по умолчанию
+    TELEGRAM_RATE). Сообщения отправляют SEND_WORKERS потоков (не
+    меньше одного), а если задан SEND_MAX_IN_FLIGHT, постановка в
+    очередь ждет, пока в ней не больше SEND_MAX_IN_FLIGHT
+    недоставленных сообщений.
+    """
+    global outbox
+    rate = rate or TELEGRAM_RATE
+    workers = max(1, SEND_WORKERS)
+    outbox = Outbox(
+        partial(
+            send_message_to_chat,
+            bot,
+            passthrough=(telegram.error.RetryAfter,)
+        ),
+        rate=rate,
+        chat_rate=CHAT_RATE,
+        burst=max(1, rate),
+        workers=workers,
+        max_in_flight=SEND_MAX_IN_FLIGHT or None
+    ).start()
+    logger.info(LazyMessage(
+        OUTBOX_STARTED,
+        rate=f'{rate:g}',
+        chat_rate=CHAT_RATE,
+        workers=workers,
+        in_flight=SEND_MAX_IN_FLIGHT or '∞'
+    ))
+    return outbox
+
+
 def get_api_answer(timestamp):
     """Функция получения ответа API Практикум.Домашка."""
-    request_data = {
-        'url': ENDPOINT,
-        'headers': HEADERS,
-        'params': {'from_date': timestamp}
-    }
+    return request_api_answer(timestamp, HEADERS)
+
+
+def fetch_api_response(request_data, **options):
+    """Функция запроса к API и проверки кода ответа."""
+    transport = requests if http_session is None else http_session
     try:
-        response = requests.get(**request_data)
+        with stage('request'):
+            response = transport.get(
+                **request_data, timeout=REQUEST_TIMEOUT, **options
+            )
     except requests.exceptions.RequestException as error:
         raise ConnectionError(
             REQUEST_EXCEPTION.format(
@@ -150,113 +653,1114 @@ def get_api_answer(timestamp):
                 **request_data
             )
         )
-    response_data = response.json()
+    api_responses.labels(int(response.status_code)).inc()
     if response.status_code != HTTPStatus.OK:
-        raise ValueError(
+        raise ResponseStatusError(
             CODE_NOT_OK.format(
                 status_code=response.status_code,
                 **request_data
+            ),
+            response.status_code
+        )
+    return response
+
+
+def check_error_key(request_data, key, value):
+    """Функция проверки, что ключ ответа API не сообщает об ошибке."""
+    if key in KEYS_IN_RESPONSE_WITH_CODE_NOT_OK:
+        raise ValueError(
+            ERROR_IN_RESPONSE.format(
+                key=key,
+                data_by_key=value,
+                **request_data
             )
         )
+
+
+def request_api_answer(timestamp, headers):
+    """Функция получения ответа API с заголовками учетной записи."""
+    request_data = {
+        'url': ENDPOINT,
+        'headers': headers,
+        'params': {'from_date': timestamp}
+    }
+    response = fetch_api_response(request_data)
+    with stage('decode'):
+        response_data = response.json()
+    count_payload(len(getattr(response, 'content', b'')))
     for key in KEYS_IN_RESPONSE_WITH_CODE_NOT_OK:
         if key in response_data:
-            raise ValueError(
-                ERROR_IN_RESPONSE.format(
-                    key=key,
-                    data_by_key=response_data[key],
-                    **request_data
-                )
-            )
+            check_error_key(request_data, key, response_data[key])
     logger.debug(CODE_OK)
     return response_data
 
 
-def check_response(response):
-    """Функция проверки ответа API на соответствие документации."""
-    if not isinstance(response, dict):
-        raise TypeError(
-            RESPONSE_IS_NOT_DICT.format(type_data=type(response))
-        )
-    logger.debug(RESPONSE_IS_DICT)
-    if 'homeworks' not in response:
-        raise KeyError(KEY_NOT_IN_DICT)
-    logger.debug(KEY_IN_DICT)
-    homeworks = response["homeworks"]
-    if not isinstance(homeworks, list):
-        raise TypeError(
-            HOMEWORKS_IS_NOT_LIST.format(type_data=type(homeworks))
+def iter_chunks(response):
+    """Функция чтения тела ответа порциями с закрытием соединения."""
+    try:
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            count_payload(len(chunk))
+            yield chunk
+    except requests.exceptions.RequestException as error:
+        raise ConnectionError(STREAM_INTERRUPTED.format(error=error))
+    finally:
+        response.close()
+
+
+def stream_api_answer(timestamp, headers):
+    """Функция получения ответа API для потокового разбора.
+
+    Возвращает ObjectStream, который выдает домашние работы по одной
+    по мере чтения ответа.
+    """
+    request_data = {
+        'url': ENDPOINT,
+        'headers': headers,
+        'params': {'from_date': timestamp}
+    }
+    response = fetch_api_response(request_data, stream=True)
+    return ObjectStream(
+        iter_chunks(response),
+        'homeworks',
+        on_value=partial(check_error_key, request_data)
+    )
+
+
+def guarded_api_answer(request, timestamp):
+    """Функция запроса к API с повторами и автоматическим выключателем.
+
+    Сетевые сбои повторяются с короткой случайной задержкой, а после
+    серии ответов 5xx выключатель перестает обращаться к API на время.
+    """
+    return api_breaker.call(api_retry.call, request, timestamp)
+
+
+class Homework:
+    """Класс записи о домашней работе из ответа API.
+
+    Хранит только нужные боту поля; отсутствующее в ответе поле
+    равно None. work - ключ работы в индексах и хранилище состояния.
+    """
+
+    __slots__ = (
+        'id', 'name', 'status', 'date_updated', 'reviewer_comment', 'work'
+    )
+
+    def __init__(self, id=None, name=None, status=None, date_updated=None,
+                 reviewer_comment=None):
+        """Метод создания записи о домашней работе."""
+        self.id = id
+        self.name = name
+        self.status = status
+        self.date_updated = date_updated
+        self.reviewer_comment = reviewer_comment
+        self.work = str(name if id is None else id)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Метод создания записи из проверенного словаря работы API."""
+        get = data.get
+        return cls(
+            get('id'),
+            get('homework_name'),
+            get('status'),
+            get('date_updated'),
+            get('reviewer_comment')
         )
-    logger.debug(HOMEWORKS_IS_LIST)
+
+
+def as_homework(homework):
+    """Функция приведения домашней работы к записи Homework.
+
+    Словарь проверяется по схеме HOMEWORK_SCHEMA; запись считается
+    уже проверенной при создании.
+    """
+    if isinstance(homework, Homework):
+        return homework
+    return Homework.from_dict(validate_homework(homework))
+
+
+def check_response(response):
+    """Функция проверки ответа API на соответствие документации.
+
+    Ответ, набор работ, обязательные ключи и известность статусов
+    проверяются за один проход по схеме RESPONSE_SCHEMA. Возвращает
+    список записей Homework.
+    """
+    homeworks = validate_response(response)['homeworks']
     logger.debug(FIELDS_IS_OK)
-    return homeworks
+    return [Homework.from_dict(homework) for homework in homeworks]
 
 
 def parse_status(homework):
     """Функция извлечения статуса домашней работы."""
-    for key in KEYS_IN_HOMEWORK:
-        if key not in homework:
-            raise KeyError(
-                KEY_NOT_IN_HOMEWORK.format(key=key)
-            )
-    logger.debug(ALL_KEYS_IN_HOMEWORK)
-    homework_status = homework['status']
-    if homework_status not in HOMEWORK_VERDICTS:
-        raise ValueError(
-            UNKNOWN_STATUS.format(status=homework_status)
-        )
-    logger.debug(STATUS_IS_KNOWN)
+    homework = as_homework(homework)
     message = NEW_STATUS.format(
-        homework=homework['homework_name'],
-        status=HOMEWORK_VERDICTS[homework_status]
+        homework=homework.name,
+        status=HOMEWORK_VERDICTS[homework.status]
     )
     logger.info(message)
     return message
 
 
-def main():
-    """Основная логика работы бота."""
-    check_tokens()
+class Account:
+    """Класс учетной записи: токен Практикума, чат и состояние опроса."""
+
+    def __init__(self, practicum_token, chat_id, name=None):
+        """Метод создания учетной записи с курсором от текущего момента."""
+        self.name = name or str(chat_id)
+        self.chat_id = chat_id
+        self.headers = {'Authorization': f'OAuth {practicum_token}'}
+        self.timestamp = int(time.time())
+        self.error_fingerprint = ''
+        self.errors = ErrorDigest(ERROR_DIGEST_PERIOD)
+        self.statuses = {}
+        self.delivered = DeliveryIndex(DELIVERED_LIMIT)
+        self.pending = set()
+        self.ledger = CursorLedger()
+        self.view = StatusView(HISTORY_LIMIT, VIEW_LIMIT)
+        self.schedule = AdaptiveInterval(
+            RETRY_PERIOD,
+            active=REVIEWING_PERIOD,
+            idle=IDLE_PERIOD,
+            idle_after=IDLE_AFTER,
+            error=ERROR_PERIOD,
+            error_max=ERROR_PERIOD_MAX
+        )
+        self.next_poll = 0.0
+
+    def plan_next(self):
+        """Метод выбора интервала до следующего опроса учетной записи."""
+        interval, reason = self.schedule.next_interval()
+        self.next_poll = time.monotonic() + interval
+        logger.debug(LazyMessage(
+            NEXT_POLL, name=self.name, interval=interval, reason=reason
+        ))
+        return interval
+
+    def get_answer(self, timestamp):
+        """Метод получения ответа API для учетной записи."""
+        return guarded_api_answer(
+            partial(request_api_answer, headers=self.headers), timestamp
+        )
+
+    def open_stream(self, timestamp):
+        """Метод получения ответа API для потокового разбора."""
+        return guarded_api_answer(
+            partial(stream_api_answer, headers=self.headers), timestamp
+        )
+
+    def send(self, bot, message):
+        """Метод отправки сообщения в чат учетной записи."""
+        return send_message_to_chat(bot, self.chat_id, message)
+
+
+class EnvAccount(Account):
+    """Класс единственной учетной записи из переменных окружения."""
+
+    def __init__(self):
+        """Метод создания учетной записи из переменных окружения."""
+        super().__init__(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, name='env')
+
+    def get_answer(self, timestamp):
+        """Метод получения ответа API через get_api_answer."""
+        return guarded_api_answer(get_api_answer, timestamp)
+
+    def send(self, bot, message):
+        """Метод отправки сообщения через send_message."""
+        return send_message(bot, message)
+
+
+def load_accounts(path):
+    """Функция загрузки учетных записей из JSON-файла."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        if not isinstance(data, list):
+            raise TypeError(ACCOUNTS_NOT_LIST.format(type_data=type(data)))
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                raise TypeError(ACCOUNT_NOT_DICT.format(
+                    index=index, type_data=type(item)
+                ))
+            for key in KEYS_IN_ACCOUNT:
+                if key not in item:
+                    raise KeyError(
+                        KEY_NOT_IN_ACCOUNT.format(index=index, key=key)
+                    )
+    except (OSError, ValueError, TypeError, KeyError) as error:
+        raise ValueError(ACCOUNTS_FILE_ERROR.format(path=path, error=error))
+    accounts = [
+        Account(item['practicum_token'], item['chat_id'], item.get('name'))
+        for item in data
+    ]
+    if STATE_FILE or LEASE_BACKEND:
+        check_unique_names(accounts)
+    return accounts
+
+
+def check_unique_names(accounts):
+    """Функция проверки, что имена учетных записей не повторяются.
+
+    По имени (по умолчанию - chat_id) хранятся курсор и статусы
+    учетной записи в STATE_FILE и ее аренда.
+    """
+    repeated = sorted(
+        name for name, count in Counter(
+            account.name for account in accounts
+        ).items() if count > 1
+    )
+    if repeated:
+        raise ValueError(ACCOUNT_NAMES_NOT_UNIQUE.format(names=repeated))
+
+
+def restore_account(account):
+    """Функция восстановления состояния учетной записи из хранилища."""
+    if state_store is None:
+        return
+    state = state_store.load(account.name)
+    if state is None:
+        return
+    account.timestamp = state.from_date
+    account.error_fingerprint = state.error_fingerprint
+    account.statuses = state.statuses
+    for work, (status, date_updated) in state.delivered.items():
+        account.delivered.mark(work, status, date_updated)
+    account.schedule.observe(state.statuses)
+    account.view.restore(state.delivered, state.from_date)
+    logger.info(
+        LazyMessage(
+            STATE_RESTORED,
+            name=account.name,
+            from_date=state.from_date,
+            count=len(state.statuses)
+        )
+    )
+
+
+def configured_accounts():
+    """Функция получения учетных записей для текущих настроек запуска."""
+    if ACCOUNTS_FILE:
+        check_variables(ACCOUNTS_TOKENS)
+        accounts = load_accounts(ACCOUNTS_FILE)
+    else:
+        check_tokens()
+        accounts = [EnvAccount()]
     logger.debug(TOKENS_IS_OK)
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    message_error_last = ''
+    for account in accounts:
+        restore_account(account)
+    logger.info(LazyMessage(
+        ACCOUNTS_LOADED, count=len(accounts), workers=ACCOUNT_WORKERS
+    ))
+    return accounts
+
+
+def create_bot():
+    """Функция создания бота с пулом соединений на потоки опроса и отправки."""
+    from telegram.utils.request import Request
+    return telegram.Bot(
+        token=TELEGRAM_TOKEN,
+        request=Request(con_pool_size=ACCOUNT_WORKERS + SEND_WORKERS)
+    )
+
+
+def transition(homework):
+    """Функция получения перехода статуса: (работа, статус, дата)."""
+    homework = as_homework(homework)
+    return homework.work, homework.status, homework.date_updated
+
+
+def process_response(response, account):
+    """Функция проверки ответа API и подготовки сообщений о статусах.
+
+    Возвращает проверенные домашние работы, еще не доставленные
+    переходы статусов из них и сообщения об этих переходах.
+    """
+    with stage('validate'):
+        homeworks = check_response(response)
+    if not homeworks:
+        logger.info(NOT_NEW_STATUSES)
+        return [], [], []
+    return (homeworks, *select_fresh(homeworks, account))
+
+
+def select_fresh(homeworks, account):
+    """Функция отбора недоставленных переходов и подготовки сообщений."""
+    fresh = [
+        homework for homework in homeworks
+        if transition(homework) not in account.pending
+        and account.delivered.is_new(*transition(homework))
+    ]
+    if len(fresh) < len(homeworks):
+        logger.debug(
+            LazyMessage(TRANSITIONS_SKIPPED, count=len(homeworks) - len(fresh))
+        )
+    with stage('parse'):
+        messages = [parse_status(homework) for homework in fresh]
+    trace = current_trace()
+    if trace is not None:
+        trace.homeworks += len(homeworks)
+        for homework in fresh:
+            trace.add_transition(
+                homework.work,
+                account.statuses.get(homework.work),
+                homework.status
+            )
+    return fresh, messages
+
+
+def iter_batches(items, size):
+    """Функция разбиения перебора на списки не длиннее size."""
+    items = iter(items)
     while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def observe_statuses(account, homeworks):
+    """Функция учета статусов работ планировщиком и представлением."""
+    items = [
+        (
+            homework.work,
+            homework.name or homework.work,
+            homework.status,
+            homework.date_updated
+        )
+        for homework in homeworks
+    ]
+    account.schedule.observe({work: status for work, _, status, _ in items})
+    account.view.update(items, time.time())
+
+
+def iter_parts(messages, limit=MESSAGE_LIMIT):
+    """Функция разбиения сообщений на части не длиннее limit.
+
+    Для каждой части возвращает номера сообщений, которые в ней
+    завершаются.
+    """
+    current = ''
+    included = []
+    for index, message in enumerate(messages):
+        candidate = (
+            current + BATCH_SEPARATOR + message if current else message
+        )
+        if len(candidate) <= limit:
+            current = candidate
+            included.append(index)
+            continue
+        if current:
+            yield current, included
+        while len(message) > limit:
+            yield message[:limit], []
+            message = message[limit:]
+        current = message
+        included = [index]
+    if current:
+        yield current, included
+
+
+def pack_messages(messages, limit=MESSAGE_LIMIT):
+    """Функция объединения сообщений в минимум сообщений Telegram."""
+    return [part for part, _ in iter_parts(messages, limit)]
+
+
+def mark_delivered(account, homeworks):
+    """Функция учета доставленных переходов статусов работ."""
+    delivered = {}
+    for homework in homeworks:
+        work, status, date_updated = transition(homework)
+        account.delivered.mark(work, status, date_updated)
+        account.statuses[work] = status
+        delivered[work] = (status, date_updated)
+    if state_store is not None and delivered:
+        state_store.save_statuses(account.name, delivered)
+
+
+def send_batch(bot, account, messages, homeworks=()):
+    """Функция отправки пакета сообщений: истина, если доставлен весь.
+
+    Работы из доставленных частей сразу отмечаются в индексе, поэтому
+    при повторе пакета они не отправляются второй раз.
+    """
+    parts = list(iter_parts(messages))
+    logger.debug(LazyMessage(
+        BATCH_READY, count=len(messages), parts=len(parts)
+    ))
+    for part, included in parts:
+        if not account.send(bot, part):
+            return False
+        mark_delivered(account, [homeworks[index] for index in included])
+    return True
+
+
+def commit_cursor(account, timestamp):
+    """Функция сдвига курсора учетной записи после доставки статусов."""
+    account.timestamp = timestamp
+    if state_store is not None:
+        state_store.checkpoint(account.name, account.timestamp)
+
+
+def settle_batch(account, entry, delivered):
+    """Функция завершения пакета и фиксации курсора по его итогу."""
+    cursor = account.ledger.close(entry, delivered)
+    if cursor is not None:
+        commit_cursor(account, cursor)
+
+
+def part_sent(account, homeworks, future):
+    """Функция учета части пакета, завершенной очередью отправки."""
+    if future.result():
+        mark_delivered(account, homeworks)
+    account.pending.difference_update(map(transition, homeworks))
+
+
+def enqueue_parts(account, messages, homeworks):
+    """Функция постановки частей пакета в очередь отправки.
+
+    Возвращает Future частей пакета.
+    """
+    parts = list(iter_parts(messages))
+    logger.debug(LazyMessage(
+        BATCH_READY, count=len(messages), parts=len(parts)
+    ))
+    account.pending.update(map(transition, homeworks))
+    futures = []
+    for part, included in parts:
+        future = outbox.put(account.chat_id, part)
+        future.add_done_callback(partial(
+            part_sent, account, [homeworks[index] for index in included]
+        ))
+        futures.append(future)
+    return futures
+
+
+def enqueue_batch(account, entry, messages, homeworks):
+    """Функция постановки пакета в очередь отправки без ожидания."""
+    when_all(
+        enqueue_parts(account, messages, homeworks),
+        partial(settle_batch, account, entry)
+    )
+
+
+def deliver_stream_batch(bot, account, messages, homeworks):
+    """Функция доставки пакета потокового разбора с ожиданием итога.
+
+    Возвращает истину, если доставлен весь пакет. Пакет ожидается и
+    при запущенной очереди отправки, поэтому в ней не больше одного
+    пакета учетной записи.
+    """
+    if outbox is None:
+        return send_batch(bot, account, messages, homeworks)
+    futures = enqueue_parts(account, messages, homeworks)
+    return all([future.result() for future in futures])
+
+
+def deliver(bot, account, response, messages, homeworks):
+    """Функция доставки пакета статусов и сдвига курсора после нее.
+
+    Если запущена очередь отправки, пакет ставится в очередь, а курсор
+    сдвигается по готовности всех его частей.
+    """
+    deliver_batch(
+        bot,
+        account,
+        response.get('current_date', account.timestamp),
+        messages,
+        homeworks
+    )
+
+
+def deliver_batch(bot, account, cursor, messages, homeworks):
+    """Функция доставки пакета статусов с фиксацией cursor после нее.
+
+    Пакет с cursor None курсор не сдвигает.
+    """
+    entry = account.ledger.open(cursor)
+    if outbox is None:
+        settle_batch(
+            account, entry, send_batch(bot, account, messages, homeworks)
+        )
+    else:
+        enqueue_batch(account, entry, messages, homeworks)
+
+
+def error_sent(account, error, future):
+    """Функция учета сообщения об ошибке, доставленного очередью."""
+    if future.result():
+        remember_error(account, error)
+
+
+def notify_error(bot, account, error, message):
+    """Функция отправки сообщения об ошибке учетной записи."""
+    if outbox is None:
+        if account.send(bot, message):
+            remember_error(account, error)
+        return
+    outbox.put(account.chat_id, message).add_done_callback(
+        partial(error_sent, account, error)
+    )
+
+
+def describe_error(account, error):
+    """Функция подготовки сообщения об ошибке без повторов.
+
+    Ошибки сравниваются по отпечатку (тип, код ответа и текст без
+    изменчивых частей). Повтор ошибки в окне сводки только считается
+    и записывается в журнал одной строкой без трассировки; ошибка,
+    отправленная последней, повторно не отправляется и в новом окне.
+    """
+    fingerprint = error_fingerprint(error)
+    label = error_label(error)
+    trace = current_trace()
+    if trace is not None:
+        trace.error = label
+    if not account.errors.record(fingerprint, label, time.monotonic()):
+        logger.warning(LazyMessage(
+            ERROR_REPEAT, label=label, count=account.errors.repeats(
+                fingerprint
+            )
+        ))
+        return None
+    message = ERROR_IN_MAIN.format(error=error)
+    logger.exception(message)
+    if fingerprint == account.error_fingerprint:
+        return None
+    return message
+
+
+def error_digest(account):
+    """Функция получения сводки повторов ошибок за истекшее окно."""
+    lines = account.errors.flush(time.monotonic())
+    if not lines:
+        return None
+    message = ERROR_DIGEST.format(
+        minutes=ERROR_DIGEST_PERIOD // 60, lines='\n'.join(lines)
+    )
+    logger.warning(message)
+    return message
+
+
+def send_error_digest(bot, account, message):
+    """Функция отправки сводки повторов ошибок в чат учетной записи."""
+    if outbox is None:
+        account.send(bot, message)
+    else:
+        outbox.put(account.chat_id, message)
+
+
+def remember_error(account, error):
+    """Функция запоминания последней отправленной ошибки."""
+    account.error_fingerprint = error_fingerprint(error)
+    if state_store is not None:
+        state_store.save_error(
+            account.name, account.timestamp, account.error_fingerprint
+        )
+
+
+def check_stream(bot, account):
+    """Функция проверки статусов с потоковым разбором ответа API.
+
+    Работы читаются пакетами по STREAM_BATCH, и каждый пакет
+    доставляется до чтения следующего, поэтому память не зависит от
+    длины истории. После недоставленного пакета следующие пакеты не
+    отправляются, а курсор не сдвигается: работы будут получены
+    повторно в следующем цикле.
+    """
+    stream = account.open_stream(account.timestamp)
+    logger.debug(RESPONSE_GET)
+    count = 0
+    delivered = True
+    for items in iter_batches(stream, STREAM_BATCH):
+        homeworks = [
+            Homework.from_dict(validate_stream_homework(item, index))
+            for index, item in enumerate(items, count)
+        ]
+        count += len(homeworks)
+        fresh, messages = select_fresh(homeworks, account)
+        observe_statuses(account, homeworks)
+        if delivered:
+            delivered = deliver_stream_batch(bot, account, messages, fresh)
+    if not stream.array_found:
+        raise KeyError(KEY_NOT_IN_DICT)
+    if not count:
+        observe_statuses(account, [])
+        logger.info(NOT_NEW_STATUSES)
+        return
+    if not delivered:
+        return
+    deliver_batch(
+        bot,
+        account,
+        stream.values.get('current_date', account.timestamp),
+        [],
+        []
+    )
+
+
+def account_cycle(bot, account):
+    """Генератор одного цикла проверки статусов учетной записи.
+
+    Блокирующие вызовы (запросы к API и к Telegram) генератор не
+    выполняет, а выдает без аргументов; результат вызова или его
+    исключение передается обратно. Поэтому цикл общий для потоков и
+    asyncio, а режимы различаются только способом вызова.
+    """
+    logger.debug(LazyMessage(ACCOUNT_CHECK, name=account.name))
+    with cycle_trace(account):
         try:
             logger.debug(REQUEST_SEND)
-            response = get_api_answer(timestamp)
+            if STREAM_JSON:
+                yield partial(check_stream, bot, account)
+                return
+            response = yield partial(account.get_answer, account.timestamp)
             logger.debug(RESPONSE_GET)
-            homeworks = check_response(response)
-            if not homeworks:
-                logger.info(NOT_NEW_STATUSES)
-            else:
-                homework = homeworks[0]
-                message = parse_status(homework)
-                if send_message(bot, message):
-                    timestamp = response.get('current_date', timestamp)
+            homeworks, fresh, messages = process_response(response, account)
+            observe_statuses(account, homeworks)
+            if homeworks:
+                yield partial(
+                    deliver, bot, account, response, messages, fresh
+                )
         except Exception as error:
-            message = ERROR_IN_MAIN.format(error=error)
-            logger.exception(message)
-            if message != message_error_last and send_message(bot, message):
-                message_error_last = message
-            else:
-                logger.debug(ERROR_REPEAT)
-        time.sleep(RETRY_PERIOD)
+            account.schedule.record_error()
+            message = describe_error(account, error)
+            if message:
+                yield partial(notify_error, bot, account, error, message)
+        finally:
+            digest = error_digest(account)
+            if digest:
+                yield partial(send_error_digest, bot, account, digest)
 
 
-if __name__ == '__main__':
+def resume_cycle(cycle, result=None, error=None):
+    """Функция продолжения цикла результатом или исключением вызова.
+
+    Возвращает следующий блокирующий вызов или None в конце цикла.
+    """
+    try:
+        if error is not None:
+            return cycle.throw(error)
+        return cycle.send(result)
+    except StopIteration:
+        return None
+
+
+def check_account(bot, account):
+    """Функция одного цикла проверки статусов учетной записи."""
+    cycle = account_cycle(bot, account)
+    call = resume_cycle(cycle)
+    while call is not None:
+        try:
+            result = call()
+        except BaseException as error:
+            call = resume_cycle(cycle, error=error)
+        else:
+            call = resume_cycle(cycle, result)
+
+
+async def check_account_async(bot, account):
+    """Корутина одного цикла проверки статусов учетной записи.
+
+    Блокирующие вызовы цикла выполняются в пуле потоков цикла событий,
+    проверка и разбор ответа - в самом цикле событий.
+    """
+    cycle = account_cycle(bot, account)
+    call = resume_cycle(cycle)
+    while call is not None:
+        try:
+            result = await asyncio.to_thread(call)
+        except BaseException as error:
+            call = resume_cycle(cycle, error=error)
+        else:
+            call = resume_cycle(cycle, result)
+
+
+async def poll_account_async(bot, account):
+    """Корутина бесконечного опроса учетной записи по ее расписанию."""
+    while True:
+        if is_active(account):
+            await check_account_async(bot, account)
+            await asyncio.sleep(account.plan_next())
+        else:
+            await asyncio.sleep(wait_standby(account))
+
+
+async def poll_accounts_async(bot, accounts):
+    """Корутина опроса всех учетных записей в одном цикле событий."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(ACCOUNT_WORKERS))
+    logger.debug(LazyMessage(ROUND_ASYNC, count=len(accounts)))
+    await asyncio.gather(
+        *(poll_account_async(bot, account) for account in accounts)
+    )
+
+
+def describe_freshness(checked_at, now=None):
+    """Функция описания, на какой момент получены статусы работ."""
+    now = time.time() if now is None else now
+    return STATUS_FRESHNESS.format(
+        checked_at=datetime.fromtimestamp(checked_at),
+        minutes=max(0, int(now - checked_at) // 60)
+    )
+
+
+def status_reply(account, now=None):
+    """Функция ответа на /status из последних полученных статусов."""
+    latest, _, checked_at = account.view.snapshot()
+    if checked_at is None:
+        return STATUS_NOT_CHECKED
+    lines = [
+        STATUS_LINE.format(
+            homework=title, status=HOMEWORK_VERDICTS.get(status, status)
+        )
+        for title, status, _ in latest
+    ]
+    return '\n'.join(
+        [describe_freshness(checked_at, now)] + (lines or [STATUS_EMPTY])
+    )
+
+
+def history_reply(account, now=None):
+    """Функция ответа на /history из последних смен статусов."""
+    _, history, checked_at = account.view.snapshot()
+    if checked_at is None:
+        return STATUS_NOT_CHECKED
+    lines = [
+        HISTORY_LINE.format(
+            date=date_updated,
+            homework=title,
+            status=HOMEWORK_VERDICTS.get(status, status)
+        )
+        for title, status, date_updated in reversed(history)
+    ]
+    return '\n'.join(
+        [describe_freshness(checked_at, now)] + (lines or [HISTORY_EMPTY])
+    )
+
+
+def reply_command(reply, chats, update, context):
+    """Функция ответа на команду без обращения к API Практикума."""
+    account = chats.get(str(update.effective_chat.id))
+    update.effective_message.reply_text(
+        UNKNOWN_CHAT if account is None else reply(account)
+    )
+
+
+def setup_commands(accounts):
+    """Функция запуска приема команд /status и /history."""
+    global updater
+    from telegram.ext import CommandHandler, Updater
+    chats = {str(account.chat_id): account for account in accounts}
+    commands = {'status': status_reply, 'history': history_reply}
+    updater = Updater(token=TELEGRAM_TOKEN, workers=COMMAND_WORKERS)
+    for command, reply in commands.items():
+        updater.dispatcher.add_handler(
+            CommandHandler(command, partial(reply_command, reply, chats))
+        )
+    updater.start_polling()
+    logger.info(LazyMessage(
+        COMMANDS_STARTED,
+        commands=', '.join('/' + command for command in commands)
+    ))
+    return updater
+
+
+def main():
+    """Основная логика работы бота."""
+    check_tokens()
+    logger.debug(TOKENS_IS_OK)
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    if SEND_WORKERS:
+        setup_outbox(create_bot())
+    account = EnvAccount()
+    restore_account(account)
+    setup_leases([account])
+    if BOT_COMMANDS:
+        setup_commands([account])
+    while True:
+        if is_active(account):
+            profiler.run(check_account, bot, account)
+            profiler.cycle_done()
+            interval = account.plan_next()
+        else:
+            interval = wait_standby(account)
+        time.sleep(interval)
+
+
+def main_accounts():
+    """Логика работы бота для набора учетных записей из файла."""
+    accounts = configured_accounts()
+    bot = create_bot()
+    setup_outbox(bot)
+    setup_leases(accounts)
+    if BOT_COMMANDS:
+        setup_commands(accounts)
+    check = partial(profiler.run, check_account, bot)
+    polls = PollQueue()
+    for account in accounts:
+        polls.schedule(account, account.next_poll)
+    with ThreadPoolExecutor(max_workers=ACCOUNT_WORKERS) as executor:
+        while True:
+            due = polls.pop_due(time.monotonic(), POLL_BATCH)
+            active = {account for account in due if is_active(account)}
+            list(executor.map(check, active))
+            for account in due:
+                if account in active:
+                    account.plan_next()
+                else:
+                    wait_standby(account)
+                polls.schedule(account, account.next_poll)
+            if active:
+                profiler.cycle_done()
+            wake_at = polls.next_due()
+            time.sleep(RETRY_PERIOD if wake_at is None else max(
+                0, wake_at - time.monotonic()
+            ))
+
+
+def release_account(account, timeout=SHARD_RELEASE_TIMEOUT):
+    """Функция подготовки учетной записи к передаче другому процессу.
+
+    Ждет доставки поставленных в очередь пакетов, чтобы их курсоры
+    успели зафиксироваться, и сохраняет текущий курсор в хранилище:
+    новый владелец продолжит опрос с него.
+    """
+    deadline = time.monotonic() + timeout
+    while account.ledger and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if account.ledger:
+        logger.warning(LazyMessage(
+            SHARD_RELEASE_TIMEOUT_EXPIRED, name=account.name
+        ))
+    commit_cursor(account, account.timestamp)
+
+
+def apply_shard_command(node, command, names, known, shard):
+    """Функция выполнения команды супервизора над учетными записями.
+
+    known - все учетные записи файла по имени, shard - опрашиваемые
+    этим процессом. Возвращает ответ супервизору или None.
+    """
+    from engine.sharding import ASSIGN, RELEASE, RELEASED
+    if command == ASSIGN:
+        for name in names:
+            account = known.get(name)
+            if account is None:
+                logger.error(LazyMessage(SHARD_UNKNOWN_ACCOUNT, name=name))
+                continue
+            restore_account(account)
+            account.next_poll = 0.0
+            shard[name] = account
+    elif command == RELEASE:
+        for name in names:
+            if name in shard:
+                release_account(shard.pop(name))
+    logger.info(LazyMessage(
+        SHARD_ACCOUNTS,
+        node=node,
+        assigned=len(names) if command == ASSIGN else 0,
+        released=len(names) if command == RELEASE else 0,
+        count=len(shard)
+    ))
+    return (RELEASED, names) if command == RELEASE else None
+
+
+def schedule_shard(polls, names, known, shard):
+    """Функция постановки в очередь опросов выданных учетных записей.
+
+    Учетные записи из names, которые больше не опрашиваются этим
+    процессом, снимаются с очереди.
+    """
+    for name in names:
+        if name in shard:
+            polls.schedule(shard[name], shard[name].next_poll)
+        elif name in known:
+            polls.remove(known[name])
+
+
+def handle_shard_message(node, command, payload, known, shard, polls):
+    """Функция обработки сообщения супервизора процессом-обработчиком.
+
+    PROFILE включает профилирование payload циклов опроса, остальные
+    команды меняют набор опрашиваемых учетных записей. Возвращает
+    ответ супервизору или None.
+    """
+    from engine.sharding import PROFILE
+    if command == PROFILE:
+        profiler.request(payload)
+        return None
+    reply = apply_shard_command(node, command, payload, known, shard)
+    schedule_shard(polls, payload, known, shard)
+    return reply
+
+
+def run_shard(node, connection):
+    """Функция процесса-обработчика части учетных записей.
+
+    Опрашивает учетные записи, выданные супервизором, а между
+    опросами выполняет его команды: ASSIGN - начать опрос учетных
+    записей с курсора из хранилища, RELEASE - отдать их после
+    фиксации курсоров, PROFILE - профилировать следующие циклы,
+    STOP - завершиться. Раз в SHARD_REPORT_PERIOD
+    секунд отправляет супервизору снимок показателей. Все обработчики
+    отправляют сообщения от имени одного бота, поэтому общий лимит
+    TELEGRAM_RATE делится между ними поровну.
+    """
+    from engine.sharding import METRICS, STOP
+    setup_logging(f'{__file__}.{node}.log')
+    setup_profiling()
+    setup_http_session(max(POOL_MAXSIZE, ACCOUNT_WORKERS))
+    setup_state_store(STATE_FILE)
+    known = {account.name: account for account in load_accounts(ACCOUNTS_FILE)}
+    bot = create_bot()
+    setup_outbox(bot, rate=TELEGRAM_RATE / PROCESS_WORKERS)
+    shard = {}
+    polls = PollQueue()
+    check = partial(profiler.run, check_account, bot)
+    report_at = 0.0
+    with ThreadPoolExecutor(max_workers=ACCOUNT_WORKERS) as executor:
+        while True:
+            due = polls.pop_due(time.monotonic(), POLL_BATCH)
+            list(executor.map(check, due))
+            for account in due:
+                account.plan_next()
+                polls.schedule(account, account.next_poll)
+            if due:
+                profiler.cycle_done()
+            if time.monotonic() >= report_at:
+                connection.send((METRICS, metrics.snapshot()))
+                report_at = time.monotonic() + SHARD_REPORT_PERIOD
+            wake_at = polls.next_due()
+            if wake_at is None or wake_at > report_at:
+                wake_at = report_at
+            if not connection.poll(max(0, wake_at - time.monotonic())):
+                continue
+            command, payload = connection.recv()
+            if command == STOP:
+                break
+            reply = handle_shard_message(
+                node, command, payload, known, shard, polls
+            )
+            if reply is not None:
+                connection.send(reply)
+    for account in shard.values():
+        release_account(account)
+    connection.send((METRICS, metrics.snapshot()))
+
+
+def main_processes():
+    """Логика работы бота в режиме нескольких процессов.
+
+    Учетные записи распределяются между PROCESS_WORKERS процессами
+    согласованным хешированием имен; состояние опроса передается
+    между процессами через хранилище STATE_FILE.
+    """
+    global supervisor
+    from engine.sharding import Supervisor
+    check_variables(PROCESSES_TOKENS)
+    names = [account.name for account in load_accounts(ACCOUNTS_FILE)]
+    if BOT_COMMANDS:
+        logger.warning(COMMANDS_UNAVAILABLE)
+    supervisor = Supervisor(
+        run_shard,
+        range(PROCESS_WORKERS),
+        names,
+        on_metrics=metrics.absorb,
+        on_exit=metrics.retire
+    )
+    try:
+        supervisor.run()
+    finally:
+        supervisor.stop()
+
+
+def main_async():
+    """Логика работы бота в режиме asyncio."""
+    accounts = configured_accounts()
+    bot = create_bot()
+    setup_outbox(bot)
+    setup_leases(accounts)
+    if BOT_COMMANDS:
+        setup_commands(accounts)
+    asyncio.run(poll_accounts_async(bot, accounts))
+
+
+def run():
+    """Функция запуска бота в режиме из настроек окружения."""
+    if WORKER_MODE not in WORKER_MODES:
+        raise ValueError(
+            UNKNOWN_WORKER_MODE.format(mode=WORKER_MODE, modes=WORKER_MODES)
+        )
+    if WORKER_MODE == 'asyncio':
+        main_async()
+    elif WORKER_MODE == 'processes':
+        main_processes()
+    elif ACCOUNTS_FILE:
+        main_accounts()
+    else:
+        main()
+
+
+def setup_logging(filename):
+    """Функция настройки журнала: файл filename и консоль."""
     stream_handler = logging.StreamHandler(stream=sys.stdout)
-    stream_handler.setLevel(logging.DEBUG)
+    stream_handler.setLevel(parse_level(LOG_STREAM_LEVEL))
+    file_handler = CompressingRotatingFileHandler(
+        filename,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT
+    )
+    file_handler.setLevel(parse_level(LOG_FILE_LEVEL))
     logging.basicConfig(
-        level=logging.DEBUG,
+        level=min(file_handler.level, stream_handler.level),
         format=(
             '%(asctime)s [%(levelname)s]\n'
             '\tSource: file "%(pathname)s", line %(lineno)d, in %(funcName)s\n'
             '\t%(message)s'
         ),
-        handlers=[
-            logging.FileHandler(__file__ + '.log', mode='w'),
-            stream_handler
-        ]
+        handlers=[file_handler, stream_handler]
+    )
+    if LOG_QUEUE:
+        start_queue_logging()
+    if TRACE_CYCLES:
+        setup_trace_log(os.path.splitext(filename)[0] + '.trace.log')
+
+
+def setup_trace_log(filename):
+    """Функция настройки отдельного журнала записей о циклах опроса.
+
+    Каждая строка файла filename - запись о цикле в формате JSON; файл
+    ротируется так же, как основной журнал.
+    """
+    handler = CompressingRotatingFileHandler(
+        filename,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT
     )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    trace_logger = logging.getLogger(TRACE_LOGGER)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+    trace_logger.addHandler(handler)
+    if LOG_QUEUE:
+        start_queue_logging(trace_logger)
+
 
-    main()
+if __name__ == '__main__':
+    init()
+    setup_logging(__file__ + '.log')
+    setup_profiling()
+    setup_http_session(max(POOL_MAXSIZE, ACCOUNT_WORKERS))
+    if STATE_FILE:
+        setup_state_store(STATE_FILE)
+    if METRICS_PORT:
+        setup_metrics_server(METRICS_HOST, int(METRICS_PORT))
+
+    try:
+        run()
+    finally:
+        if updater is not None:
+            updater.stop()
+        if lease_keeper is not None:
+            lease_keeper.stop()
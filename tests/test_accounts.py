@@ -0,0 +1,234 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import utils
+from engine.resilience import RetryPolicy
+
+
+class TestAccounts:
+    def write_accounts(self, tmp_path, data):
+        path = tmp_path / 'accounts.json'
+        path.write_text(json.dumps(data), encoding='utf-8')
+        return str(path)
+
+    def test_load_accounts(self, tmp_path, homework_module):
+        path = self.write_accounts(tmp_path, [
+            {'practicum_token': 'token1', 'chat_id': 1, 'name': 'first'},
+            {'practicum_token': 'token2', 'chat_id': 2},
+        ])
+        accounts = homework_module.load_accounts(path)
+        assert [account.name for account in accounts] == ['first', '2']
+        assert accounts[1].headers == {'Authorization': 'OAuth token2'}
+
+    @pytest.mark.parametrize('data', [
+        {'practicum_token': 'token', 'chat_id': 1},
+        [{'practicum_token': 'token'}],
+        ['practicum_token chat_id'],
+        [['practicum_token', 'chat_id']],
+    ])
+    def test_load_invalid_accounts(self, tmp_path, data, homework_module):
+        path = self.write_accounts(tmp_path, data)
+        with pytest.raises(ValueError):
+            homework_module.load_accounts(path)
+
+    @pytest.mark.parametrize('setting, value', [
+        ('STATE_FILE', 'state.sqlite3'),
+        ('LEASE_BACKEND', 'file'),
+    ])
+    def test_repeated_names_rejected_with_shared_state(self, monkeypatch,
+                                                       tmp_path, setting,
+                                                       value,
+                                                       homework_module):
+        path = self.write_accounts(tmp_path, [
+            {'practicum_token': 'token1', 'chat_id': 1},
+            {'practicum_token': 'token2', 'chat_id': 1},
+        ])
+        assert len(homework_module.load_accounts(path)) == 2
+        monkeypatch.setattr(homework_module, setting, value)
+        with pytest.raises(ValueError, match=r"\['1'\]"):
+            homework_module.load_accounts(path)
+
+    def test_main_accounts_with_empty_file(self, monkeypatch,
+                                           homework_module):
+        sleeps = []
+
+        def stop_sleep(seconds):
+            sleeps.append(seconds)
+            raise utils.BreakInfiniteLoop('break')
+
+        monkeypatch.setattr(homework_module, 'configured_accounts', list)
+        monkeypatch.setattr(homework_module, 'create_bot', object)
+        monkeypatch.setattr(
+            homework_module, 'setup_outbox', lambda bot: None
+        )
+        monkeypatch.setattr(homework_module, 'BOT_COMMANDS', False)
+        monkeypatch.setattr(homework_module.time, 'sleep', stop_sleep)
+        with pytest.raises(utils.BreakInfiniteLoop):
+            homework_module.main_accounts()
+        assert sleeps == [homework_module.RETRY_PERIOD], (
+            'Без учетных записей цикл опроса ждет RETRY_PERIOD.'
+        )
+
+    def test_accounts_keep_own_cursor_and_chat(self, monkeypatch,
+                                               homework_module,
+                                               data_with_new_hw_status):
+        accounts = [
+            homework_module.Account('token1', 1),
+            homework_module.Account('token2', 2),
+        ]
+        tokens = {}
+
+        def mock_request(timestamp, headers):
+            tokens[headers['Authorization']] = timestamp
+            if headers['Authorization'] == 'OAuth token2':
+                raise ConnectionError('Сбой сети')
+            return data_with_new_hw_status
+
+        monkeypatch.setattr(
+            homework_module, 'request_api_answer', mock_request
+        )
+        monkeypatch.setattr(
+            homework_module, 'api_retry', RetryPolicy(attempts=1)
+        )
+        bot = utils.MockTelegramBot()
+        for account in accounts:
+            homework_module.check_account(bot, account)
+        assert tokens.keys() == {'OAuth token1', 'OAuth token2'}
+        assert accounts[0].timestamp == (
+            data_with_new_hw_status['current_date']
+        ), 'Курсор учетной записи сдвигается после отправки статуса.'
+        assert accounts[1].timestamp != accounts[0].timestamp
+        assert accounts[1].error_fingerprint, (
+            'Ошибка запоминается в состоянии своей учетной записи.'
+        )
+        assert not accounts[0].error_fingerprint
+        assert bot.chat_id == 2
+
+    def test_async_accounts_overlap(self, monkeypatch, homework_module,
+                                    data_with_new_hw_status):
+        delay = 0.2
+
+        def slow_request(timestamp, headers):
+            time.sleep(delay)
+            return data_with_new_hw_status
+
+        monkeypatch.setattr(
+            homework_module, 'request_api_answer', slow_request
+        )
+        accounts = [
+            homework_module.Account(f'token{index}', index)
+            for index in range(5)
+        ]
+        bot = utils.MockTelegramBot()
+
+        async def check_all():
+            await asyncio.gather(*(
+                homework_module.check_account_async(bot, account)
+                for account in accounts
+            ))
+
+        start = time.monotonic()
+        asyncio.run(check_all())
+        assert time.monotonic() - start < delay * len(accounts), (
+            'Запросы учетных записей в режиме asyncio должны перекрываться.'
+        )
+        assert all(
+            account.timestamp == data_with_new_hw_status['current_date']
+            for account in accounts
+        )
+
+    def test_all_homeworks_sent_in_one_batch(self, monkeypatch,
+                                             random_timestamp,
+                                             homework_module):
+        response = {
+            'homeworks': [
+                {'homework_name': 'hw1', 'status': 'approved'},
+                {'homework_name': 'hw2', 'status': 'rejected'},
+            ],
+            'current_date': random_timestamp
+        }
+        sent = []
+
+        def mock_send(bot, chat_id, message):
+            sent.append(message)
+            return True
+
+        monkeypatch.setattr(
+            homework_module, 'request_api_answer',
+            lambda timestamp, headers: response
+        )
+        monkeypatch.setattr(homework_module, 'send_message_to_chat', mock_send)
+        account = homework_module.Account('token', 1)
+        homework_module.check_account(utils.MockTelegramBot(), account)
+        assert len(sent) == 1, 'Статусы пакета отправляются одним сообщением.'
+        assert '"hw1"' in sent[0] and '"hw2"' in sent[0]
+        assert account.timestamp == random_timestamp
+
+    def test_cursor_kept_when_batch_not_delivered(self, monkeypatch,
+                                                  homework_module):
+        sent = []
+
+        def mock_send(bot, chat_id, message):
+            sent.append(message)
+            return len(sent) == 1
+
+        monkeypatch.setattr(homework_module, 'send_message_to_chat', mock_send)
+        long_name = 'hw' * homework_module.MESSAGE_LIMIT
+        monkeypatch.setattr(
+            homework_module, 'request_api_answer',
+            lambda timestamp, headers: {
+                'homeworks': [
+                    {'homework_name': long_name, 'status': 'approved'},
+                ],
+                'current_date': 1
+            }
+        )
+        account = homework_module.Account('token', 1)
+        timestamp = account.timestamp
+        homework_module.check_account(utils.MockTelegramBot(), account)
+        assert len(sent) == 2
+        assert account.timestamp == timestamp, (
+            'Курсор не сдвигается, пока не доставлен весь пакет.'
+        )
+
+    def test_pack_messages_respects_limit(self, homework_module):
+        parts = homework_module.pack_messages(['a' * 5, 'b' * 5, 'c' * 12], 12)
+        assert parts == ['aaaaa\n\nbbbbb', 'c' * 12]
+
+    def test_failed_batch_not_resent_twice(self, monkeypatch,
+                                           homework_module):
+        long_name = 'hw' * (homework_module.MESSAGE_LIMIT // 4)
+        response = {
+            'homeworks': [
+                {'id': 1, 'homework_name': long_name, 'status': 'approved'},
+                {'id': 2, 'homework_name': long_name, 'status': 'approved'},
+            ],
+            'current_date': 1
+        }
+        sent = []
+        results = iter([True, False, True])
+
+        def mock_send(bot, chat_id, message):
+            sent.append(message)
+            return next(results)
+
+        monkeypatch.setattr(homework_module, 'send_message_to_chat', mock_send)
+        monkeypatch.setattr(
+            homework_module, 'request_api_answer',
+            lambda timestamp, headers: response
+        )
+        account = homework_module.Account('token', 1)
+        bot = utils.MockTelegramBot()
+        homework_module.check_account(bot, account)
+        assert account.timestamp != 1
+        homework_module.check_account(bot, account)
+        assert len(sent) == 3
+        assert sent[2] == sent[1], (
+            'Повторно отправляется только недоставленная часть пакета.'
+        )
+        assert account.timestamp == 1
+        homework_module.check_account(bot, account)
+        assert len(sent) == 3, 'Доставленные статусы не отправляются снова.'
@@ -0,0 +1,80 @@
+import time
+
+import utils
+
+
+class MockChat:
+    def __init__(self, chat_id):
+        self.id = chat_id
+
+
+class MockMessage:
+    def __init__(self):
+        self.replies = []
+
+    def reply_text(self, text):
+        self.replies.append(text)
+
+
+class MockUpdate:
+    def __init__(self, chat_id):
+        self.effective_chat = MockChat(chat_id)
+        self.effective_message = MockMessage()
+
+
+class TestCommands:
+    def test_status_from_view_without_api_calls(self, monkeypatch,
+                                                homework_module,
+                                                data_with_new_hw_status):
+        calls = []
+
+        def mock_request(timestamp, headers):
+            calls.append(timestamp)
+            return data_with_new_hw_status
+
+        monkeypatch.setattr(
+            homework_module, 'request_api_answer', mock_request
+        )
+        account = homework_module.Account('token', 7)
+        homework_module.check_account(utils.MockTelegramBot(), account)
+        update = MockUpdate(7)
+        homework_module.reply_command(
+            homework_module.status_reply, {'7': account}, update, None
+        )
+        homework_module.reply_command(
+            homework_module.history_reply, {'7': account}, update, None
+        )
+        assert len(calls) == 1, (
+            'Ответ на команды не должен обращаться к API Практикума.'
+        )
+        status, history = update.effective_message.replies
+        assert '"hw123": ' in status
+        assert homework_module.HOMEWORK_VERDICTS['approved'] in status
+        assert '0 мин назад' in status, (
+            'В ответе должно быть указано, когда получены данные.'
+        )
+        assert '"hw123"' in history
+
+    def test_status_before_first_check(self, homework_module):
+        account = homework_module.Account('token', 7)
+        assert (
+            homework_module.status_reply(account)
+            == homework_module.STATUS_NOT_CHECKED
+        )
+
+    def test_unknown_chat(self, homework_module):
+        update = MockUpdate(8)
+        homework_module.reply_command(
+            homework_module.status_reply, {}, update, None
+        )
+        assert update.effective_message.replies == [
+            homework_module.UNKNOWN_CHAT
+        ]
+
+    def test_restored_view_shows_freshness(self, homework_module):
+        account = homework_module.Account('token', 7)
+        checked_at = time.time() - 3600
+        account.view.restore({'42': ('reviewing', 'date')}, checked_at)
+        reply = homework_module.status_reply(account)
+        assert '60 мин назад' in reply
+        assert '"42": ' in reply
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from engine.errors import ErrorDigest, error_fingerprint, error_label
+from engine.resilience import RetryPolicy
+
+
+class RecordingBot:
+    def __init__(self):
+        self.texts = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.texts.append(text)
+
+
+def test_fingerprint_ignores_variable_data():
+    first = ConnectionError(
+        'GET https://practicum.yandex.ru/api/?from_date=1700000000 '
+        'failed: <Connection object at 0x7f3a1c2b>'
+    )
+    second = ConnectionError(
+        'GET https://practicum.yandex.ru/api/?from_date=1700000600 '
+        'failed: <Connection object at 0x7f3a99aa>'
+    )
+    assert error_fingerprint(first) == error_fingerprint(second)
+    assert error_fingerprint(first) != error_fingerprint(
+        TimeoutError(str(first))
+    ), 'Ошибки разных типов должны различаться.'
+
+
+def test_label_includes_status_code(homework_module):
+    error = homework_module.ResponseStatusError('Сбой', 503)
+    assert error_label(error) == 'ResponseStatusError 503'
+
+
+def test_digest_counts_repeats_in_window():
+    digest = ErrorDigest(period=60)
+    assert digest.record('a', 'ConnectionError', now=0)
+    assert not digest.record('a', 'ConnectionError', now=10)
+    assert not digest.record('a', 'ConnectionError', now=20)
+    assert digest.record('b', 'ValueError', now=30)
+    assert digest.flush(now=59) == []
+    assert digest.flush(now=60) == ['ConnectionError x3']
+    assert digest.record('a', 'ConnectionError', now=61), (
+        'После сводки начинается новое окно.'
+    )
+
+
+def check_account(homework_module, in_event_loop, bot, account):
+    if in_event_loop:
+        asyncio.run(homework_module.check_account_async(bot, account))
+    else:
+        homework_module.check_account(bot, account)
+
+
+@pytest.mark.parametrize('in_event_loop', [False, True])
+def test_repeated_error_sent_once_then_digest(monkeypatch, homework_module,
+                                              in_event_loop):
+    calls = []
+
+    def failing_request(timestamp, headers):
+        calls.append(timestamp)
+        raise ConnectionError(f'Сбой сети, попытка {len(calls)}')
+
+    monkeypatch.setattr(homework_module, 'request_api_answer', failing_request)
+    monkeypatch.setattr(homework_module, 'api_retry', RetryPolicy(attempts=1))
+    monkeypatch.setattr(homework_module, 'outbox', None)
+    account = homework_module.Account('token', 1)
+    bot = RecordingBot()
+    for _ in range(3):
+        check_account(homework_module, in_event_loop, bot, account)
+    assert len(bot.texts) == 1, (
+        'Ошибка, отличающаяся только изменчивыми данными, '
+        'отправляется один раз.'
+    )
+    account.errors.window_end = 0
+    check_account(homework_module, in_event_loop, bot, account)
+    assert len(bot.texts) == 2
+    assert 'ConnectionError x4' in bot.texts[-1]
@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_check_response_builds_records(homework_module):
+    response = {
+        'homeworks': [{
+            'id': 7, 'homework_name': 'hw.zip', 'status': 'approved',
+            'date_updated': '2026-01-01T00:00:00Z',
+            'reviewer_comment': 'Отлично', 'lesson_name': 'Урок'
+        }],
+        'current_date': 0
+    }
+    record, = homework_module.check_response(response)
+    assert isinstance(record, homework_module.Homework)
+    assert (record.id, record.name, record.status, record.work) == (
+        7, 'hw.zip', 'approved', '7'
+    )
+    assert record.reviewer_comment == 'Отлично'
+    assert not hasattr(record, '__dict__'), (
+        'Запись Homework должна хранить поля в __slots__.'
+    )
+
+
+def test_record_without_id_uses_name_as_work(homework_module):
+    record = homework_module.Homework.from_dict(
+        {'homework_name': 'hw.zip', 'status': 'reviewing'}
+    )
+    assert record.id is None and record.date_updated is None
+    assert record.work == 'hw.zip'
+
+
+def test_parse_status_accepts_record(homework_module):
+    record = homework_module.Homework(name='hw.zip', status='approved')
+    assert 'hw.zip' in homework_module.parse_status(record)
+
+
+def test_check_response_rejects_non_dict_homework(homework_module):
+    with pytest.raises(TypeError):
+        homework_module.check_response(
+            {'homeworks': ['hw.zip'], 'current_date': 0}
+        )
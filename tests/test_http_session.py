@@ -0,0 +1,49 @@
+import requests
+
+import utils
+
+
+class TestHttpSession:
+    def test_create_session_mounts_pooled_adapter(self, homework_module):
+        session = homework_module.create_session(pool_maxsize=7)
+        adapter = session.get_adapter(homework_module.ENDPOINT)
+        assert isinstance(adapter, requests.adapters.HTTPAdapter), (
+            'Сессия должна использовать HTTPAdapter для эндпоинта API.'
+        )
+        assert adapter._pool_maxsize == 7, (
+            'Проверьте, что размер пула соединений передан в адаптер.'
+        )
+        session.close()
+
+    def test_get_api_answer_passes_timeout(self, monkeypatch,
+                                           current_timestamp,
+                                           homework_module):
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            return utils.MockResponseGET(*args, **kwargs)
+
+        monkeypatch.setattr(homework_module, 'http_session', None)
+        monkeypatch.setattr(requests, 'get', mock_get)
+        homework_module.get_api_answer(current_timestamp)
+        assert calls[0]['timeout'] == homework_module.REQUEST_TIMEOUT, (
+            'Запрос к API должен выполняться с таймаутами.'
+        )
+
+    def test_get_api_answer_uses_shared_session(self, monkeypatch,
+                                                current_timestamp,
+                                                homework_module):
+        session = homework_module.create_session()
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            return utils.MockResponseGET(*args, **kwargs)
+
+        monkeypatch.setattr(session, 'get', mock_get)
+        monkeypatch.setattr(homework_module, 'http_session', session)
+        result = homework_module.get_api_answer(current_timestamp)
+        assert calls and isinstance(result, dict), (
+            'При подключенной сессии запрос должен идти через нее.'
+        )
@@ -0,0 +1,214 @@
+import json
+from functools import partial
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from engine.jsonstream import ObjectStream
+from engine.outbox import Outbox
+
+
+def split(data, size):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+class StreamResponse:
+    def __init__(self, data, chunk_size=7):
+        self.status_code = HTTPStatus.OK
+        self.body = json.dumps(data, ensure_ascii=False).encode()
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(split(self.body, self.chunk_size))
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingBot:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id, text):
+        self.messages.append(text)
+
+
+class FailingBot(RecordingBot):
+    def __init__(self, fail_at):
+        super().__init__()
+        self.fail_at = fail_at
+        self.calls = 0
+
+    def send_message(self, chat_id, text):
+        self.calls += 1
+        if self.calls == self.fail_at:
+            raise ConnectionError('Telegram недоступен')
+        super().send_message(chat_id, text)
+
+
+def stream_homeworks(count):
+    return StreamResponse({
+        'homeworks': [
+            {'id': index, 'homework_name': f'hw{index}',
+             'status': 'approved', 'date_updated': 'date'}
+            for index in range(count)
+        ],
+        'current_date': 1700000000,
+    })
+
+
+class TestObjectStream:
+    @pytest.mark.parametrize('size', [1, 3, 64, 10 ** 6])
+    def test_items_and_values_for_any_chunk_size(self, size):
+        data = {
+            'homeworks': [{'id': index, 'homework_name': 'дз' * index}
+                          for index in range(20)],
+            'current_date': 1234567890,
+        }
+        stream = ObjectStream(
+            split(json.dumps(data, ensure_ascii=False).encode(), size),
+            'homeworks'
+        )
+        assert list(stream) == data['homeworks']
+        assert stream.array_found
+        assert stream.values == {'current_date': 1234567890}
+
+    @pytest.mark.parametrize('chunks, items, values', [
+        ([b'{"homeworks":[1.', b'5]}'], [1.5], {}),
+        ([b'{"homeworks":[2e', b'3]}'], [2000.0], {}),
+        ([b'{"current_date":1.', b'25,"homeworks":[]}'], [],
+         {'current_date': 1.25}),
+    ])
+    def test_number_split_by_chunk_boundary(self, chunks, items, values):
+        stream = ObjectStream(chunks, 'homeworks')
+        assert list(stream) == items
+        assert stream.values == values
+
+    @pytest.mark.parametrize('body, error', [
+        (b'[]', TypeError),
+        (b'{"homeworks": {}}', TypeError),
+        (b'{"homeworks": [{"id": 1}', ValueError),
+    ])
+    def test_invalid_payload(self, body, error):
+        with pytest.raises(error):
+            list(ObjectStream([body], 'homeworks'))
+
+    def test_on_value_called_before_array_end(self):
+        seen = []
+        stream = ObjectStream(
+            [b'{"code": "not_authenticated", "homeworks": [1, 2]}'],
+            'homeworks',
+            on_value=lambda key, value: seen.append(key)
+        )
+        assert next(iter(stream)) == 1
+        assert seen == ['code']
+
+
+class TestStreamingMode:
+    def test_batches_delivered_and_cursor_committed(self, monkeypatch,
+                                                    homework_module):
+        response = StreamResponse({
+            'homeworks': [
+                {'id': index, 'homework_name': f'hw{index}',
+                 'status': 'approved', 'date_updated': 'date'}
+                for index in range(3)
+            ],
+            'current_date': 1700000000,
+        })
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            return response
+
+        monkeypatch.setattr(homework_module, 'http_session', None)
+        monkeypatch.setattr(requests, 'get', mock_get)
+        monkeypatch.setattr(homework_module, 'STREAM_JSON', True)
+        monkeypatch.setattr(homework_module, 'STREAM_BATCH', 2)
+        account = homework_module.Account('token', 1)
+        bot = RecordingBot()
+        homework_module.check_account(bot, account)
+        assert calls[0]['stream'] is True
+        assert len(bot.messages) == 2, (
+            'В потоковом режиме каждый пакет работ отправляется отдельно.'
+        )
+        assert 'hw2' in bot.messages[1]
+        assert account.timestamp == 1700000000
+        assert response.closed, 'Соединение должно закрываться.'
+
+    def test_error_key_reported(self, monkeypatch, homework_module):
+        response = StreamResponse(
+            {'code': 'not_authenticated', 'homeworks': []}
+        )
+        monkeypatch.setattr(homework_module, 'http_session', None)
+        monkeypatch.setattr(requests, 'get', lambda *a, **k: response)
+        monkeypatch.setattr(homework_module, 'STREAM_JSON', True)
+        account = homework_module.Account('token', 1)
+        timestamp = account.timestamp
+        bot = RecordingBot()
+        homework_module.check_account(bot, account)
+        assert len(bot.messages) == 1 and 'code' in bot.messages[0], (
+            'Ошибка в ответе API должна сообщаться в чат.'
+        )
+        assert account.timestamp == timestamp
+
+    @pytest.mark.parametrize('queued', [False, True])
+    def test_failed_middle_batch_keeps_cursor(self, monkeypatch,
+                                              homework_module, queued):
+        monkeypatch.setattr(homework_module, 'http_session', None)
+        monkeypatch.setattr(
+            requests, 'get', lambda *a, **k: stream_homeworks(6)
+        )
+        monkeypatch.setattr(homework_module, 'STREAM_JSON', True)
+        monkeypatch.setattr(homework_module, 'STREAM_BATCH', 2)
+        account = homework_module.Account('token', 1)
+        timestamp = account.timestamp
+        bot = FailingBot(fail_at=2)
+        if queued:
+            outbox = Outbox(
+                partial(homework_module.send_message_to_chat, bot),
+                rate=1000, chat_rate=1000
+            ).start()
+            monkeypatch.setattr(homework_module, 'outbox', outbox)
+        homework_module.check_account(bot, account)
+        assert account.timestamp == timestamp, (
+            'Курсор не сдвигается, если пакет не доставлен.'
+        )
+        assert bot.calls == 2, (
+            'После недоставленного пакета следующие не отправляются.'
+        )
+        homework_module.check_account(bot, account)
+        if queued:
+            outbox.close(timeout=1)
+        assert account.timestamp == 1700000000
+        delivered = '\n'.join(bot.messages)
+        assert all(f'hw{index}' in delivered for index in range(6)), (
+            'Работы недоставленного пакета отправляются в следующем цикле.'
+        )
+
+    def test_outbox_holds_one_batch_at_a_time(self, monkeypatch,
+                                              homework_module):
+        depths = []
+
+        def send(chat_id, text):
+            depths.append(len(account.pending))
+            return True
+
+        outbox = Outbox(send, rate=1000, chat_rate=1000).start()
+        monkeypatch.setattr(homework_module, 'outbox', outbox)
+        monkeypatch.setattr(homework_module, 'http_session', None)
+        monkeypatch.setattr(
+            requests, 'get', lambda *a, **k: stream_homeworks(40)
+        )
+        monkeypatch.setattr(homework_module, 'STREAM_JSON', True)
+        monkeypatch.setattr(homework_module, 'STREAM_BATCH', 4)
+        account = homework_module.Account('token', 1)
+        homework_module.check_account(RecordingBot(), account)
+        outbox.close(timeout=1)
+        assert len(depths) == 10
+        assert max(depths) <= 4, (
+            'Следующий пакет читается только после доставки предыдущего.'
+        )
+        assert account.timestamp == 1700000000
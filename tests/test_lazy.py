@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+import requests
+
+from engine.lazy import LazyModule
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_lazy_module_sees_patched_attributes(monkeypatch):
+    lazy = LazyModule('requests')
+
+    def mock_get(*args, **kwargs):
+        return 'patched'
+
+    monkeypatch.setattr(requests, 'get', mock_get)
+    assert lazy.get() == 'patched', (
+        'Подмена атрибута модуля должна быть видна через LazyModule.'
+    )
+
+
+def test_import_does_not_load_heavy_modules():
+    code = (
+        'import json, sys, homework; '
+        'print(json.dumps([name for name in ("telegram", "requests", '
+        '"dotenv") if name in sys.modules]))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert json.loads(result.stdout) == [], (
+        'Импорт homework не должен загружать telegram, requests и dotenv.'
+    )
+
+
+def test_init_reads_env_file(tmp_path, monkeypatch, homework_module):
+    env_file = tmp_path / '.env'
+    env_file.write_text('STATE_FILE=state.sqlite3\n', encoding='utf-8')
+    monkeypatch.delenv('STATE_FILE', raising=False)
+    try:
+        homework_module.init(str(env_file))
+        assert homework_module.STATE_FILE == 'state.sqlite3', (
+            'init() должна читать настройки из файла .env.'
+        )
+    finally:
+        monkeypatch.delenv('STATE_FILE', raising=False)
+        homework_module.load_settings()
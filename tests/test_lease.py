@@ -0,0 +1,114 @@
+import multiprocessing
+import time
+
+import pytest
+
+from engine.lease import FileLeaseBackend, LeaseKeeper, SqliteLeaseBackend
+
+TTL = 0.4
+PERIOD = 0.1
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def make_backend(request, tmp_path):
+    if request.param == 'sqlite':
+        path = str(tmp_path / 'leases.sqlite3')
+        return lambda: SqliteLeaseBackend(path)
+    path = str(tmp_path / 'leases')
+    return lambda: FileLeaseBackend(path)
+
+
+def hold_lease(make_backend, ready):
+    keeper = LeaseKeeper(
+        make_backend(), ['student'], holder='primary', ttl=TTL, period=PERIOD
+    ).start()
+    ready.set()
+    while True:
+        time.sleep(1)
+
+
+def test_backend_gives_name_to_one_holder(make_backend):
+    backend = make_backend()
+    assert backend.acquire(['a', 'b'], 'first', 10, 100) == {'a', 'b'}
+    assert backend.acquire(['a', 'c'], 'second', 10, 105) == {'c'}
+    assert backend.acquire(['a'], 'second', 10, 110) == {'a'}, (
+        'Просроченную аренду должен получить другой экземпляр.'
+    )
+    backend.release(['c'], 'first')
+    assert backend.acquire(['c'], 'third', 10, 111) == set()
+    backend.release(['c'], 'second')
+    assert backend.acquire(['c'], 'third', 10, 111) == {'c'}
+    backend.close()
+
+
+def test_standby_takes_over_after_primary_dies(make_backend):
+    context = multiprocessing.get_context('fork')
+    ready = context.Event()
+    primary = context.Process(target=hold_lease, args=(make_backend, ready))
+    primary.start()
+    try:
+        assert ready.wait(1)
+        acquired = []
+        standby = LeaseKeeper(
+            make_backend(), ['student'], holder='standby',
+            ttl=TTL, period=PERIOD, on_acquire=acquired.extend
+        ).start()
+        time.sleep(PERIOD * 2)
+        assert not standby.holds('student'), (
+            'Пока основной экземпляр жив, резервный не должен опрашивать.'
+        )
+        primary.kill()
+        killed = time.monotonic()
+        while not standby.holds('student'):
+            assert time.monotonic() - killed < TTL + 3 * PERIOD, (
+                'Резервный экземпляр должен получить аренду за ttl + period.'
+            )
+            time.sleep(PERIOD / 4)
+        assert acquired == ['student']
+        standby.stop()
+    finally:
+        primary.kill()
+        primary.join()
+
+
+def test_stop_releases_lease_immediately(make_backend):
+    first = LeaseKeeper(make_backend(), ['a'], ttl=60).start()
+    assert first.holds('a')
+    first.stop()
+    second = LeaseKeeper(make_backend(), ['a'], ttl=60).start()
+    assert second.holds('a')
+    second.stop()
+
+
+def test_standby_account_is_not_polled(monkeypatch, tmp_path,
+                                       homework_module):
+    path = str(tmp_path / 'leases.sqlite3')
+    SqliteLeaseBackend(path).acquire(['student'], 'primary', 60, time.time())
+    monkeypatch.setattr(homework_module, 'LEASE_BACKEND', 'sqlite')
+    monkeypatch.setattr(homework_module, 'LEASE_PATH', path)
+    monkeypatch.setattr(
+        homework_module, 'STATE_FILE', str(tmp_path / 'state.sqlite3')
+    )
+    monkeypatch.setattr(homework_module, 'lease_keeper', None)
+    account = homework_module.Account('token', 1, name='student')
+    keeper = homework_module.setup_leases([account])
+    try:
+        assert not homework_module.is_active(account)
+        interval = homework_module.wait_standby(account)
+        assert 0 < interval <= homework_module.LEASE_TTL
+    finally:
+        keeper.stop()
+
+
+def test_leases_require_state_file(monkeypatch, tmp_path, homework_module):
+    monkeypatch.setattr(homework_module, 'LEASE_BACKEND', 'sqlite')
+    monkeypatch.setattr(
+        homework_module, 'LEASE_PATH', str(tmp_path / 'leases.sqlite3')
+    )
+    monkeypatch.setattr(homework_module, 'STATE_FILE', None)
+    monkeypatch.setattr(homework_module, 'lease_keeper', None)
+    with pytest.raises(ValueError, match='STATE_FILE'):
+        homework_module.setup_leases(
+            [homework_module.Account('token', 1, name='student')]
+        )
+    assert homework_module.lease_keeper is None
@@ -0,0 +1,127 @@
+import gzip
+import logging
+import threading
+import time
+
+import pytest
+
+from engine import logs
+from engine.logs import (
+    CompressingRotatingFileHandler, LazyMessage, parse_level,
+    start_queue_logging, stop_queue_logging
+)
+
+
+class CountingTemplate(str):
+    calls = 0
+
+    def format(self, *args, **kwargs):
+        CountingTemplate.calls += 1
+        return super().format(*args, **kwargs)
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+        self.threads.add(threading.get_ident())
+
+
+def test_lazy_message_not_formatted_below_level():
+    logger = logging.getLogger('test_logs.lazy')
+    logger.setLevel(logging.INFO)
+    CountingTemplate.calls = 0
+    logger.debug(LazyMessage(CountingTemplate('Опрос {name}'), name='a'))
+    assert CountingTemplate.calls == 0, (
+        'Сообщение отключенного уровня не должно форматироваться.'
+    )
+    assert str(LazyMessage('Опрос {name}', name='a')) == 'Опрос a'
+
+
+def test_queue_logging_emits_in_background_thread():
+    logger = logging.getLogger('test_logs.queue')
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = RecordingHandler()
+    logger.addHandler(handler)
+    listener = start_queue_logging(logger)
+    try:
+        assert handler not in logger.handlers, (
+            'Обработчики должны перейти в фоновый поток.'
+        )
+        logger.info(LazyMessage('Учетная запись {name}', name='a'))
+    finally:
+        stop_queue_logging(listener)
+        for queue_handler in list(logger.handlers):
+            logger.removeHandler(queue_handler)
+    assert handler.lines == ['Учетная запись a']
+    assert threading.get_ident() not in handler.threads, (
+        'Запись должна выводиться не в потоке опроса.'
+    )
+
+
+def test_rotating_handler_compresses_old_parts(tmp_path):
+    path = tmp_path / 'bot.log'
+    handler = CompressingRotatingFileHandler(
+        str(path), max_bytes=100, backup_count=2
+    )
+    logger = logging.getLogger('test_logs.rotate')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        for index in range(10):
+            logger.info('строка %d %s', index, 'x' * 40)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    names = sorted(item.name for item in tmp_path.iterdir())
+    assert names == ['bot.log', 'bot.log.1.gz', 'bot.log.2.gz'], (
+        'Журнал должен хранить не более backup_count сжатых частей.'
+    )
+    with gzip.open(tmp_path / 'bot.log.1.gz', 'rt') as part:
+        assert 'строка' in part.read()
+    assert path.stat().st_size <= 100
+
+
+def test_slow_compression_keeps_every_part(tmp_path, monkeypatch):
+    compress = logs.compress_file
+
+    def slow_compress(source, dest):
+        time.sleep(0.2)
+        compress(source, dest)
+
+    monkeypatch.setattr(logs, 'compress_file', slow_compress)
+    path = tmp_path / 'bot.log'
+    handler = CompressingRotatingFileHandler(
+        str(path), max_bytes=50, backup_count=5
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger('test_logs.slow_rotate')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    try:
+        for index in range(1, 5):
+            logger.info('A%d %s', index, 'x' * 40)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    parts = []
+    for number in (3, 2, 1):
+        with gzip.open(tmp_path / f'bot.log.{number}.gz', 'rt') as part:
+            parts.append(part.read().split()[0])
+    assert parts == ['A1', 'A2', 'A3'], (
+        'Части журнала не должны перезаписывать друг друга.'
+    )
+    assert path.read_text().startswith('A4')
+
+
+def test_parse_level():
+    assert parse_level('debug') == logging.DEBUG
+    with pytest.raises(ValueError):
+        parse_level('verbose')
@@ -0,0 +1,92 @@
+import urllib.request
+
+import pytest
+import requests
+
+import utils
+from engine.metrics import Registry, Timer, start_metrics_server
+
+
+class TestRegistry:
+    def test_render_prometheus_text(self):
+        registry = Registry()
+        seconds = registry.histogram(
+            'stage_seconds', 'Длительность.', label='stage', buckets=(0.1, 1)
+        )
+        errors = registry.counter('stage_errors_total', 'Ошибки.', 'stage')
+        registry.gauge('depth', 'Глубина.', lambda: 3)
+        seconds.labels('send').observe(0.5)
+        errors.labels('send').inc()
+        text = registry.render()
+        for line in (
+            '# TYPE stage_seconds histogram',
+            'stage_seconds_bucket{stage="send",le="0.1"} 0',
+            'stage_seconds_bucket{stage="send",le="1"} 1',
+            'stage_seconds_bucket{stage="send",le="+Inf"} 1',
+            'stage_seconds_count{stage="send"} 1',
+            'stage_errors_total{stage="send"} 1',
+            'depth 3',
+        ):
+            assert line in text.splitlines(), (
+                f'В выводе показателей нет строки {line}.'
+            )
+
+    def test_timer_counts_errors(self):
+        registry = Registry()
+        seconds = registry.histogram('seconds', 'Длительность.')
+        errors = registry.counter('errors', 'Ошибки.')
+        with pytest.raises(KeyError):
+            with Timer(seconds.labels(), errors.labels()):
+                raise KeyError('homeworks')
+        assert seconds.labels().count == 1
+        assert errors.labels().value == 1, (
+            'Исключение в замеряемом блоке должно учитываться как ошибка.'
+        )
+
+    def test_metrics_server(self):
+        registry = Registry()
+        registry.gauge('depth', 'Глубина.', lambda: 0)
+        server = start_metrics_server(registry, '127.0.0.1', 0)
+        try:
+            url = 'http://127.0.0.1:{}/metrics'.format(server.server_port)
+            with urllib.request.urlopen(url, timeout=1) as response:
+                assert b'depth 0' in response.read()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_metrics_server_actions(self):
+        calls = []
+
+        def profile(params):
+            calls.append(params)
+            return 'ok'
+
+        server = start_metrics_server(
+            Registry(), '127.0.0.1', 0, actions={'/profile': profile}
+        )
+        try:
+            url = 'http://127.0.0.1:{}/profile?cycles=2'.format(
+                server.server_port
+            )
+            request = urllib.request.Request(url, data=b'', method='POST')
+            with urllib.request.urlopen(request, timeout=1) as response:
+                assert response.read() == b'ok\n'
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert calls == [{'cycles': '2'}]
+
+
+def test_api_request_is_measured(monkeypatch, current_timestamp,
+                                 homework_module):
+    monkeypatch.setattr(homework_module, 'http_session', None)
+    monkeypatch.setattr(requests, 'get', utils.MockResponseGET)
+    requests_seen = homework_module.stage_seconds.labels('request').count
+    ok_seen = homework_module.api_responses.labels(200).value
+    homework_module.get_api_answer(current_timestamp)
+    assert (
+        homework_module.stage_seconds.labels('request').count
+        == requests_seen + 1
+    ), 'Запрос к API должен попадать в показатели.'
+    assert homework_module.api_responses.labels(200).value == ok_seen + 1
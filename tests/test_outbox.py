@@ -0,0 +1,183 @@
+import threading
+import time
+
+import pytest
+
+import utils
+from engine.outbox import CursorLedger, Outbox, TokenBucket, when_all
+
+
+class RetryAfterError(Exception):
+    def __init__(self, retry_after):
+        super().__init__('Flood control exceeded')
+        self.retry_after = retry_after
+
+
+class TestTokenBucket:
+    def test_rate_and_capacity(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        bucket.take(0.0)
+        bucket.take(0.0)
+        assert bucket.wait_time(0.0) == pytest.approx(0.5)
+        assert bucket.wait_time(0.5) == 0
+        assert bucket.is_full(10.0)
+
+
+class TestOutbox:
+    def make_outbox(self, send, **kwargs):
+        kwargs.setdefault('rate', 1000)
+        kwargs.setdefault('chat_rate', 20)
+        return Outbox(send, **kwargs).start()
+
+    def test_chat_rate_does_not_block_other_chats(self):
+        sent = []
+        outbox = self.make_outbox(
+            lambda chat_id, text: sent.append((chat_id, text)) or True
+        )
+        futures = [outbox.put('a', str(index)) for index in range(3)]
+        futures.append(outbox.put('b', 'x'))
+        start = time.monotonic()
+        assert all(future.result(timeout=1) for future in futures)
+        assert time.monotonic() - start >= 2 / 20 * 0.9, (
+            'Сообщения одного чата отправляются не чаще chat_rate.'
+        )
+        assert sent.index(('b', 'x')) < sent.index(('a', '2')), (
+            'Лимит одного чата не задерживает другие чаты.'
+        )
+        outbox.close(timeout=1)
+        assert outbox.stats() == {
+            'depth': 0, 'sent': 4, 'failed': 0, 'retried': 0
+        }
+
+    def test_retry_after_pauses_and_resends(self):
+        attempts = []
+
+        def send(chat_id, text):
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RetryAfterError(0.1)
+            return True
+
+        outbox = self.make_outbox(send)
+        assert outbox.put('a', 'text').result(timeout=1) is True
+        assert attempts[1] - attempts[0] >= 0.09
+        outbox.close(timeout=1)
+        assert outbox.stats()['retried'] == 1
+
+    def test_failed_send_resolves_false(self):
+        def send(chat_id, text):
+            raise ValueError('Сбой')
+
+        outbox = self.make_outbox(send)
+        assert outbox.put('a', 'text').result(timeout=1) is False
+        outbox.close(timeout=1)
+        assert outbox.stats()['failed'] == 1
+
+    def test_slow_chat_does_not_block_other_chats(self):
+        release = threading.Event()
+        sent = []
+
+        def send(chat_id, text):
+            if chat_id == 'slow':
+                release.wait(1)
+            sent.append(chat_id)
+            return True
+
+        outbox = self.make_outbox(send, workers=2)
+        slow = outbox.put('slow', 'text')
+        assert outbox.put('fast', 'text').result(timeout=1) is True, (
+            'Медленная отправка в один чат не задерживает другие чаты.'
+        )
+        assert not slow.done()
+        release.set()
+        assert slow.result(timeout=1) is True
+        outbox.close(timeout=1)
+        assert sent == ['fast', 'slow']
+
+    def test_workers_keep_chat_order(self):
+        sent = []
+
+        def send(chat_id, text):
+            time.sleep(0.001)
+            sent.append(text)
+            return True
+
+        outbox = self.make_outbox(send, workers=4, chat_rate=1000)
+        futures = [outbox.put('a', str(index)) for index in range(20)]
+        assert all(future.result(timeout=1) for future in futures)
+        outbox.close(timeout=1)
+        assert sent == [str(index) for index in range(20)], (
+            'В один чат сообщения отправляются по одному и по порядку.'
+        )
+
+    def test_max_in_flight_blocks_put(self):
+        release = threading.Event()
+        outbox = self.make_outbox(
+            lambda chat_id, text: release.wait(1), workers=2, max_in_flight=1
+        )
+        first = outbox.put('a', 'first')
+        second = []
+        putter = threading.Thread(
+            target=lambda: second.append(outbox.put('b', 'second'))
+        )
+        putter.start()
+        putter.join(0.1)
+        assert putter.is_alive(), (
+            'При max_in_flight недоставленных сообщений put ждет места.'
+        )
+        release.set()
+        putter.join(1)
+        assert first.result(timeout=1) and second[0].result(timeout=1)
+        outbox.close(timeout=1)
+
+
+class TestCursorLedger:
+    def test_cursor_follows_batch_order(self):
+        ledger = CursorLedger()
+        first, second = ledger.open(1), ledger.open(2)
+        assert ledger.close(second, True) is None, (
+            'Курсор не обгоняет недоставленный предыдущий пакет.'
+        )
+        assert ledger.close(first, True) == 2
+        assert len(ledger) == 0
+
+    def test_failed_batch_blocks_later_cursors(self):
+        ledger = CursorLedger()
+        first, second = ledger.open(1), ledger.open(2)
+        assert ledger.close(first, False) is None
+        assert ledger.close(second, True) is None
+        assert ledger.close(ledger.open(3), True) == 3
+
+
+class TestDeliveryThroughOutbox:
+    def test_poll_does_not_wait_for_delivery(self, monkeypatch,
+                                             homework_module,
+                                             data_with_new_hw_status):
+        release = threading.Event()
+
+        def slow_send(chat_id, text):
+            release.wait(1)
+            return True
+
+        outbox = Outbox(slow_send, rate=1000, chat_rate=1000).start()
+        monkeypatch.setattr(homework_module, 'outbox', outbox)
+        monkeypatch.setattr(
+            homework_module, 'request_api_answer',
+            lambda timestamp, headers: data_with_new_hw_status
+        )
+        account = homework_module.Account('token', 1)
+        timestamp = account.timestamp
+        homework_module.check_account(utils.MockTelegramBot(), account)
+        homework_module.check_account(utils.MockTelegramBot(), account)
+        assert account.timestamp == timestamp, (
+            'Курсор сдвигается только после доставки.'
+        )
+        assert outbox.stats()['depth'] + outbox.stats()['sent'] <= 1, (
+            'Статус в доставке не ставится в очередь повторно.'
+        )
+        release.set()
+        done = threading.Event()
+        when_all([outbox.put(1, 'barrier')], lambda ok: done.set())
+        assert done.wait(1)
+        outbox.close(timeout=1)
+        assert account.timestamp == data_with_new_hw_status['current_date']
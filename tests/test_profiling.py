@@ -0,0 +1,103 @@
+import pstats
+
+import pytest
+
+from engine.profiling import CycleProfiler
+from engine.scheduler import PollQueue
+from engine.sharding import PROFILE
+
+
+def poll(results, value):
+    results.append(sum(range(value)))
+    return value
+
+
+def test_disarmed_profiler_only_calls_function(tmp_path):
+    profiler = CycleProfiler(directory=str(tmp_path))
+    results = []
+    assert profiler.run(poll, results, 10) == 10
+    assert profiler.cycle_done() is None
+    assert results == [45]
+    assert list(tmp_path.iterdir()) == [], (
+        'Без запроса профиль не должен сохраняться.'
+    )
+
+
+def test_requested_cycles_are_dumped_to_pstats(tmp_path):
+    profiler = CycleProfiler(directory=str(tmp_path), memory=True)
+    assert profiler.request(2) == 2
+    results = []
+    for cycle in range(3):
+        profiler.run(poll, results, 1000)
+        path = profiler.cycle_done()
+        if cycle == 0:
+            assert path is None, 'Профиль сохраняется после всех циклов.'
+        elif cycle == 1:
+            saved = path
+    assert path is None
+    assert not profiler.armed
+    assert len(results) == 3
+    assert [item.name for item in tmp_path.iterdir()] == [
+        saved.rsplit('/', 1)[-1]
+    ]
+    stats = pstats.Stats(saved)
+    calls = {
+        name: counts[0] for (_, _, name), counts in stats.stats.items()
+    }
+    assert calls['poll'] == 2
+
+
+def test_request_profile_action(homework_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(homework_module, 'profiler', CycleProfiler(
+        directory=str(tmp_path)
+    ))
+    message = homework_module.request_profile({'cycles': '3'})
+    assert homework_module.profiler.armed
+    assert homework_module.profiler.requested == 3
+    assert '3' in message
+
+
+def test_request_profile_passes_cycles_to_shards(homework_module, tmp_path,
+                                                 monkeypatch):
+    sent = []
+
+    class RecordingSupervisor:
+        def broadcast(self, message):
+            sent.append(message)
+
+    monkeypatch.setattr(homework_module, 'supervisor', RecordingSupervisor())
+    message = homework_module.request_profile({'cycles': '7'})
+    assert sent == [(PROFILE, 7)]
+    assert '7' in message
+
+    profiler = CycleProfiler(directory=str(tmp_path))
+    monkeypatch.setattr(homework_module, 'profiler', profiler)
+    reply = homework_module.handle_shard_message(
+        0, PROFILE, 7, {}, {}, PollQueue()
+    )
+    assert reply is None
+    assert profiler.requested == 7, (
+        'Обработчик профилирует запрошенное число циклов.'
+    )
+
+
+@pytest.mark.parametrize('cycles', ['0', '-1', 'many'])
+def test_request_profile_rejects_bad_cycles(homework_module, tmp_path,
+                                            monkeypatch, cycles):
+    profiler = CycleProfiler(directory=str(tmp_path))
+    monkeypatch.setattr(homework_module, 'profiler', profiler)
+    with pytest.raises(ValueError):
+        homework_module.request_profile({'cycles': cycles})
+    assert not profiler.armed, (
+        'Неверное число циклов не включает профилирование.'
+    )
+
+
+def test_request_profile_refused_in_asyncio_mode(homework_module, tmp_path,
+                                                 monkeypatch):
+    profiler = CycleProfiler(directory=str(tmp_path))
+    monkeypatch.setattr(homework_module, 'profiler', profiler)
+    monkeypatch.setattr(homework_module, 'WORKER_MODE', 'asyncio')
+    with pytest.raises(ValueError, match='asyncio'):
+        homework_module.request_profile({'cycles': '3'})
+    assert not profiler.armed
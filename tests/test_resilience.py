@@ -0,0 +1,122 @@
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+from engine.resilience import (
+    BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker,
+    CircuitOpenError, RetryPolicy
+)
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(error):
+    def func(*args):
+        raise error
+    return func
+
+
+class TestRetryPolicy:
+    def test_retries_transient_errors(self):
+        delays = []
+        calls = iter([ConnectionError('Сбой'), ConnectionError('Сбой')])
+
+        def flaky(value):
+            error = next(calls, None)
+            if error:
+                raise error
+            return value
+
+        policy = RetryPolicy(attempts=3, base_delay=1, sleep=delays.append)
+        assert policy.call(flaky, 42) == 42
+        assert len(delays) == 2
+        assert 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+
+    def test_gives_up_and_skips_other_errors(self):
+        delays = []
+        policy = RetryPolicy(attempts=3, sleep=delays.append)
+        with pytest.raises(ConnectionError):
+            policy.call(fail(ConnectionError('Сбой')))
+        assert len(delays) == 2
+        with pytest.raises(ValueError):
+            policy.call(fail(ValueError('Ошибка данных')))
+        assert len(delays) == 2, 'Ошибки данных не повторяются.'
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def clock(self):
+        return Clock()
+
+    @pytest.fixture
+    def breaker(self, clock):
+        return CircuitBreaker(
+            'api', threshold=2, reset_timeout=10,
+            is_failure=lambda error: isinstance(error, ServerError),
+            clock=clock
+        )
+
+    def test_opens_after_server_errors(self, breaker):
+        for _ in range(2):
+            with pytest.raises(ServerError):
+                breaker.call(fail(ServerError()))
+        assert breaker.state == BREAKER_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: 'ok')
+        assert breaker.stats()['rejected'] == 1
+
+    def test_other_errors_do_not_open(self, breaker):
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                breaker.call(fail(ValueError('Ошибка данных')))
+        assert breaker.state == BREAKER_CLOSED
+
+    def test_half_open_probe(self, breaker, clock):
+        for _ in range(2):
+            with pytest.raises(ServerError):
+                breaker.call(fail(ServerError()))
+        clock.now = 10
+        with pytest.raises(ServerError):
+            breaker.call(fail(ServerError()))
+        assert breaker.state == BREAKER_OPEN, (
+            'Неудачная проба снова размыкает выключатель.'
+        )
+        clock.now = 20
+        breaker.before_call()
+        assert breaker.state == BREAKER_HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record()
+        assert breaker.state == BREAKER_CLOSED
+        assert breaker.stats()['opened'] == 2
+
+
+class TestApiGuard:
+    def test_server_error_carries_status(self, monkeypatch,
+                                         current_timestamp,
+                                         homework_module):
+        def mock_get(*args, **kwargs):
+            response = utils.MockResponseGET(
+                *args, http_status=HTTPStatus.BAD_GATEWAY, **kwargs
+            )
+            response.json = fail(ValueError('Ответ не в формате JSON'))
+            return response
+
+        monkeypatch.setattr(homework_module, 'http_session', None)
+        monkeypatch.setattr(requests, 'get', mock_get)
+        with pytest.raises(homework_module.ResponseStatusError) as error:
+            homework_module.get_api_answer(current_timestamp)
+        assert error.value.status_code == HTTPStatus.BAD_GATEWAY
+        assert homework_module.is_server_error(error.value)
@@ -0,0 +1,87 @@
+import pytest
+
+from engine.scheduler import (
+    REASON_BASE, REASON_ERROR, REASON_IDLE, REASON_REVIEWING,
+    AdaptiveInterval, PollQueue
+)
+
+
+class TestAdaptiveInterval:
+    @pytest.fixture
+    def schedule(self):
+        return AdaptiveInterval(
+            600, active=300, idle=1800, idle_after=2,
+            error=60, error_max=3600
+        )
+
+    def test_base_interval(self, schedule):
+        schedule.observe({'hw1': 'approved'})
+        assert schedule.next_interval() == (600, REASON_BASE)
+
+    def test_shorter_while_reviewing(self, schedule):
+        schedule.observe({'hw1': 'reviewing'})
+        assert schedule.next_interval() == (300, REASON_REVIEWING)
+        schedule.observe({})
+        assert schedule.next_interval() == (300, REASON_REVIEWING), (
+            'Работа остается на проверке, пока не пришел новый статус.'
+        )
+        schedule.observe({'hw1': 'rejected'})
+        assert schedule.next_interval() == (600, REASON_BASE)
+
+    def test_longer_when_idle(self, schedule):
+        intervals = []
+        for _ in range(6):
+            schedule.observe({})
+            intervals.append(schedule.next_interval())
+        assert intervals[:2] == [(600, REASON_BASE)] * 2
+        assert intervals[2:] == [
+            (1200, REASON_IDLE), (1800, REASON_IDLE),
+            (1800, REASON_IDLE), (1800, REASON_IDLE)
+        ]
+
+    def test_error_backoff_with_jitter(self, schedule):
+        for errors in range(1, 12):
+            schedule.record_error()
+            interval, reason = schedule.next_interval()
+            limit = min(3600, 60 * 2 ** (errors - 1))
+            assert reason == REASON_ERROR
+            assert limit / 2 <= interval <= limit
+        schedule.observe({'hw1': 'approved'})
+        assert schedule.next_interval() == (600, REASON_BASE), (
+            'Успешный ответ сбрасывает отступ после ошибок.'
+        )
+
+
+class TestPollQueue:
+    def test_pops_due_keys_in_order_by_batches(self):
+        polls = PollQueue()
+        for key, due in (('c', 30), ('a', 10), ('b', 20), ('d', 40)):
+            polls.schedule(key, due)
+        assert polls.next_due() == 10
+        assert polls.pop_due(5) == []
+        assert polls.pop_due(30, limit=2) == ['a', 'b']
+        assert polls.pop_due(30) == ['c']
+        assert 'c' not in polls, (
+            'Извлеченный ключ снимается с очереди до перепланирования.'
+        )
+        assert len(polls) == 1
+        assert polls.next_due() == 40
+
+    def test_reschedule_and_remove(self):
+        polls = PollQueue()
+        polls.schedule('a', 10)
+        polls.schedule('b', 20)
+        polls.schedule('a', 30)
+        assert polls.next_due() == 20
+        polls.remove('b')
+        polls.remove('missing')
+        assert polls.next_due() == 30
+        assert polls.pop_due(100) == ['a']
+        assert polls.next_due() is None
+
+    def test_stale_entries_are_compacted(self):
+        polls = PollQueue()
+        for step in range(5000):
+            polls.schedule('a', step)
+        assert len(polls.heap) <= 1024
+        assert polls.pop_due(5000) == ['a']
@@ -0,0 +1,168 @@
+import json
+import time
+
+import pytest
+
+from engine.metrics import Registry
+from engine.sharding import (
+    ASSIGN, METRICS, RELEASE, RELEASED, STOP, HashRing, Supervisor
+)
+
+KEYS = [f'student-{index}' for index in range(200)]
+
+
+def echo_shard(node, connection):
+    owned = set()
+    while True:
+        command, keys = connection.recv()
+        if command == STOP:
+            return
+        if command == ASSIGN:
+            owned.update(keys)
+        elif command == RELEASE:
+            owned.difference_update(keys)
+            connection.send((RELEASED, keys))
+        connection.send((METRICS, sorted(owned)))
+
+
+def poll_until(supervisor, condition, timeout=1.5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        supervisor.poll(0.02)
+    return condition()
+
+
+class TestHashRing:
+    def test_removing_node_moves_only_its_keys(self):
+        ring = HashRing(range(4))
+        before = {key: ring.node_for(key) for key in KEYS}
+        ring.remove(2)
+        for key in KEYS:
+            if before[key] != 2:
+                assert ring.node_for(key) == before[key], (
+                    'Ключи остальных узлов не должны переезжать.'
+                )
+            else:
+                assert ring.node_for(key) != 2
+
+    def test_keys_are_spread_over_nodes(self):
+        ring = HashRing(range(4))
+        counts = {}
+        for key in KEYS:
+            node = ring.node_for(key)
+            counts[node] = counts.get(node, 0) + 1
+        assert set(counts) == {0, 1, 2, 3}
+        assert max(counts.values()) < 2 * len(KEYS) / 4
+
+    def test_empty_ring(self):
+        assert HashRing().node_for('key') is None
+
+
+class TestSupervisor:
+    def test_rebalance_keeps_single_owner(self):
+        reports = {}
+        supervisor = Supervisor(
+            echo_shard, range(3), KEYS,
+            on_metrics=lambda node, owned: reports.__setitem__(node, owned),
+            on_exit=reports.pop, respawn_delay=0.2, context='fork'
+        )
+
+        def consistent():
+            owned = [key for keys in reports.values() for key in keys]
+            return (
+                sorted(owned) == sorted(KEYS)
+                and set(reports) == set(supervisor.shards)
+                and not supervisor.releasing
+            )
+
+        supervisor.start()
+        try:
+            assert poll_until(supervisor, consistent)
+            supervisor.shards[0].process.kill()
+            assert poll_until(
+                supervisor, lambda: 0 not in supervisor.shards
+                and consistent()
+            ), 'Ключи умершего обработчика должны перейти к остальным.'
+            assert set(supervisor.owners.values()) == {1, 2}
+            assert poll_until(
+                supervisor, lambda: 0 in supervisor.shards and bool(
+                    supervisor.shards[0].keys
+                ) and consistent()
+            ), 'Перезапущенный обработчик должен получить свои ключи.'
+            for key, node in supervisor.owners.items():
+                assert supervisor.ring.node_for(key) == node
+        finally:
+            supervisor.stop(timeout=1)
+
+
+def test_registry_merges_process_snapshots():
+    worker = Registry()
+    worker.counter('polls_total', 'Опросы.').labels().inc(2)
+    worker.histogram(
+        'stage_seconds', 'Длительность.', label='stage', buckets=(1,)
+    ).labels('poll').observe(0.5)
+    supervisor = Registry()
+    supervisor.counter('polls_total', 'Опросы.').labels().inc(1)
+    supervisor.absorb(1, worker.snapshot())
+    supervisor.absorb(2, worker.snapshot())
+    lines = supervisor.render().splitlines()
+    assert 'polls_total 5' in lines
+    assert 'stage_seconds_count{stage="poll"} 2' in lines
+    supervisor.retire(1)
+    assert 'polls_total 5' in supervisor.render().splitlines(), (
+        'Счетчики завершившегося процесса должны остаться в выводе.'
+    )
+
+
+def test_shard_handoff_through_state_store(monkeypatch, tmp_path,
+                                           homework_module):
+    monkeypatch.setattr(homework_module, 'state_store', None)
+    homework_module.setup_state_store(str(tmp_path / 'state.sqlite3'))
+    first = {'a': homework_module.Account('token', 1, name='a')}
+    second = {'a': homework_module.Account('token', 1, name='a')}
+    first['a'].timestamp = 1000
+    shard = {}
+    homework_module.apply_shard_command(0, ASSIGN, ['a'], first, shard)
+    shard['a'].timestamp = 2000
+    reply = homework_module.apply_shard_command(
+        0, RELEASE, ['a'], first, shard
+    )
+    assert reply == (RELEASED, ['a']) and shard == {}
+    homework_module.apply_shard_command(1, ASSIGN, ['a'], second, shard)
+    assert shard['a'].timestamp == 2000, (
+        'Новый владелец должен продолжить опрос с курсора прежнего.'
+    )
+    homework_module.state_store.close()
+
+
+def test_outbox_rate_split_between_shards(monkeypatch, homework_module):
+    monkeypatch.setattr(homework_module, 'outbox', None)
+    outbox = homework_module.setup_outbox(
+        object(), rate=homework_module.TELEGRAM_RATE / 60
+    )
+    try:
+        assert outbox.bucket.rate == homework_module.TELEGRAM_RATE / 60
+        assert outbox.bucket.capacity >= 1, (
+            'Ведро с лимитом меньше одного сообщения в секунду '
+            'должно вмещать хотя бы одно сообщение.'
+        )
+    finally:
+        outbox.close(timeout=1)
+
+
+def test_repeated_account_names_rejected(monkeypatch, tmp_path,
+                                         homework_module):
+    path = tmp_path / 'accounts.json'
+    path.write_text(json.dumps([
+        {'practicum_token': 't', 'chat_id': 1, 'name': 'b'},
+        {'practicum_token': 't', 'chat_id': 2, 'name': 'a'},
+        {'practicum_token': 't', 'chat_id': 3, 'name': 'b'},
+        {'practicum_token': 't', 'chat_id': 4},
+    ]), encoding='utf-8')
+    monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '123:token')
+    monkeypatch.setattr(homework_module, 'ACCOUNTS_FILE', str(path))
+    monkeypatch.setattr(
+        homework_module, 'STATE_FILE', str(tmp_path / 'state.sqlite3')
+    )
+    with pytest.raises(ValueError, match=r"\['b'\]"):
+        homework_module.main_processes()
@@ -0,0 +1,85 @@
+import pytest
+
+from engine.state import DeliveryIndex, StateStore
+
+
+class TestStateStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = StateStore(str(tmp_path / 'state.sqlite3'))
+        yield store
+        store.close()
+
+    def test_unknown_account(self, store):
+        assert store.load('nobody') is None
+
+    def test_checkpoint_roundtrip(self, store, tmp_path):
+        store.checkpoint('acc', 100, {'hw1': ('reviewing', None)})
+        store.checkpoint('acc', 200, {'hw1': ('approved', '2023-01-01')})
+        store.save_error('acc', 200, 'abc')
+        store.close()
+        reopened = StateStore(str(tmp_path / 'state.sqlite3'))
+        state = reopened.load('acc')
+        reopened.close()
+        assert state.from_date == 200
+        assert state.statuses == {'hw1': 'approved'}
+        assert state.error_fingerprint == 'abc'
+
+    def test_wal_mode(self, store):
+        mode = store.connection.execute('PRAGMA journal_mode').fetchone()[0]
+        assert mode == 'wal'
+
+
+class TestAccountRestore:
+    def test_restart_resumes_cursor_and_error(self, monkeypatch, tmp_path,
+                                              homework_module,
+                                              data_with_new_hw_status):
+        path = str(tmp_path / 'state.sqlite3')
+        monkeypatch.setattr(homework_module, 'state_store', None)
+        homework_module.setup_state_store(path)
+        account = homework_module.Account('token', 1, name='student')
+        homework_module.mark_delivered(
+            account, data_with_new_hw_status['homeworks']
+        )
+        homework_module.commit_cursor(
+            account, data_with_new_hw_status['current_date']
+        )
+        homework_module.remember_error(account, 'Сбой')
+        homework_module.state_store.close()
+
+        homework_module.setup_state_store(path)
+        restarted = homework_module.Account('token', 1, name='student')
+        homework_module.restore_account(restarted)
+        homework_module.state_store.close()
+        assert restarted.timestamp == data_with_new_hw_status['current_date']
+        assert restarted.statuses == {'hw123': 'approved'}
+        assert not restarted.delivered.is_new('hw123', 'approved', None), (
+            'Доставленные переходы восстанавливаются в индекс.'
+        )
+        assert restarted.error_fingerprint == (
+            homework_module.error_fingerprint('Сбой')
+        )
+
+
+class TestDeliveryIndex:
+    def test_only_true_transitions_are_new(self):
+        index = DeliveryIndex(limit=10)
+        assert index.is_new('1', 'reviewing', 'd1')
+        index.mark('1', 'reviewing', 'd1')
+        assert not index.is_new('1', 'reviewing', 'd1')
+        assert index.is_new('1', 'reviewing', 'd2')
+        assert index.is_new('1', 'approved', 'd2')
+
+    def test_finished_works_evicted_first(self):
+        index = DeliveryIndex(limit=2)
+        index.mark('1', 'approved', 'd1')
+        index.mark('2', 'reviewing', 'd1')
+        index.mark('3', 'reviewing', 'd1')
+        assert len(index) == 2
+        assert index.is_new('1', 'approved', 'd1'), (
+            'Завершенные работы вытесняются из индекса первыми.'
+        )
+        assert not index.is_new('2', 'reviewing', 'd1')
+        index.mark('4', 'rejected', 'd1')
+        assert index.is_new('2', 'reviewing', 'd1')
+        assert len(index) == 2
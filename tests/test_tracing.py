@@ -0,0 +1,110 @@
+import gzip
+import json
+import logging
+
+from engine.resilience import RetryPolicy
+from engine.tracing import (
+    CHANGED, EMPTY, ERROR, TOTAL, percentile, read_traces, summarize
+)
+
+RESPONSE = {
+    'current_date': 100,
+    'homeworks': [
+        {'id': 1, 'homework_name': 'hw1.zip', 'status': 'approved'},
+        {'id': 2, 'homework_name': 'hw2.zip', 'status': 'reviewing'},
+    ]
+}
+
+
+class RecordingBot:
+    def __init__(self):
+        self.texts = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.texts.append(text)
+
+
+class TraceHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(json.loads(record.getMessage()))
+
+
+def capture_traces():
+    handler = TraceHandler()
+    trace_logger = logging.getLogger('engine.tracing')
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+    return trace_logger, handler
+
+
+def test_cycle_emits_one_json_record(monkeypatch, homework_module):
+    monkeypatch.setattr(homework_module, 'TRACE_CYCLES', True)
+    monkeypatch.setattr(homework_module, 'outbox', None)
+    account = homework_module.Account('token', 1, name='student')
+    monkeypatch.setattr(account, 'get_answer', lambda timestamp: RESPONSE)
+    trace_logger, handler = capture_traces()
+    try:
+        homework_module.check_account(RecordingBot(), account)
+        homework_module.check_account(RecordingBot(), account)
+    finally:
+        trace_logger.removeHandler(handler)
+    first, second = handler.records
+    assert first['account'] == 'student'
+    assert first['homeworks'] == 2
+    assert first['outcome'] == CHANGED
+    assert {'validate', 'parse', 'send'} <= set(first['stages'])
+    assert first['transitions'] == [
+        {'work': '1', 'from': None, 'to': 'approved'},
+        {'work': '2', 'from': None, 'to': 'reviewing'},
+    ]
+    assert first['duration'] >= sum(first['stages'].values())
+    assert second['transitions'] == [], (
+        'Доставленные статусы не должны попадать в смены статусов.'
+    )
+
+
+def test_failed_cycle_records_error(monkeypatch, homework_module):
+    def failing_request(timestamp, headers):
+        raise ConnectionError('Сбой сети')
+
+    monkeypatch.setattr(homework_module, 'TRACE_CYCLES', True)
+    monkeypatch.setattr(homework_module, 'outbox', None)
+    monkeypatch.setattr(homework_module, 'request_api_answer', failing_request)
+    monkeypatch.setattr(homework_module, 'api_retry', RetryPolicy(attempts=1))
+    trace_logger, handler = capture_traces()
+    try:
+        homework_module.check_account(
+            RecordingBot(), homework_module.Account('token', 1)
+        )
+    finally:
+        trace_logger.removeHandler(handler)
+    [record] = handler.records
+    assert record['outcome'] == ERROR
+    assert record['error'] == 'ConnectionError'
+
+
+def test_percentiles_from_log_files(tmp_path):
+    lines = [
+        json.dumps({
+            'duration': index / 100,
+            'stages': {'request': index / 200},
+            'outcome': EMPTY
+        })
+        for index in range(1, 101)
+    ]
+    plain = tmp_path / 'homework.py.trace.log'
+    plain.write_text('\n'.join(lines[:50]) + '\nне JSON\n', encoding='utf-8')
+    packed = tmp_path / 'homework.py.trace.log.1.gz'
+    with gzip.open(packed, 'wt', encoding='utf-8') as file:
+        file.write('\n'.join(lines[50:]))
+    summary, outcomes = summarize(
+        read_traces([str(plain), str(packed)]), (0.5, 0.99)
+    )
+    assert summary[TOTAL] == (100, [0.5, 0.99], 1.0)
+    assert summary['request'][1] == [0.25, 0.495]
+    assert outcomes == {EMPTY: 100}
+    assert percentile([], 0.5) is None
@@ -0,0 +1,50 @@
+import pytest
+
+from engine.validation import Schema, Validator
+
+ITEM = Schema(dict, keys={'name': None, 'state': Schema(choices={'on'})})
+DOCUMENT = Validator(Schema(dict, keys={'items': Schema(list, items=ITEM)}))
+
+
+def test_valid_document_is_returned():
+    document = {'items': [{'name': 'a', 'state': 'on', 'extra': 1}]}
+    assert DOCUMENT(document) is document
+
+
+@pytest.mark.parametrize('document, error, text', [
+    ([], TypeError, 'данные'),
+    ({}, KeyError, '"items"'),
+    ({'items': {}}, TypeError, 'items'),
+    ({'items': ['a']}, TypeError, 'items[0]'),
+    ({'items': [{'name': 'a', 'state': 'on'}, {'state': 'on'}]},
+     KeyError, 'items[1]'),
+    ({'items': [{'name': 'a', 'state': 'off'}]}, ValueError, "'off'"),
+    ({'items': [{'name': 'a', 'state': {}}]}, ValueError, 'items[0].state'),
+])
+def test_invalid_document_reports_path(document, error, text):
+    with pytest.raises(error) as info:
+        DOCUMENT(document)
+    assert text in str(info.value), (
+        'Сообщение об ошибке должно указывать место ошибки в данных.'
+    )
+
+
+def test_path_template_is_filled_on_error():
+    validator = Validator(ITEM, 'items[{}]')
+    with pytest.raises(KeyError) as info:
+        validator({'state': 'on'}, 7)
+    assert 'items[7]' in str(info.value)
+
+
+def test_homework_errors_keep_module_messages(homework_module):
+    with pytest.raises(KeyError) as info:
+        homework_module.check_response(
+            {'homeworks': [{'status': 'approved'}], 'current_date': 0}
+        )
+    assert 'homework_name' in str(info.value)
+    assert 'homeworks[0]' in str(info.value)
+    with pytest.raises(ValueError) as info:
+        homework_module.parse_status(
+            {'homework_name': 'hw.zip', 'status': 'lost'}
+        )
+    assert 'lost' in str(info.value)